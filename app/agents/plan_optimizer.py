@@ -0,0 +1,152 @@
+"""
+Step Plan Optimizer
+Semantics-preserving rewrites of parsed steps before code generation
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+from app.executor.suite_planner import estimate_step_seconds
+
+
+# Actions whose runtime handler already waits for their target to be visible
+SELF_WAITING_ACTIONS = {"CLICK", "TYPE"}
+
+# "2000", "2000ms", "2s", "1.5 sec", ...
+DURATION_PATTERN = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*(ms|s|sec|secs|seconds?)?\s*$", re.IGNORECASE)
+
+# Steps are passed around as (position in the original plan, step), so diff
+# entries report original positions however many steps earlier passes removed
+IndexedSteps = List[Tuple[int, Dict]]
+
+
+def _normalize_url(url: str) -> str:
+    if url and not url.startswith(("http://", "https://")):
+        url = f"https://{url}"
+    return url.rstrip("/")
+
+
+def _wait_ms(step: Dict) -> Optional[int]:
+    """WAIT duration in ms, or None when it cannot be parsed (step is left alone)"""
+    duration = step.get("duration", 3000)
+    if isinstance(duration, bool):
+        return None
+    if isinstance(duration, (int, float)):
+        return int(duration)
+    match = DURATION_PATTERN.match(str(duration))
+    if not match:
+        return None
+    value = float(match.group(1))
+    unit = (match.group(2) or "ms").lower()
+    return int(value if unit == "ms" else value * 1000)
+
+
+def _is_wait(step: Dict) -> bool:
+    """A WAIT whose duration the rules can reason about"""
+    return step.get("action") == "WAIT" and _wait_ms(step) is not None
+
+
+def merge_waits(steps: IndexedSteps, diff: List[Dict]) -> IndexedSteps:
+    """Back-to-back WAITs become one WAIT of the combined duration"""
+    out = []
+    for i, step in steps:
+        if _is_wait(step) and out and _is_wait(out[-1][1]):
+            first_index, first = out[-1]
+            merged = {**first, "duration": _wait_ms(first) + _wait_ms(step)}
+            diff.append({"rule": "merge_waits", "index": i,
+                         "before": [first, step], "after": merged, "saved": 0.0})
+            out[-1] = (first_index, merged)
+        else:
+            out.append((i, step))
+    return out
+
+
+def drop_noop_navigation(steps: IndexedSteps, diff: List[Dict]) -> IndexedSteps:
+    """
+    An OPEN_BROWSER to the URL we just opened does nothing new, as long as
+    only WAIT or SCREENSHOT steps ran in between; after anything else
+    (typing, login checks, clicks) re-opening the URL is a reload that
+    resets page state and is kept
+    """
+    out = []
+    current_url = ""
+    for i, step in steps:
+        action = step.get("action")
+        if action == "OPEN_BROWSER":
+            url = _normalize_url(step.get("url", ""))
+            if url and url == current_url:
+                diff.append({"rule": "drop_noop_navigation", "index": i,
+                             "before": step, "after": None,
+                             "saved": estimate_step_seconds(step)})
+                continue
+            current_url = url
+        elif action not in ("WAIT", "SCREENSHOT"):
+            current_url = ""
+        out.append((i, step))
+    return out
+
+
+def drop_repeated_screenshots(steps: IndexedSteps, diff: List[Dict]) -> IndexedSteps:
+    """A SCREENSHOT identical to the step right before it captures nothing new"""
+    out = []
+    for i, step in steps:
+        if step.get("action") == "SCREENSHOT" and out and out[-1][1] == step:
+            diff.append({"rule": "drop_repeated_screenshot", "index": i,
+                         "before": step, "after": None,
+                         "saved": estimate_step_seconds(step)})
+            continue
+        out.append((i, step))
+    return out
+
+
+def fold_waits_into_readiness(steps: IndexedSteps, diff: List[Dict]) -> IndexedSteps:
+    """
+    A fixed WAIT before a step that waits for its own target becomes part
+    of that step's readiness condition: the wait is added to the step's
+    wait_budget (extra visibility timeout), so it never fails where the
+    original plan would have passed, but proceeds as soon as the target
+    is ready
+    """
+    out = []
+    for i, step in steps:
+        if (out and _is_wait(out[-1][1])
+                and step.get("action") in SELF_WAITING_ACTIONS
+                and step.get("selector")):
+            _, wait = out.pop()
+            ready = {**step,
+                     "wait_budget": int(step.get("wait_budget", 0)) + _wait_ms(wait)}
+            diff.append({"rule": "fold_wait_into_readiness", "index": i,
+                         "before": [wait, step], "after": ready,
+                         "saved": _wait_ms(wait) / 1000})
+            out.append((i, ready))
+        else:
+            out.append((i, step))
+    return out
+
+
+# Applied in order; merging first lets later rules see one WAIT per gap
+OPTIMIZER_PASSES = [
+    merge_waits,
+    drop_noop_navigation,
+    drop_repeated_screenshots,
+    fold_waits_into_readiness,
+]
+
+
+def optimize_steps(steps: List[Dict]) -> Tuple[List[Dict], List[Dict], float]:
+    """
+    Run every optimizer pass over a step plan
+
+    Args:
+        steps: Parsed test steps
+
+    Returns:
+        (optimized steps, diff entries, estimated seconds saved); each diff
+        entry's index is the 0-based position of the step in the original plan
+    """
+    diff = []
+    optimized = list(enumerate(steps))
+    for optimizer_pass in OPTIMIZER_PASSES:
+        optimized = optimizer_pass(optimized, diff)
+    saved = round(sum(entry["saved"] for entry in diff), 2)
+    return [step for _, step in optimized], diff, saved
@@ -20,20 +20,45 @@ class TestState(TypedDict):
     parsing_status: str
     parsing_errors: str
     
+    # Plan optimization
+    original_steps: list
+    plan_diff: list
+    estimated_time_saved: float
+    
     # Browser state
     browser_open: bool
     current_url: str
     logged_in: bool
     
     # Code generation state
+    step_timeouts: list
+    execution_deadline: int
     generated_code: str
     code_file_path: str
+    code_hash: str
     
     # Execution state
+    network_mode: str
+    browsers: list
     execution_status: str
     execution_output: str
+    execution_output_path: str
     execution_errors: str
     retry_count: int
+    execution_telemetry: list
+    step_durations: list
+    execution_duration: float
+    failure_class: str
+    peak_rss_mb: float
+    max_process_rss_mb: float
+    cpu_seconds: float
+    screenshots: list
+    screenshot_cost: dict
+    visual_checks: list
+    traces: list
+    trace_cost: dict
+    browser_results: dict
+    matrix: dict
     
     # Final result
     test_passed: bool
@@ -188,44 +213,69 @@ def track_browser_state(state: TestState) -> TestState:
     }
 
 
+def optimize_plan(state: TestState) -> TestState:
+    """Apply semantics-preserving rewrites to the parsed steps"""
+    print("\n [Node 2b] Optimizing step plan...")
+    
+    from app.agents.plan_optimizer import optimize_steps
+    
+    optimized, diff, saved = optimize_steps(state["parsed_steps"])
+    
+    for entry in diff:
+        print(f"   {entry['rule']} at step {entry['index'] + 1} (~{entry['saved']:.1f}s)")
+    print(f"✅ {len(state['parsed_steps'])} → {len(optimized)} steps, ~{saved:.1f}s saved")
+    
+    return {
+        **state,
+        "original_steps": state["parsed_steps"],
+        "parsed_steps": optimized,
+        "plan_diff": diff,
+        "estimated_time_saved": saved
+    }
+
+
 def generate_adaptive_code(state: TestState) -> TestState:
     """Generate code with adaptive selectors"""
     print("\n [Node 3] Generating code with adaptive DOM mapping...")
     
     from app.executor.python_executor_enhanced import generate_adaptive_python_test
+    from app.executor.timeout_model import TimeoutModel
+    
+    # Timeouts learned from this domain's history; deadline follows the plan
+    model = TimeoutModel()
+    step_timeouts = model.plan_timeouts(state["parsed_steps"], state.get("browsers") or None)
+    deadline = model.plan_deadline(state["parsed_steps"], step_timeouts)
     
     code = generate_adaptive_python_test(state["parsed_steps"], ADAPTIVE_SELECTORS)
     
     print(f"✅ Generated {len(code.split(chr(10)))} lines with error handling")
+    print(f"   Test deadline: {deadline}s")
     
     return {
         **state,
+        "step_timeouts": step_timeouts,
+        "execution_deadline": deadline,
         "generated_code": code
     }
 
 
 def save_code(state: TestState) -> TestState:
-    """Save code to file"""
+    """Save code to file, reusing an identical previously generated test"""
     print("\n [Node 4] Saving test file...")
     
-    import os
-    from datetime import datetime
-    
-    test_dir = "app/generated_tests"
-    os.makedirs(test_dir, exist_ok=True)
-    
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"test_{timestamp}.py"
-    filepath = os.path.join(test_dir, filename)
+    from app.executor.artifact_store import store_test
     
-    with open(filepath, "w", encoding="utf-8") as f:
-        f.write(state["generated_code"])
+    artifact = store_test(state["generated_code"])
     
-    print(f"✅ Saved to: {filepath}")
+    if artifact["reused"]:
+        print(f"♻️  Identical test already stored: {artifact['path']}")
+    else:
+        print(f"✅ Saved to: {artifact['path']}")
     
     return {
         **state,
-        "code_file_path": filepath
+        "code_file_path": artifact["path"],
+        "code_hash": artifact["hash"]
     }
 
 
@@ -234,13 +284,34 @@ def execute_with_retry(state: TestState) -> TestState:
     print("\n [Node 5] Executing test with retry...")
     
     from app.executor.python_executor_enhanced import execute_python_test
+    from app.executor.browser_matrix import execute_browser_matrix
+    from app.executor.auth_state import find_login_sequence
     
     max_retries = 2
+    # Traces from every attempt: a failure followed by a pass is a flaky test
+    traces = []
+    
+    # Tests with a login sequence save/reuse that origin's session
+    login = find_login_sequence(state["parsed_steps"])
+    auth_origin = login[2] if login else ""
+    
+    # Several engines run as a parallel matrix, one engine as a plain run
+    browsers = state.get("browsers") or []
     
     for attempt in range(max_retries):
         print(f"  Attempt {attempt + 1}/{max_retries}")
         
-        result = execute_python_test(state["code_file_path"])
+        options = {
+            "timeout": state.get("execution_deadline") or 180,
+            "network_mode": state.get("network_mode") or "live",
+            "auth_origin": auth_origin
+        }
+        if len(browsers) > 1:
+            result = execute_browser_matrix(state["code_file_path"], browsers, **options)
+        else:
+            result = execute_python_test(state["code_file_path"],
+                                         browser=browsers[0] if browsers else None, **options)
+        traces.extend({**trace, "attempt": attempt + 1} for trace in result.get("traces", []))
         
         if result["return_code"] == 0:
             print("✅ Test passed!")
@@ -248,8 +319,11 @@ def execute_with_retry(state: TestState) -> TestState:
                 **state,
                 "execution_status": "passed",
                 "execution_output": result.get("output", ""),
+                "execution_output_path": result.get("output_path", ""),
                 "execution_errors": "",
                 "retry_count": attempt,
+                **_telemetry_fields(result),
+                "traces": traces,
                 "test_passed": True
             }
         
@@ -260,12 +334,35 @@ def execute_with_retry(state: TestState) -> TestState:
         **state,
         "execution_status": "failed",
         "execution_output": result.get("output", ""),
+        "execution_output_path": result.get("output_path", ""),
         "execution_errors": result.get("errors", ""),
         "retry_count": max_retries,
+        **_telemetry_fields(result),
+        "traces": traces,
         "test_passed": False
     }
 
 
+def _telemetry_fields(result: dict) -> dict:
+    """State fields taken from an execution result's telemetry and resource usage"""
+    return {
+        "execution_telemetry": result.get("telemetry", []),
+        "step_durations": result.get("step_durations", []),
+        "execution_duration": result.get("duration_seconds", 0.0),
+        "failure_class": result.get("failure_class", ""),
+        "peak_rss_mb": result.get("peak_rss_mb"),
+        "max_process_rss_mb": result.get("max_process_rss_mb"),
+        "cpu_seconds": result.get("cpu_seconds"),
+        "screenshots": result.get("screenshots", []),
+        "screenshot_cost": result.get("screenshot_cost", {}),
+        "visual_checks": result.get("visual_checks", []),
+        "traces": result.get("traces", []),
+        "trace_cost": result.get("trace_cost", {}),
+        "browser_results": result.get("browsers", {}),
+        "matrix": result.get("matrix", {})
+    }
+
+
 def should_execute(state: TestState) -> Literal["execute", "skip"]:
     """Conditional edge"""
     if state["parsing_status"] == "success" and state["parsed_steps"]:
@@ -280,6 +377,7 @@ def build_enhanced_agent():
     # Add nodes with error handling
     workflow.add_node("parse", parse_with_error_handling)
     workflow.add_node("track_state", track_browser_state)
+    workflow.add_node("optimize", optimize_plan)
     workflow.add_node("generate", generate_adaptive_code)
     workflow.add_node("save", save_code)
     workflow.add_node("execute", execute_with_retry)
@@ -287,7 +385,8 @@ def build_enhanced_agent():
     # Set flow
     workflow.set_entry_point("parse")
     workflow.add_edge("parse", "track_state")
-    workflow.add_edge("track_state", "generate")
+    workflow.add_edge("track_state", "optimize")
+    workflow.add_edge("optimize", "generate")
     workflow.add_edge("generate", "save")
     
     workflow.add_conditional_edges(
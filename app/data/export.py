@@ -0,0 +1,190 @@
+"""
+Streaming Export
+Test history as a stream of bytes, read from the store chunk by chunk
+(StorageBackend.iter_tests), so memory is bounded by the chunk size rather
+than the history size. Every stream is a generator of bytes: write it to a
+file (write_stream) or hand it to anything that consumes byte chunks.
+
+Formats:
+    csv       header once, then chunk.to_csv per chunk
+    parquet   one row group per chunk (pyarrow); columns can be pruned
+    arrow     Arrow IPC stream, one record batch per chunk (pyarrow)
+
+Every format takes columns (subset of HISTORY_COLUMNS) and a since/until
+timestamp range.
+"""
+
+import io
+import os
+from typing import Iterator, List, Optional
+
+import pandas as pd
+
+from app.data.storage import HISTORY_COLUMNS, StorageBackend, compact_frame
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+CHUNK_ROWS = 10000
+
+# Arrow types of the history columns (fixed, so every chunk has one schema)
+ARROW_TYPES = {
+    'timestamp': "timestamp",
+    'passed': "bool",
+    'browser_opened': "bool",
+    'login_checked': "bool",
+    'duration_seconds': "float32",
+    'steps_count': "int32",
+    'screenshots_taken': "int32"
+}
+
+
+def _export_frame(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Chunk with typed columns and plain strings (same dtypes in every chunk)"""
+    chunk = chunk.copy()
+    for column in chunk.select_dtypes('category').columns:  # From the cached frame
+        chunk[column] = chunk[column].astype(str)
+    return compact_frame(chunk, categories=False)
+
+
+def _chunks(store: StorageBackend,
+            columns: Optional[List[str]],
+            since: Optional[str],
+            until: Optional[str],
+            chunk_size: int) -> Iterator[pd.DataFrame]:
+    unknown = set(columns or []) - set(HISTORY_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(sorted(unknown))}")
+    for chunk in store.iter_tests(chunk_size, columns=columns, since=since, until=until):
+        yield _export_frame(chunk)
+
+
+def arrow_schema(columns: Optional[List[str]] = None) -> "pa.Schema":
+    """Arrow schema of the history columns (strings unless typed in ARROW_TYPES)"""
+    if pa is None:
+        raise RuntimeError("Parquet/Arrow export needs pyarrow: pip install pyarrow")
+    types = {"timestamp": pa.timestamp("us"), "bool": pa.bool_(), "float32": pa.float32(), "int32": pa.int32()}
+    return pa.schema([(column, types[ARROW_TYPES[column]] if column in ARROW_TYPES else pa.string())
+                      for column in columns or HISTORY_COLUMNS])
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands over what was written since the last drain"""
+
+    def __init__(self):
+        super().__init__()
+        self._parts: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position  # Writers record offsets in their footers
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def csv_stream(store: StorageBackend,
+               columns: Optional[List[str]] = None,
+               since: Optional[str] = None,
+               until: Optional[str] = None,
+               chunk_size: int = CHUNK_ROWS) -> Iterator[bytes]:
+    """
+    Test history as CSV (UTF-8), one piece per chunk
+
+    Args:
+        store: Backend to read from
+        columns: History columns to export (all when None)
+        since: Earliest timestamp, e.g. "2024-06-01"
+        until: Latest timestamp, as a prefix ("2024-06-30" includes that day)
+        chunk_size: Rows read per chunk
+
+    Yields:
+        CSV bytes
+    """
+    header = True
+    for chunk in _chunks(store, columns, since, until, chunk_size):
+        yield chunk.to_csv(index=False, header=header).encode("utf-8")
+        header = False
+    if header:  # Empty history: header only
+        yield pd.DataFrame(columns=columns or HISTORY_COLUMNS).to_csv(index=False).encode("utf-8")
+
+
+def parquet_stream(store: StorageBackend,
+                   columns: Optional[List[str]] = None,
+                   since: Optional[str] = None,
+                   until: Optional[str] = None,
+                   chunk_size: int = CHUNK_ROWS) -> Iterator[bytes]:
+    """Test history as a Parquet file, one row group per chunk (arguments as in csv_stream)"""
+    schema = arrow_schema(columns)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    for chunk in _chunks(store, columns, since, until, chunk_size):
+        writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+        yield sink.drain()
+    writer.close()  # Footer
+    yield sink.drain()
+
+
+def arrow_stream(store: StorageBackend,
+                 columns: Optional[List[str]] = None,
+                 since: Optional[str] = None,
+                 until: Optional[str] = None,
+                 chunk_size: int = CHUNK_ROWS) -> Iterator[bytes]:
+    """Test history as an Arrow IPC stream, one record batch per chunk (arguments as in csv_stream)"""
+    schema = arrow_schema(columns)
+    sink = _ChunkSink()
+    writer = pa.ipc.new_stream(sink, schema)
+    for chunk in _chunks(store, columns, since, until, chunk_size):
+        writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+        yield sink.drain()
+    writer.close()  # End-of-stream marker
+    yield sink.drain()
+
+
+# format -> (stream, MIME type, file extension)
+FORMATS = {
+    "csv": (csv_stream, "text/csv", "csv"),
+    "parquet": (parquet_stream, "application/vnd.apache.parquet", "parquet"),
+    "arrow": (arrow_stream, "application/vnd.apache.arrow.stream", "arrows")
+}
+
+
+def write_stream(stream: Iterator[bytes], output_path: str) -> int:
+    """
+    Write a stream to a file (complete or not at all)
+
+    Args:
+        stream: Byte chunks, e.g. from csv_stream
+        output_path: Destination file
+
+    Returns:
+        Bytes written
+    """
+    temp_path = f"{output_path}.{os.getpid()}.tmp"
+    written = 0
+    try:
+        with open(temp_path, "wb") as f:
+            for data in stream:
+                f.write(data)
+                written += len(data)
+        os.replace(temp_path, output_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return written
@@ -0,0 +1,100 @@
+"""
+Full-Text Search
+Inverted index over test history (SQLite FTS5): instruction, errors,
+parsed steps (actions, URLs, selectors, queries) and the visited URL.
+Queries are compiled from a small search syntax into an FTS5 MATCH
+expression and ranked with BM25, instruction matches weighing most.
+
+Search syntax:
+    login failed        both words, any field
+    "add to cart"       phrase
+    pyth*               prefix
+    errors:timeout      one field (instruction, errors, steps, url;
+                        domain is an alias of url)
+    status:failed       exact status filter (not full-text)
+"""
+
+import re
+from typing import Dict, List, Tuple
+
+
+# Indexed fields and their BM25 weights
+SEARCH_FIELDS = {"instruction": 10.0, "errors": 5.0, "steps": 3.0, "url": 2.0}
+FIELD_ALIASES = {"domain": "url", "step": "steps", "error": "errors"}
+FILTER_FIELDS = ["status"]
+# History columns holding each field, for substring search without the index
+TEXT_COLUMNS = {"instruction": "instruction", "errors": "errors", "url": "url_visited"}
+
+FTS_SCHEMA = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS tests_fts USING fts5(
+    {', '.join(SEARCH_FIELDS)},
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+)
+"""
+
+BM25 = f"bm25(tests_fts, {', '.join(str(w) for w in SEARCH_FIELDS.values())})"
+
+# field:"quoted value" | field:value | "phrase" | word
+TOKEN_RE = re.compile(r'(?:(\w+):)?(?:"([^"]*)"|(\S+))')
+
+
+def steps_text(parsed_steps: List[Dict]) -> str:
+    """Searchable text of parsed steps: every field value, one step per line"""
+    lines = []
+    for step in parsed_steps or []:
+        if isinstance(step, dict):
+            lines.append(" ".join(str(value) for value in step.values() if value not in (None, "")))
+    return "\n".join(lines)
+
+
+def document(row: Dict) -> Tuple[str, str, str, str]:
+    """Index columns for a history row (steps_text comes from build_record)"""
+    return (row.get('instruction') or "", row.get('errors') or "",
+            row.get('steps_text') or "", row.get('url_visited') or "")
+
+
+def _quote(text: str) -> str:
+    return '"' + text.replace('"', '""') + '"'
+
+
+def parse_query(query: str) -> Tuple[List[Tuple[str, str, bool]], Dict[str, str]]:
+    """
+    Split search syntax into text terms and exact filters
+
+    Args:
+        query: User's search text
+
+    Returns:
+        ([(field or "", text, prefix)], {filter field: value})
+    """
+    terms, filters = [], {}
+    for field, quoted, word in TOKEN_RE.findall(query or ""):
+        field = FIELD_ALIASES.get(field.lower(), field.lower())
+        value = quoted if quoted else word
+        if field in FILTER_FIELDS:
+            filters[field] = value
+            continue
+        if field and field not in SEARCH_FIELDS:
+            value, field = f"{field}:{value}", ""  # Not a field: search the text as is
+
+        prefix = not quoted and value.endswith("*")
+        # Tokens only: FTS5 operators and punctuation are not query syntax here
+        text = " ".join(re.findall(r"\w+", value))
+        if text:
+            terms.append((field, text, prefix))
+    return terms, filters
+
+
+def compile_query(terms: List[Tuple[str, str, bool]]) -> str:
+    """FTS5 MATCH expression for parsed terms (all must match)"""
+    parts = []
+    for field, text, prefix in terms:
+        term = _quote(text) + ("*" if prefix else "")
+        parts.append(f"{field} : {term}" if field else term)
+    return " AND ".join(parts)
+
+
+def like_pattern(text: str) -> str:
+    """%text% with LIKE wildcards escaped (ESCAPE '\\')"""
+    return "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
@@ -0,0 +1,80 @@
+"""
+Test IDs
+ULID-style identifiers: 48-bit millisecond timestamp + 80 random bits in
+Crockford base32 (26 characters). They sort by creation time, never collide
+across sessions or processes in practice, and are monotonic within a
+process even when many are generated in the same millisecond.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+
+
+CROCKFORD = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+RANDOM_BITS = 80
+
+_lock = threading.Lock()
+_last_ms = -1
+_last_random = 0
+
+
+def _reset():
+    """Forget the last ID (a forked child must not continue the parent's sequence)"""
+    global _last_ms, _last_random
+    _last_ms, _last_random = -1, 0
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset)
+
+
+def encode(value: int, length: int = 26) -> str:
+    """Crockford base32, most significant character first"""
+    chars = []
+    for _ in range(length):
+        chars.append(CROCKFORD[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+
+def new_ulid() -> str:
+    """
+    Generate a new ULID
+
+    Within one millisecond the random part is incremented instead of
+    redrawn, so IDs from this process are strictly increasing.
+
+    Returns:
+        26-character ULID string
+    """
+    global _last_ms, _last_random
+    with _lock:
+        ms = int(time.time() * 1000)
+        if ms <= _last_ms:
+            ms, random_part = _last_ms, _last_random + 1
+            if random_part >> RANDOM_BITS:  # Random part exhausted: borrow the next millisecond
+                ms, random_part = ms + 1, int.from_bytes(os.urandom(10), "big") >> 1
+        else:
+            random_part = int.from_bytes(os.urandom(10), "big")
+        _last_ms, _last_random = ms, random_part
+    return encode((ms << RANDOM_BITS) | random_part)
+
+
+def ulid_ms(ulid: str) -> int:
+    """Creation time encoded in a ULID, in ms since the epoch"""
+    value = 0
+    for char in ulid[:10].upper():
+        value = value * 32 + CROCKFORD.index(char)
+    return value
+
+
+def ulid_timestamp(ulid: str) -> datetime:
+    """Creation time encoded in a ULID, as naive local time (like the history timestamps)"""
+    return datetime.fromtimestamp(ulid_ms(ulid) / 1000)
+
+
+def is_ulid(value: str) -> bool:
+    """Whether a test_id is a ULID (older IDs are %Y%m%d_%H%M%S timestamps)"""
+    return len(value) == 26 and all(char in CROCKFORD for char in value.upper())
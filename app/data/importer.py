@@ -0,0 +1,353 @@
+"""
+Bulk Importer
+Migrates legacy history into the configured store: JSON logs from
+test_logs/, test_history.xlsx and test_history.csv. Sources are parsed and
+normalized in a process pool (one task per table file, per group of logs),
+merged by test_id, then loaded in batched transactions.
+
+Normalization (legacy rows have drifted over time):
+    - Windows paths (app/generated_tests\\test_x.py) use forward slashes
+    - empty durations / counts become 0, text booleans ("True") bools
+    - timestamps become "YYYY-MM-DD HH:MM:SS" (ISO, Excel dates, or the
+      legacy test_id when missing)
+    - missing status follows from passed
+
+Re-running is safe: test_ids already in the store are skipped, and logs
+are archived before their rows are inserted (source files are kept).
+
+Usage: python -m app.data.importer [--dry-run] [--workers N] [sources...]
+"""
+
+import glob
+import json
+import os
+import re
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from app.data.fulltext import steps_text
+from app.data.ids import is_ulid, ulid_timestamp
+from app.data.storage import BOOL_COLUMNS, HISTORY_COLUMNS, StorageBackend
+
+
+DEFAULT_SOURCES = ["test_logs", "test_history.xlsx", "test_history.csv"]
+LOGS_PER_TASK = 200
+BATCH_SIZE = 1000
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+TIMESTAMP_RE = re.compile(r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}$")
+LEGACY_ID_RE = re.compile(r"^(\d{8})_(\d{6})")
+TRUE_TEXT = {"true", "1", "yes", "y", "t"}
+
+Record = Tuple[Dict, Optional[Dict]]  # (history row, log or None)
+
+
+def _blank(value) -> bool:
+    return value is None or (isinstance(value, float) and value != value) or \
+        (isinstance(value, str) and not value.strip())
+
+
+def _timestamp(value, test_id: str, fixes: Counter) -> Optional[str]:
+    """Canonical timestamp; from a legacy test_id (YYYYMMDD_HHMMSS) when missing"""
+    if _blank(value):
+        if is_ulid(test_id):
+            return ulid_timestamp(test_id).strftime(TIMESTAMP_FORMAT)
+        match = LEGACY_ID_RE.match(test_id)
+        if not match:
+            return None
+        fixes["timestamp from test_id"] += 1
+        return datetime.strptime("".join(match.groups()), "%Y%m%d%H%M%S").strftime(TIMESTAMP_FORMAT)
+    text = str(value).strip()
+    if TIMESTAMP_RE.match(text):
+        return text
+    try:
+        canonical = pd.Timestamp(value).strftime(TIMESTAMP_FORMAT)
+    except (ValueError, TypeError):
+        fixes["unparseable timestamp"] += 1
+        return None
+    if not isinstance(value, (datetime, pd.Timestamp)):
+        fixes["timestamp format"] += 1
+    return canonical
+
+
+def normalize_row(raw: Dict, fixes: Counter) -> Optional[Dict]:
+    """
+    History row from a legacy row; unknown values stay None (filled by
+    finalize_row once every source is merged)
+
+    Args:
+        raw: Row as read from a table or derived from a log
+        fixes: Counter of the normalizations applied (updated)
+
+    Returns:
+        Normalized row, or None without a test_id
+    """
+    test_id = "" if _blank(raw.get('test_id')) else str(raw['test_id']).strip()
+    if test_id.endswith(".0") and test_id[:-2].isdigit():  # Numeric cell in a spreadsheet
+        test_id = test_id[:-2]
+    if not test_id:
+        fixes["rows without test_id"] += 1
+        return None
+
+    row = {column: None if _blank(raw.get(column)) else raw[column] for column in HISTORY_COLUMNS}
+    row['test_id'] = test_id
+    row['timestamp'] = _timestamp(raw.get('timestamp'), test_id, fixes)
+
+    for column in BOOL_COLUMNS:
+        value = row[column]
+        if isinstance(value, str):
+            fixes["text booleans"] += 1
+            row[column] = value.strip().lower() in TRUE_TEXT
+        elif value is not None:
+            row[column] = bool(value)
+
+    if row['duration_seconds'] is None:
+        fixes["empty durations"] += 1
+    else:
+        try:
+            row['duration_seconds'] = float(row['duration_seconds'])
+        except ValueError:
+            fixes["empty durations"] += 1
+            row['duration_seconds'] = None
+    for column in ('steps_count', 'screenshots_taken'):
+        if row[column] is not None:
+            try:
+                row[column] = int(float(row[column]))
+            except ValueError:
+                row[column] = None
+
+    for column in ('code_file_path', 'log_file_path'):
+        if isinstance(row[column], str) and "\\" in row[column]:
+            fixes["windows paths"] += 1
+            row[column] = row[column].replace("\\", "/")
+    for column in ('instruction', 'status', 'url_visited', 'login_status', 'errors'):
+        if row[column] is not None:
+            row[column] = str(row[column])
+    if row['status'] is not None:
+        row['status'] = row['status'].strip().lower()
+    return row
+
+
+def row_from_log(log: Dict, path: str) -> Dict:
+    """Raw history row of a legacy JSON log (same fields save_test_result writes)"""
+    execution = log.get('execution') or {}
+    metadata = log.get('metadata') or {}
+    browser = log.get('browser_state') or {}
+    login_checked = metadata.get('login_checked')
+    logged_in = browser.get('logged_in')
+    return {
+        'test_id': log.get('test_id') or os.path.splitext(os.path.basename(path))[0],
+        'timestamp': log.get('timestamp'),
+        'instruction': log.get('instruction'),
+        'status': execution.get('status'),
+        'passed': execution.get('passed'),
+        'duration_seconds': execution.get('duration_seconds'),
+        'steps_count': metadata.get('steps_count', len(log.get('parsed_steps') or [])),
+        'browser_opened': browser.get('browser_open'),
+        'url_visited': browser.get('current_url'),
+        'login_checked': login_checked,
+        'login_status': None if login_checked is None else
+        'Logged In' if logged_in else 'Not Logged In' if login_checked else 'N/A',
+        'screenshots_taken': metadata.get('screenshots_taken'),
+        'errors': (execution.get('errors') or "")[:500],
+        'code_file_path': log.get('code_file_path'),
+        'log_file_path': path
+    }
+
+
+def finalize_row(row: Dict) -> Dict:
+    """Defaults for values no source had"""
+    if row['passed'] is None:
+        row['passed'] = row['status'] == "passed"
+    if row['status'] is None:
+        row['status'] = "passed" if row['passed'] else "failed"
+    for column in BOOL_COLUMNS:
+        row[column] = bool(row[column])
+    for column, default in (('duration_seconds', 0.0), ('steps_count', 0), ('screenshots_taken', 0),
+                            ('instruction', ""), ('url_visited', ""), ('errors', ""),
+                            ('code_file_path', ""), ('log_file_path', "")):
+        if row[column] is None:
+            row[column] = default
+    if row['login_status'] is None:
+        row['login_status'] = "N/A"
+    return row
+
+
+# ==================== SCANNING (worker processes) ====================
+
+def _scan_logs(paths: List[str]) -> Tuple[List[Record], Counter, List[str]]:
+    records, fixes, errors = [], Counter(), []
+    for path in paths:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                log = json.load(f)
+        except (OSError, ValueError) as e:
+            errors.append(f"{path}: {e}")
+            continue
+        row = normalize_row(row_from_log(log, path), fixes)
+        if row is not None:
+            row['steps_text'] = steps_text(log.get('parsed_steps'))
+            records.append((row, log))
+    return records, fixes, errors
+
+
+def _scan_table(path: str) -> Tuple[List[Record], Counter, List[str]]:
+    fixes = Counter()
+    try:
+        if path.endswith((".xlsx", ".xls")):
+            df = pd.read_excel(path, dtype=object)
+        else:
+            df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    except Exception as e:
+        return [], fixes, [f"{path}: {e}"]
+    records = []
+    for raw in df.to_dict('records'):
+        row = normalize_row(raw, fixes)
+        if row is not None:
+            records.append((row, None))
+    return records, fixes, []
+
+
+def plan_tasks(sources: Iterable[str]) -> List[Tuple]:
+    """Pool tasks for the sources: (function, argument)"""
+    tasks = []
+    for source in sources:
+        if os.path.isdir(source):
+            # Top-level JSON logs only (the archive's shards are already imported)
+            paths = sorted(glob.glob(os.path.join(source, "*.json")))
+            tasks.extend((_scan_logs, paths[i:i + LOGS_PER_TASK]) for i in range(0, len(paths), LOGS_PER_TASK))
+        elif os.path.exists(source):
+            tasks.append((_scan_table, source))
+    return tasks
+
+
+# ==================== IMPORT ====================
+
+def merge_records(results: Iterable[List[Record]]) -> Dict[str, Record]:
+    """One record per test_id: each column from the first source that has it"""
+    merged: Dict[str, Record] = {}
+    for records in results:
+        for row, log in records:
+            if row['test_id'] not in merged:
+                merged[row['test_id']] = (row, log)
+                continue
+            kept, kept_log = merged[row['test_id']]
+            for column, value in row.items():
+                if kept.get(column) is None:
+                    kept[column] = value
+            merged[row['test_id']] = (kept, kept_log or log)
+    return merged
+
+
+def import_history(store: StorageBackend,
+                   sources: Optional[List[str]] = None,
+                   workers: Optional[int] = None,
+                   batch_size: int = BATCH_SIZE,
+                   dry_run: bool = False) -> Dict:
+    """
+    Import legacy history into a store
+
+    Args:
+        store: Backend to load into
+        sources: Log directories and .xlsx/.csv files (DEFAULT_SOURCES when None);
+                 for a test_id in several, earlier sources win per column
+        workers: Scanning processes (CPU count when None)
+        batch_size: Rows per insert transaction
+        dry_run: Scan and normalize only (nothing is inserted; planned
+                 says how many rows would be)
+
+    Returns:
+        Report: counts (planned = new rows to load, inserted = rows loaded),
+        normalizations applied, errors and throughput
+    """
+    sources = sources or DEFAULT_SOURCES
+    tasks = plan_tasks(sources)
+    started = time.perf_counter()
+
+    # Results are merged in task order, so source precedence does not depend on scheduling
+    results: List[Optional[List[Record]]] = [None] * len(tasks)
+    fixes, errors = Counter(), []
+    if len(tasks) > 1 and workers != 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(function, argument): i for i, (function, argument) in enumerate(tasks)}
+            for future in as_completed(futures):
+                records, task_fixes, task_errors = future.result()
+                results[futures[future]] = records
+                fixes.update(task_fixes)
+                errors.extend(task_errors)
+    else:
+        for i, (function, argument) in enumerate(tasks):
+            records, task_fixes, task_errors = function(argument)
+            results[i] = records
+            fixes.update(task_fixes)
+            errors.extend(task_errors)
+    scanned = sum(len(records) for records in results)
+    merged = merge_records(results)
+    scan_seconds = time.perf_counter() - started
+
+    # Idempotent: skip what the store already has
+    started = time.perf_counter()
+    existing = set()
+    for chunk in store.iter_tests(columns=['test_id']):
+        existing.update(chunk['test_id'])
+    new = [merged[test_id] for test_id in merged if test_id not in existing]
+    undated = [record for record in new if record[0]['timestamp'] is None]
+    if undated:
+        fixes["rows without timestamp (skipped)"] += len(undated)
+        new = [record for record in new if record[0]['timestamp'] is not None]
+    new.sort(key=lambda record: (record[0]['timestamp'] or "", record[0]['test_id']))
+
+    inserted = 0
+    for start in range(0, len(new), batch_size):
+        batch = new[start:start + batch_size]
+        rows = []
+        for row, log in batch:
+            if log is not None and not dry_run:
+                # Log first: a crash before the insert re-archives it on the next run
+                row['log_file_path'] = store.write_log(row['test_id'], log)
+            rows.append(finalize_row(row))
+        if not dry_run:
+            store.write_rows(rows)
+            inserted += len(rows)
+    load_seconds = time.perf_counter() - started
+
+    return {
+        "sources": len(tasks), "scanned": scanned, "unique": len(merged),
+        "planned": len(new), "inserted": inserted, "skipped": len(merged) - len(new) - len(undated), "fixes": dict(fixes), "errors": errors,
+        "scan_seconds": scan_seconds, "load_seconds": load_seconds,
+        "scan_rate": scanned / scan_seconds if scan_seconds else 0.0,
+        "load_rate": len(new) / load_seconds if load_seconds else 0.0,
+        "dry_run": dry_run
+    }
+
+
+if __name__ == "__main__":
+    import sys
+
+    from app.data.storage import create_data_manager
+
+    args = sys.argv[1:]
+    dry_run = "--dry-run" in args
+    workers = None
+    if "--workers" in args:
+        workers = int(args[args.index("--workers") + 1])
+        del args[args.index("--workers"):args.index("--workers") + 2]
+    sources = [arg for arg in args if not arg.startswith("--")] or None
+
+    store = create_data_manager()
+    report = import_history(store, sources, workers=workers, dry_run=dry_run)
+
+    print(f"📥 {'Dry run: ' if dry_run else ''}{report['scanned']} records from {report['sources']} tasks, "
+          f"{report['unique']} unique test_ids")
+    print(f"   Scan: {report['scan_seconds']:.2f}s ({report['scan_rate']:.0f} records/s)")
+    loaded = f"{report['planned']} would be inserted" if dry_run else f"{report['inserted']} inserted"
+    print(f"   Load: {loaded}, {report['skipped']} already stored, "
+          f"{report['load_seconds']:.2f}s ({report['load_rate']:.0f} rows/s) into {store.name}")
+    for fix, count in sorted(report['fixes'].items()):
+        print(f"   🔧 {fix}: {count}")
+    for error in report['errors']:
+        print(f"   ❌ {error}")
@@ -0,0 +1,269 @@
+"""
+Log Archive
+Compressed, date-sharded store for the detailed per-run logs.
+
+Layout (under the logs directory):
+    2024/06/01.logs   compressed frames of every run of that day, appended
+    2024/06/01.idx    one JSON line per run: test_id -> frame of each field
+    code/ab/<sha256>  generated code, stored once per distinct content
+    <test_id>.json    legacy uncompressed logs (still readable)
+
+Every top-level field of a log is its own zstd frame (gzip when the
+zstandard package is missing), so reading one field decompresses only
+that field. Generated code is replaced by a reference to its content hash.
+The shard of a run follows from its test_id (ULIDs carry their creation
+time; shards are UTC days, so they do not move with the machine's time
+zone), so get_test_by_id reads one day's index (cached) and seeks.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections.abc import Mapping
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional, Tuple
+
+from app.data.ids import is_ulid, ulid_ms, ulid_timestamp
+from app.data.storage import file_lock
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+CODEC = "zstd" if zstandard is not None else "gzip"
+CODE_FIELD = "generated_code"
+CODE_DIR = "code"
+COMPRESSION_LEVEL = 6
+
+
+def compress(data: bytes, codec: str = CODEC) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=COMPRESSION_LEVEL).compress(data)
+    return gzip.compress(data, compresslevel=COMPRESSION_LEVEL, mtime=0)
+
+
+def decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Log archived with zstd: pip install zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def shard_of(test_id: str) -> Tuple[str, str, str]:
+    """(year, month, day) shard of a run; UTC day for ULIDs, legacy timestamp IDs start with YYYYMMDD"""
+    if is_ulid(test_id):
+        created = datetime.fromtimestamp(ulid_ms(test_id) / 1000, tz=timezone.utc)
+        return tuple(created.strftime("%Y %m %d").split())
+    if len(test_id) >= 8 and test_id[:8].isdigit():
+        return test_id[:4], test_id[4:6], test_id[6:8]
+    return "undated", "00", "00"
+
+
+class LazyLog(Mapping):
+    """A run's log whose fields are read and decompressed on first access"""
+
+    def __init__(self, archive: "LogArchive", shard: str, entry: Dict):
+        self._archive = archive
+        self._shard = shard
+        self._entry = entry
+        self._values: Dict = {}
+
+    def __getitem__(self, field: str):
+        if field not in self._values:
+            if field not in self._entry["fields"]:
+                raise KeyError(field)
+            self._values[field] = self._archive.read_field(self._shard, self._entry, field)
+        return self._values[field]
+
+    def __iter__(self):
+        return iter(self._entry["fields"])
+
+    def __len__(self):
+        return len(self._entry["fields"])
+
+    def to_dict(self) -> Dict:
+        """Every field, decompressed"""
+        return {field: self[field] for field in self}
+
+
+class LogArchive:
+    """Date-sharded archive of compressed run logs"""
+
+    def __init__(self, root: str = "test_logs", codec: str = CODEC):
+        """
+        Args:
+            root: Logs directory
+            codec: zstd or gzip for new frames (existing frames keep theirs)
+        """
+        self.root = root
+        self.codec = codec
+        self._indexes: Dict[str, Tuple[int, Dict[str, Dict]]] = {}  # idx path -> (bytes read, entries)
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def shard_path(self, test_id: str) -> str:
+        """Shard file of a run, without extension"""
+        return os.path.join(self.root, *shard_of(test_id))
+
+    def location(self, test_id: str) -> str:
+        """Where a run's log is (stored in the log_file_path column)"""
+        return f"{self.shard_path(test_id)}.logs#{test_id}"
+
+    # ==================== WRITING ====================
+
+    def store_code(self, code: str) -> str:
+        """Store generated code once per content; returns its hash"""
+        digest = hashlib.sha256(code.encode("utf-8")).hexdigest()
+        path = os.path.join(self.root, CODE_DIR, digest[:2], digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(compress(code.encode("utf-8"), "gzip"))
+            os.replace(temp_path, path)
+        return digest
+
+    def write(self, test_id: str, log_data: Dict) -> str:
+        """
+        Append a run's log to its shard
+
+        Args:
+            test_id: Run identifier
+            log_data: Detailed log (JSON-serializable)
+
+        Returns:
+            Log location (shard path + "#" + test_id); a run already in the
+            archive (journal replay, repeated import) is not written again
+        """
+        shard = self.shard_path(test_id)
+        if test_id in self._index(shard):
+            return self.location(test_id)
+
+        frames = {}
+        for field, value in log_data.items():
+            if field == CODE_FIELD and isinstance(value, str) and value:
+                value = {"$code": self.store_code(value)}
+            data = json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+            frames[field] = compress(data.encode("utf-8"), self.codec)
+
+        os.makedirs(os.path.dirname(shard), exist_ok=True)
+        with file_lock(shard):  # One appender per shard, across processes
+            if test_id in self._index(shard):  # Written by another process meanwhile
+                return self.location(test_id)
+            with open(f"{shard}.logs", "ab") as f:
+                offset = f.seek(0, os.SEEK_END)
+                fields = {}
+                for field, frame in frames.items():
+                    fields[field] = [offset, len(frame)]
+                    offset += len(frame)
+                f.write(b"".join(frames.values()))
+            # The index line goes last: readers never see a run before its frames
+            with open(f"{shard}.idx", "a", encoding="utf-8") as f:
+                f.write(json.dumps({"id": test_id, "codec": self.codec, "fields": fields},
+                                   separators=(",", ":")) + "\n")
+        return self.location(test_id)
+
+    # ==================== READING ====================
+
+    def _index(self, shard: str) -> Dict[str, Dict]:
+        """A shard's index, read incrementally as the shard grows"""
+        path = f"{shard}.idx"
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return {}
+        with self._lock:
+            read, entries = self._indexes.get(path, (0, {}))
+            if size < read:  # Shard was cleared and recreated
+                read, entries = 0, {}
+            if size > read:
+                with open(path, "rb") as f:
+                    f.seek(read)
+                    chunk = f.read(size - read)
+                complete = chunk.rfind(b"\n") + 1  # Skip a line being written
+                for line in chunk[:complete].splitlines():
+                    entry = json.loads(line)
+                    entries[entry["id"]] = entry
+                self._indexes[path] = (read + complete, entries)
+            return entries
+
+    def read_field(self, shard: str, entry: Dict, field: str):
+        """Decompress one field of a run"""
+        offset, length = entry["fields"][field]
+        with open(f"{shard}.logs", "rb") as f:
+            f.seek(offset)
+            value = json.loads(decompress(f.read(length), entry["codec"]))
+        if field == CODE_FIELD and isinstance(value, dict) and "$code" in value:
+            value = self.load_code(value["$code"])
+        return value
+
+    def load_code(self, digest: str) -> str:
+        path = os.path.join(self.root, CODE_DIR, digest[:2], digest)
+        with open(path, "rb") as f:
+            return gzip.decompress(f.read()).decode("utf-8")
+
+    def open(self, test_id: str) -> Optional[Mapping]:
+        """A run's log with lazily loaded fields (legacy JSON logs are read whole)"""
+        shards = [self.shard_path(test_id)]
+        if is_ulid(test_id):  # Archives written before shards were UTC used local days
+            shards.append(os.path.join(self.root, *ulid_timestamp(test_id).strftime("%Y %m %d").split()))
+        for shard in shards:
+            entry = self._index(shard).get(test_id)
+            if entry is not None:
+                return LazyLog(self, shard, entry)
+
+        legacy = os.path.join(self.root, f"{test_id}.json")
+        if os.path.exists(legacy):
+            with open(legacy, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return None
+
+    def read(self, test_id: str, fields: Optional[Iterable[str]] = None) -> Optional[Dict]:
+        """
+        Load a run's log
+
+        Args:
+            test_id: Run identifier
+            fields: Top-level fields to load (all when None)
+
+        Returns:
+            Log dictionary, or None when the run has no log
+        """
+        log = self.open(test_id)
+        if log is None:
+            return None
+        wanted = list(log) if fields is None else [f for f in fields if f in log]
+        return {field: log[field] for field in wanted}
+
+    def count(self) -> int:
+        """Archived and legacy logs"""
+        total = 0
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                if name.endswith(".idx"):
+                    with open(os.path.join(directory, name), "rb") as f:
+                        total += sum(1 for _ in f)
+                elif name.endswith(".json") and directory == self.root:
+                    total += 1
+        return total
+
+    def disk_bytes(self) -> int:
+        return sum(os.path.getsize(os.path.join(directory, name))
+                   for directory, _, files in os.walk(self.root) for name in files)
+
+    def clear(self):
+        """Delete every log"""
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+        with self._lock:
+            self._indexes.clear()
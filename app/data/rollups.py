@@ -0,0 +1,155 @@
+"""
+Statistics Rollups
+Aggregates of test history maintained on write: one row per (granularity,
+bucket, domain, status) with counters and a duration sketch. The "all"
+granularity holds the running totals behind get_statistics; "hour" and
+"day" buckets back the dashboard charts. Reading a rollup costs the number
+of buckets asked for, whatever the size of the history.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from app.data.sketches import DDSketch
+from app.executor.timeout_model import domain_of
+
+
+GRANULARITIES = ["hour", "day", "all"]
+PERCENTILES = [0.5, 0.9, 0.99]
+COUNTERS = ["count", "passed", "duration_sum", "steps", "login_checks", "screenshots"]
+
+RollupKey = Tuple[str, str, str, str]  # granularity, bucket, domain, status
+
+
+def bucket_of(timestamp, granularity: str) -> str:
+    """Bucket label: "YYYY-MM-DD HH:00" (hour), "YYYY-MM-DD" (day), "" (all)"""
+    if granularity == "all":
+        return ""
+    text = str(timestamp)
+    if len(text) < 13 or text[4] != "-":
+        text = pd.to_datetime(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+    return text[:10] if granularity == "day" else f"{text[:10]} {text[11:13]}:00"
+
+
+class Rollup:
+    """Counters and duration sketch of one bucket"""
+
+    def __init__(self):
+        self.count = 0
+        self.passed = 0
+        self.duration_sum = 0.0
+        self.steps = 0
+        self.login_checks = 0
+        self.screenshots = 0
+        self.sketch = DDSketch()
+
+    def add_row(self, row: Dict):
+        """Count one history row"""
+        duration = row.get('duration_seconds') or 0.0
+        if duration != duration:  # NaN
+            duration = 0.0
+        self.count += 1
+        self.passed += int(bool(row.get('passed')))
+        self.duration_sum += duration
+        self.steps += int(row.get('steps_count') or 0)
+        self.login_checks += int(bool(row.get('login_checked')))
+        self.screenshots += int(row.get('screenshots_taken') or 0)
+        self.sketch.add(duration)
+
+    def merge(self, other: "Rollup") -> "Rollup":
+        for counter in COUNTERS:
+            setattr(self, counter, getattr(self, counter) + getattr(other, counter))
+        self.sketch.merge(other.sketch)
+        return self
+
+
+def rollup_keys(row: Dict) -> List[RollupKey]:
+    """Every bucket a history row counts in"""
+    domain = domain_of(row.get('url_visited') or "")
+    status = row.get('status') or "unknown"
+    return [(granularity, bucket_of(row['timestamp'], granularity), domain, status)
+            for granularity in GRANULARITIES]
+
+
+def aggregate(rows: Iterable[Dict]) -> Dict[RollupKey, Rollup]:
+    """Rollups of a set of rows (a write batch, or a full rebuild)"""
+    rollups: Dict[RollupKey, Rollup] = {}
+    for row in rows:
+        for key in rollup_keys(row):
+            rollup = rollups.get(key)
+            if rollup is None:
+                rollup = rollups[key] = Rollup()
+            rollup.add_row(row)
+    return rollups
+
+
+def statistics_from(rollups: Iterable[Rollup]) -> Dict:
+    """get_statistics() dictionary from the "all" rollups"""
+    total = Rollup()
+    for rollup in rollups:
+        total.merge(rollup)
+    return {
+        'total_tests': total.count,
+        'passed': total.passed,
+        'failed': total.count - total.passed,
+        'pass_rate': total.passed / total.count * 100 if total.count else 0.0,
+        'avg_duration': total.duration_sum / total.count if total.count else 0.0,
+        'total_steps': total.steps,
+        'login_checks': total.login_checks,
+        'screenshots': total.screenshots,
+        'p50_duration': total.sketch.quantile(0.5) or 0.0,
+        'p90_duration': total.sketch.quantile(0.9) or 0.0,
+        'p99_duration': total.sketch.quantile(0.99) or 0.0
+    }
+
+
+def rollup_frame(rollups: Iterable[Tuple[RollupKey, Rollup]],
+                 by: Tuple[str, ...] = ("bucket",)) -> pd.DataFrame:
+    """
+    Merge rollups over the dimensions not in `by` and tabulate them
+
+    Args:
+        rollups: (key, rollup) pairs of one granularity (merged in place)
+        by: Dimensions kept: any of bucket, domain, status
+
+    Returns:
+        DataFrame with the `by` columns, count, passed, pass_rate,
+        avg_duration and p50/p90/p99 duration, sorted by `by`
+    """
+    merged: Dict[Tuple, Rollup] = {}
+    for (_, bucket, domain, status), rollup in rollups:
+        dims = {"bucket": bucket, "domain": domain, "status": status}
+        group = tuple(dims[name] for name in by)
+        if group in merged:
+            merged[group].merge(rollup)
+        else:
+            merged[group] = rollup  # Rollups passed in are not reused by callers
+
+    records = []
+    for group, rollup in sorted(merged.items()):
+        record = dict(zip(by, group))
+        record.update({
+            'count': rollup.count,
+            'passed': rollup.passed,
+            'pass_rate': rollup.passed / rollup.count * 100 if rollup.count else 0.0,
+            'avg_duration': rollup.duration_sum / rollup.count if rollup.count else 0.0
+        })
+        for q, value in zip(PERCENTILES, rollup.sketch.quantiles(PERCENTILES)):
+            record[f'p{int(q * 100)}_duration'] = value
+        records.append(record)
+    return pd.DataFrame(records, columns=list(by) + ['count', 'passed', 'pass_rate', 'avg_duration'] +
+                        [f'p{int(q * 100)}_duration' for q in PERCENTILES])
+
+
+def in_range(key: RollupKey,
+             since: Optional[str] = None,
+             until: Optional[str] = None,
+             domain: Optional[str] = None,
+             status: Optional[str] = None) -> bool:
+    """Whether a rollup key matches get_rollups filters (bucket strings compare as dates)"""
+    _, bucket, key_domain, key_status = key
+    return ((since is None or bucket >= since[:len(bucket)]) and
+            (until is None or bucket <= until[:len(bucket)]) and
+            (domain is None or key_domain == domain) and
+            (status is None or key_status == status))
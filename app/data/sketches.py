@@ -0,0 +1,112 @@
+"""
+Quantile Sketches
+DDSketch: a small, mergeable summary of a distribution whose quantiles are
+within a relative error alpha of the exact value. Values land in
+logarithmic buckets (bucket i covers (gamma^(i-1), gamma^i]), so a sketch
+of any number of durations stays a few hundred counters, and the sketches
+of hourly buckets merge into daily or yearly ones without the raw data.
+"""
+
+import json
+import math
+from typing import Dict, List, Optional
+
+
+DEFAULT_ALPHA = 0.01  # 1% relative error
+MIN_VALUE = 1e-3  # Smaller values (and zero) share one bucket
+
+
+class DDSketch:
+    """Mergeable quantile sketch with relative-error guarantees"""
+
+    def __init__(self, alpha: float = DEFAULT_ALPHA):
+        """
+        Args:
+            alpha: Relative accuracy of quantiles
+        """
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _key(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def add(self, value: float, weight: int = 1):
+        """Add a non-negative value"""
+        if value is None or value != value:  # None / NaN
+            return
+        value = max(float(value), 0.0)
+        if value < MIN_VALUE:
+            self.zero_count += weight
+        else:
+            key = self._key(value)
+            self.bins[key] = self.bins.get(key, 0) + weight
+        self.count += weight
+        self.total += value * weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other: "DDSketch") -> "DDSketch":
+        """Add another sketch (same alpha) into this one"""
+        if other.alpha != self.alpha:
+            raise ValueError("Cannot merge sketches with different alpha")
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Value at quantile q (0-1), None when empty"""
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if rank < seen:
+                # Middle of the bucket: within alpha of every value in it
+                value = 2 * self.gamma ** key / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def quantiles(self, qs: List[float]) -> List[Optional[float]]:
+        """Several quantiles at once"""
+        return [self.quantile(q) for q in qs]
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    def to_json(self) -> str:
+        """Compact serialization (stored in rollup rows)"""
+        return json.dumps({
+            "a": self.alpha, "k": list(self.bins), "c": list(self.bins.values()),
+            "z": self.zero_count, "n": self.count, "s": self.total, "lo": self.min if self.count else None, "hi": self.max if self.count else None
+        }, separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, data: Optional[str]) -> "DDSketch":
+        """Inverse of to_json; empty sketch for None"""
+        if not data:
+            return cls()
+        raw = json.loads(data)
+        sketch = cls(raw["a"])
+        sketch.bins = dict(zip(raw["k"], raw["c"]))
+        sketch.zero_count = raw["z"]
+        sketch.count = raw["n"]
+        sketch.total = raw["s"]
+        if raw["lo"] is not None:
+            sketch.min, sketch.max = raw["lo"], raw["hi"]
+        return sketch
@@ -0,0 +1,403 @@
+"""
+SQLite Result Store
+Append-only test history in an SQLite database in WAL mode. Saving a run
+is a single indexed INSERT (instead of rewriting a whole workbook), and
+statistics, search and "recent tests" are answered by SQL over indexes on
+test_id, timestamp, status and url. Statistics rollups (see rollups.py)
+and the full-text index (see fulltext.py) are updated in the same
+transaction as the rows they cover.
+"""
+
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from app.data.fulltext import (BM25, FTS_SCHEMA, TEXT_COLUMNS, compile_query, document, like_pattern,
+                               parse_query, steps_text)
+from app.data.rollups import COUNTERS, Rollup, RollupKey, aggregate
+from app.data.sketches import DDSketch
+from app.executor.timeout_model import domain_of
+from app.data.storage import (HISTORY_COLUMNS, StorageBackend, compact_frame, decode_cursor, encode_cursor,
+                              until_bound)
+
+
+DB_PATH = os.getenv("TEST_HISTORY_DB", "test_history.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tests (
+    id INTEGER PRIMARY KEY,
+    test_id TEXT NOT NULL UNIQUE,
+    timestamp TEXT NOT NULL,
+    instruction TEXT,
+    status TEXT,
+    passed INTEGER,
+    duration_seconds REAL,
+    steps_count INTEGER,
+    browser_opened INTEGER,
+    url_visited TEXT,
+    login_checked INTEGER,
+    login_status TEXT,
+    screenshots_taken INTEGER,
+    errors TEXT,
+    code_file_path TEXT,
+    log_file_path TEXT,
+    domain TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_tests_timestamp ON tests (timestamp);
+CREATE INDEX IF NOT EXISTS idx_tests_status ON tests (status);
+CREATE INDEX IF NOT EXISTS idx_tests_url ON tests (url_visited);
+CREATE TABLE IF NOT EXISTS rollups (
+    granularity TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    status TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    passed INTEGER NOT NULL,
+    duration_sum REAL NOT NULL,
+    steps INTEGER NOT NULL,
+    login_checks INTEGER NOT NULL,
+    screenshots INTEGER NOT NULL,
+    sketch TEXT NOT NULL,
+    PRIMARY KEY (granularity, bucket, domain, status)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', 0);
+"""
+
+# Newest-first pages per status / domain: (filter, timestamp) entries end in
+# the row id, so "ORDER BY timestamp DESC, id DESC LIMIT n" reads n entries
+PAGE_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_tests_status_timestamp ON tests (status, timestamp);
+CREATE INDEX IF NOT EXISTS idx_tests_domain_timestamp ON tests (domain, timestamp);
+"""
+
+# Backfills of databases from before a feature existed. Each one sets its
+# meta marker ('migrated_<name>') in the transaction that does the work, so
+# a migration interrupted after its DDL is simply run again on next open.
+MIGRATIONS = ["domains", "rollups", "search_index"]
+
+COLUMN_LIST = ", ".join(HISTORY_COLUMNS)
+INSERT_SQL = (f"INSERT OR IGNORE INTO tests ({COLUMN_LIST}, domain) "
+              f"VALUES ({', '.join('?' for _ in HISTORY_COLUMNS)}, ?)")
+ROLLUP_COLUMNS = ", ".join(COUNTERS)
+UPSERT_ROLLUP_SQL = (f"INSERT OR REPLACE INTO rollups (granularity, bucket, domain, status, {ROLLUP_COLUMNS}, sketch) "
+                     f"VALUES (?, ?, ?, ?, {', '.join('?' for _ in COUNTERS)}, ?)")
+
+
+class SQLiteDataManager(StorageBackend):
+    """Test history in an append-only SQLite (WAL) database"""
+
+    name = "SQLite"
+    incremental_reads = True  # Rows only ever get larger ids
+
+    def __init__(self,
+                 db_path: str = DB_PATH,
+                 logs_dir: str = "test_logs",
+                 screenshots_dir: str = "screenshots"):
+        """
+        Initialize store
+
+        Args:
+            db_path: Path to the SQLite database
+            logs_dir: Directory for detailed logs (compressed archive)
+            screenshots_dir: Directory for screenshots
+        """
+        super().__init__(logs_dir, screenshots_dir)
+        self.db_path = db_path
+        self._local = threading.local()  # One connection per thread
+        with self.connect() as conn:
+            conn.executescript(SCHEMA)
+            # Databases from before the domain column existed
+            if "domain" not in [column[1] for column in conn.execute("PRAGMA table_info(tests)")]:
+                conn.execute("ALTER TABLE tests ADD COLUMN domain TEXT")
+            conn.executescript(PAGE_INDEXES)
+            try:
+                conn.execute(FTS_SCHEMA)
+                self.fts = True
+            except sqlite3.OperationalError:
+                print(" SQLite built without FTS5: search falls back to LIKE")
+                self.fts = False
+            done = {key for (key,) in conn.execute("SELECT key FROM meta WHERE key LIKE 'migrated_%'")}
+            pending = [name for name in MIGRATIONS if f"migrated_{name}" not in done]
+            if pending and not conn.execute("SELECT EXISTS (SELECT 1 FROM tests)").fetchone()[0]:
+                for name in pending:  # Nothing to backfill: new rows maintain everything
+                    if name != "search_index" or self.fts:
+                        self._mark_migrated(conn, name)
+                pending = []
+        if "domains" in pending:
+            self.backfill_domains()
+        if "rollups" in pending:
+            self.rebuild_rollups()
+        if "search_index" in pending and self.fts:
+            self.rebuild_search_index()
+
+    def connect(self) -> sqlite3.Connection:
+        """This thread's connection (WAL: readers never block the writer)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")  # Durable at checkpoints, no fsync per commit
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    @property
+    def storage_path(self) -> str:
+        return self.db_path
+
+    def write_rows(self, rows: List[Dict]):
+        """Append a batch and its rollups in one transaction; known test_ids are skipped"""
+        conn = self.connect()
+        with conn:
+            # Take the write lock up front; other processes wait (busy_timeout)
+            conn.execute("BEGIN IMMEDIATE")
+            inserted = []
+            for row in rows:
+                cursor = conn.execute(INSERT_SQL, (*(row.get(c) for c in HISTORY_COLUMNS),
+                                                   domain_of(row.get('url_visited') or "")))
+                if cursor.rowcount:
+                    inserted.append(row)
+                    if self.fts:
+                        conn.execute("INSERT INTO tests_fts (rowid, instruction, errors, steps, url) "
+                                     "VALUES (?, ?, ?, ?, ?)", (cursor.lastrowid, *document(row)))
+            self._add_rollups(conn, aggregate(inserted))
+
+    def _add_rollups(self, conn: sqlite3.Connection, rollups: Dict[RollupKey, Rollup]):
+        """Merge a batch's rollups into the stored ones (primary-key lookups only)"""
+        for key, rollup in rollups.items():
+            stored = conn.execute(
+                f"SELECT {ROLLUP_COLUMNS}, sketch FROM rollups "
+                "WHERE granularity = ? AND bucket = ? AND domain = ? AND status = ?", key
+            ).fetchone()
+            if stored:
+                rollup.merge(self._rollup_from(stored))
+            conn.execute(UPSERT_ROLLUP_SQL, (*key, *(getattr(rollup, c) for c in COUNTERS),
+                                             rollup.sketch.to_json()))
+
+    @staticmethod
+    def _rollup_from(stored: Tuple) -> Rollup:
+        rollup = Rollup()
+        for counter, value in zip(COUNTERS, stored):
+            setattr(rollup, counter, value)
+        rollup.sketch = DDSketch.from_json(stored[len(COUNTERS)])
+        return rollup
+
+    @staticmethod
+    def _mark_migrated(conn: sqlite3.Connection, name: str):
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, 1)", (f"migrated_{name}",))
+
+    def backfill_domains(self):
+        """Fill the domain column of existing rows (one update per distinct URL)"""
+        conn = self.connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            urls = [url for (url,) in conn.execute("SELECT DISTINCT url_visited FROM tests")]
+            for url in urls:
+                conn.execute("UPDATE tests SET domain = ? WHERE url_visited IS ?", (domain_of(url or ""), url))
+            self._mark_migrated(conn, "domains")
+        print(f" Filled domains of {len(urls)} URLs: {self.db_path}")
+
+    def rebuild_rollups(self):
+        """Recompute every rollup from the history rows"""
+        conn = self.connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM rollups")
+            cursor = conn.execute(f"SELECT {COLUMN_LIST} FROM tests")
+            self._add_rollups(conn, aggregate(dict(zip(HISTORY_COLUMNS, values)) for values in cursor))
+            self._mark_migrated(conn, "rollups")
+        print(f" Rebuilt statistics rollups: {self.db_path}")
+
+    def rollup_rows(self,
+                    granularity: str,
+                    since: Optional[str] = None,
+                    until: Optional[str] = None,
+                    domain: Optional[str] = None,
+                    status: Optional[str] = None) -> Iterable[Tuple[RollupKey, Rollup]]:
+        """Stored rollups of one granularity (primary-key range scan)"""
+        sql = f"SELECT granularity, bucket, domain, status, {ROLLUP_COLUMNS}, sketch FROM rollups WHERE granularity = ?"
+        params: List = [granularity]
+        if since:
+            sql += " AND bucket >= substr(?, 1, length(bucket))"
+            params.append(since)
+        if until:
+            sql += " AND bucket <= substr(?, 1, length(bucket))"
+            params.append(until)
+        if domain is not None:
+            sql += " AND domain = ?"
+            params.append(domain)
+        if status is not None:
+            sql += " AND status = ?"
+            params.append(status)
+        return [(tuple(stored[:4]), self._rollup_from(stored[4:]))
+                for stored in self.connect().execute(sql, params)]
+
+    def _query(self, sql: str, params: tuple = ()) -> pd.DataFrame:
+        return compact_frame(pd.read_sql_query(sql, self.connect(), params=params))
+
+    def version(self) -> Tuple[int, int]:
+        """(generation, highest row id): two index lookups"""
+        return self.connect().execute(
+            "SELECT (SELECT value FROM meta WHERE key = 'generation'), "
+            "(SELECT COALESCE(MAX(id), 0) FROM tests)").fetchone()
+
+    def load_all_tests(self, after: Optional[int] = None, until: Optional[int] = None) -> pd.DataFrame:
+        """Test history (oldest first), rows with ids in (after, until] only"""
+        return pd.read_sql_query(
+            f"SELECT {COLUMN_LIST} FROM tests WHERE id > ? AND id <= ? ORDER BY id", self.connect(),
+            params=(after or 0, until if until is not None else 2 ** 63 - 1))
+
+    def iter_tests(self,
+                   chunk_size: int = 10000,
+                   columns: Optional[List[str]] = None,
+                   since: Optional[str] = None,
+                   until: Optional[str] = None) -> Iterator[pd.DataFrame]:
+        """Test history in chunks, oldest first: keyset range scans of the timestamp index"""
+        columns = list(columns or HISTORY_COLUMNS)
+        selected = ", ".join(["id", "timestamp AS _timestamp"] + columns)
+        position = None
+        while True:
+            sql = f"SELECT {selected} FROM tests WHERE 1"
+            params: List = []
+            if since:
+                sql += " AND timestamp >= ?"
+                params.append(since)
+            if until:
+                sql += " AND timestamp <= ?"
+                params.append(until_bound(until))
+            if position:
+                sql += " AND timestamp >= ? AND (timestamp > ? OR id > ?)"
+                params.extend([position[0], position[0], position[1]])
+            sql += " ORDER BY timestamp, id LIMIT ?"
+            params.append(int(chunk_size))
+
+            chunk = pd.read_sql_query(sql, self.connect(), params=params)
+            if chunk.empty:
+                return
+            position = (chunk['_timestamp'].iloc[-1], int(chunk['id'].iloc[-1]))
+            yield chunk[columns]
+            if len(chunk) < chunk_size:
+                return
+
+    def search_tests(self, query: str, limit: Optional[int] = None) -> pd.DataFrame:
+        """
+        Full-text search, best matches first (see fulltext.py for the syntax)
+
+        Args:
+            query: Search text, e.g. 'errors:timeout url:amazon "add to cart"'
+            limit: Most rows returned (all when None)
+
+        Returns:
+            Matching history rows, ranked by BM25
+        """
+        terms, filters = parse_query(query)
+        columns = ", ".join(f"t.{column}" for column in HISTORY_COLUMNS)
+        where, params = [], []
+        if filters.get("status"):
+            where.append("t.status = ?")
+            params.append(filters["status"])
+
+        if terms and self.fts:
+            # Rank inside the index and join only the rows returned, unless
+            # a filter on the history row has to apply before the limit
+            top = f" LIMIT {int(limit)}" if limit and not where else ""
+            sql = (f"WITH hits AS (SELECT rowid, {BM25} AS score FROM tests_fts "
+                   f"WHERE tests_fts MATCH ? ORDER BY score{top}) "
+                   f"SELECT {columns} FROM hits JOIN tests t ON t.id = hits.rowid"
+                   f"{' WHERE ' + ' AND '.join(where) if where else ''} ORDER BY hits.score")
+            params.insert(0, compile_query(terms))
+        else:
+            # No FTS5 (or only filters): substring match on the row's own text fields
+            for field, text, _ in terms:
+                fields = [TEXT_COLUMNS[field]] if field in TEXT_COLUMNS else list(TEXT_COLUMNS.values())
+                for word in text.split():
+                    where.append("(" + " OR ".join(f"t.{f} LIKE ? ESCAPE '\\'" for f in fields) + ")")
+                    params.extend([like_pattern(word)] * len(fields))
+            sql = (f"SELECT {columns} FROM tests t"
+                   f"{' WHERE ' + ' AND '.join(where) if where else ''} ORDER BY t.id DESC")
+        if limit:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        return self._query(sql, tuple(params))
+
+    def rebuild_search_index(self):
+        """Index every history row (steps come from the log archive)"""
+        conn = self.connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM tests_fts")
+            for values in conn.execute(f"SELECT id, {COLUMN_LIST} FROM tests").fetchall():
+                row = dict(zip(HISTORY_COLUMNS, values[1:]))
+                log_data = self.get_test_by_id(row['test_id'], fields=['parsed_steps']) or {}
+                row['steps_text'] = steps_text(log_data.get('parsed_steps', []))
+                conn.execute("INSERT INTO tests_fts (rowid, instruction, errors, steps, url) "
+                             "VALUES (?, ?, ?, ?, ?)", (values[0], *document(row)))
+            self._mark_migrated(conn, "search_index")
+        print(f" Rebuilt search index: {self.db_path}")
+
+    def get_tests_page(self,
+                       limit: int = 20,
+                       cursor: Optional[str] = None,
+                       status: Optional[str] = None,
+                       domain: Optional[str] = None,
+                       since: Optional[str] = None,
+                       until: Optional[str] = None) -> Tuple[pd.DataFrame, Optional[str]]:
+        """
+        One page of test history, newest first: an index range scan from the
+        cursor, so every page costs the same whatever the history size
+
+        Args:
+            limit: Rows per page
+            cursor: Cursor returned with the previous page (None for the first)
+            status: Only this status
+            domain: Only runs on this domain (see timeout_model.domain_of)
+            since: Earliest timestamp, e.g. "2024-06-01"
+            until: Latest timestamp, as a prefix ("2024-06-30" includes that day)
+
+        Returns:
+            (page, cursor of the next page or None on the last page)
+        """
+        sql = f"SELECT id, {COLUMN_LIST} FROM tests WHERE 1"
+        params: List = []
+        if status is not None:
+            sql += " AND status = ?"
+            params.append(status)
+        if domain is not None:
+            sql += " AND domain = ?"
+            params.append(domain)
+        if since:
+            sql += " AND timestamp >= ?"
+            params.append(since)
+        if until:
+            sql += " AND timestamp <= ?"
+            params.append(until_bound(until))
+        if cursor:
+            timestamp, last_id = decode_cursor(cursor)
+            # Spelled out (not a row value) so the timestamp bound narrows the index range
+            sql += " AND timestamp <= ? AND (timestamp < ? OR id < ?)"
+            params.extend([timestamp, timestamp, int(last_id)])
+        sql += " ORDER BY timestamp DESC, id DESC LIMIT ?"
+        params.append(int(limit) + 1)
+
+        page = pd.read_sql_query(sql, self.connect(), params=params)
+        next_cursor = None
+        if len(page) > limit:
+            page = page.head(limit)
+            next_cursor = encode_cursor(page['timestamp'].iloc[-1], page['id'].iloc[-1])
+        return compact_frame(page.drop(columns='id')), next_cursor
+
+    def clear_history(self):
+        with self.connect() as conn:
+            conn.execute("DELETE FROM tests")
+            conn.execute("DELETE FROM rollups")
+            # Row ids restart after a clear: cached views must not append to old rows
+            conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'generation'")
+            if self.fts:
+                conn.execute("DELETE FROM tests_fts")
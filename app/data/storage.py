@@ -0,0 +1,649 @@
+"""
+Test Result Storage
+Interface shared by every test history backend: building the history row
+and detailed log from a run, the log archive (log_archive.py), statistics
+and exports. Backends only implement how history rows are written and queried.
+"""
+
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from app.data.fulltext import TEXT_COLUMNS, parse_query, steps_text
+from app.data.ids import new_ulid
+from app.data.rollups import Rollup, RollupKey, aggregate, in_range, rollup_frame, statistics_from
+from app.executor.timeout_model import domain_of
+
+try:
+    import fcntl
+except ImportError:  # Windows: cross-process file locks unavailable
+    fcntl = None
+
+
+# Columns of the test history table, in display/export order
+HISTORY_COLUMNS = [
+    'test_id',
+    'timestamp',
+    'instruction',
+    'status',
+    'passed',
+    'duration_seconds',
+    'steps_count',
+    'browser_opened',
+    'url_visited',
+    'login_checked',
+    'login_status',
+    'screenshots_taken',
+    'errors',
+    'code_file_path',
+    'log_file_path'
+]
+# Compact dtypes of the in-memory history table
+BOOL_COLUMNS = ['passed', 'browser_opened', 'login_checked']
+CATEGORY_COLUMNS = ['status', 'url_visited', 'login_status']
+INT_COLUMNS = ['steps_count', 'screenshots_taken']
+
+# sqlite (default) or excel
+BACKENDS = ["sqlite", "excel"]
+STORAGE_BACKEND = os.getenv("TEST_STORAGE_BACKEND", "sqlite")
+# Rows saved within this window share one commit
+GROUP_COMMIT_MS = float(os.getenv("TEST_STORAGE_GROUP_COMMIT_MS", "5"))
+
+
+@contextmanager
+def file_lock(path: str):
+    """
+    Exclusive lock on path + ".lock", held across processes (advisory,
+    POSIX only; elsewhere callers still hold their in-process lock)
+    """
+    if fcntl is None:
+        yield
+        return
+    with open(path + ".lock", "a") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def compact_frame(df: pd.DataFrame, categories: bool = True) -> pd.DataFrame:
+    """
+    History rows with compact dtypes: categoricals for repetitive strings
+    (plain strings when categories is False), bools, int32, float32
+    durations and datetime64 timestamps
+    """
+    for column in BOOL_COLUMNS:
+        if column in df:
+            df[column] = df[column].fillna(False).astype(bool)
+    for column in CATEGORY_COLUMNS:
+        if column in df:
+            df[column] = df[column].fillna("").astype(str)
+            if categories:
+                df[column] = df[column].astype('category')
+    for column in INT_COLUMNS:
+        if column in df:
+            df[column] = pd.to_numeric(df[column], errors='coerce').fillna(0).astype('int32')
+    if 'duration_seconds' in df:
+        df['duration_seconds'] = pd.to_numeric(df['duration_seconds'], errors='coerce').astype('float32')
+    if 'timestamp' in df:
+        df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
+    return df
+
+
+def append_compact(df: pd.DataFrame, new_rows: pd.DataFrame) -> pd.DataFrame:
+    """Append compact rows, keeping categoricals (categories are unioned)"""
+    if df.empty:
+        return new_rows
+    for column in CATEGORY_COLUMNS:
+        if column in df and column in new_rows:
+            categories = df[column].cat.categories.union(new_rows[column].cat.categories)
+            df[column] = df[column].cat.set_categories(categories)
+            new_rows[column] = new_rows[column].cat.set_categories(categories)
+    return pd.concat([df, new_rows], ignore_index=True)
+
+
+def encode_cursor(timestamp, key) -> str:
+    """Page cursor: sort key (timestamp, tie-breaker) of the last row shown"""
+    return f"{timestamp}|{key}"
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    timestamp, _, key = cursor.rpartition("|")
+    return timestamp, key
+
+
+def time_mask(timestamps: pd.Series, since: Optional[str] = None, until: Optional[str] = None) -> pd.Series:
+    """Rows of a datetime64 column from `since` through `until` (a prefix, as in until_bound)"""
+    mask = pd.Series(True, index=timestamps.index)
+    if since:
+        mask &= timestamps >= pd.Timestamp(since)
+    if until:
+        step = pd.Timedelta(days=1) if len(until) <= 10 else pd.Timedelta(seconds=1)
+        mask &= timestamps < pd.Timestamp(until) + step
+    return mask
+
+
+def until_bound(until: str) -> str:
+    """Upper bound for text timestamps matching `until` as a prefix ("2024-06-01" keeps that whole day)"""
+    return until + "~"  # Sorts after digits, space and colon
+
+
+class _Batch:
+    def __init__(self):
+        self.rows: List[Dict] = []
+        self.done = threading.Event()
+        self.error: Optional[Exception] = None
+
+
+class GroupCommit:
+    """
+    Batches rows from concurrent writers into one commit. The first writer
+    of a batch becomes its leader: when other writers are active it waits
+    window_ms for them to join (a lone writer commits at once), then writes
+    everything at once while the rest wait for the outcome. Rows arriving
+    during a commit form the next batch.
+    """
+
+    def __init__(self, write: Callable[[List[Dict]], None], window_ms: float = GROUP_COMMIT_MS):
+        """
+        Args:
+            write: Writes one batch of rows (one transaction)
+            window_ms: How long a leader waits for more rows
+        """
+        self.write = write
+        self.window_ms = window_ms
+        self.commits = 0
+        self.rows = 0
+        self._writers = 0  # Threads currently inside submit()
+        self._lock = threading.Lock()  # Guards the open batch
+        self._committing = threading.Lock()  # One commit at a time
+        self._batch: Optional[_Batch] = None
+
+    def submit(self, rows: List[Dict]):
+        """Add rows to the open batch; returns once they are committed"""
+        with self._lock:
+            self._writers += 1
+            batch = self._batch
+            leader = batch is None
+            if leader:
+                batch = self._batch = _Batch()
+            batch.rows.extend(rows)
+            contended = self._writers > 1
+
+        try:
+            self._commit(batch, leader, contended)
+        finally:
+            with self._lock:
+                self._writers -= 1
+
+        if batch.error is not None:
+            raise batch.error
+
+    def _commit(self, batch: _Batch, leader: bool, contended: bool):
+        if leader:
+            if contended and self.window_ms > 0:
+                time.sleep(self.window_ms / 1000)
+            with self._committing:
+                with self._lock:
+                    self._batch = None  # Close the batch: later rows start the next one
+                try:
+                    self.write(batch.rows)
+                    self.commits += 1
+                    self.rows += len(batch.rows)
+                except Exception as e:
+                    batch.error = e
+                finally:
+                    batch.done.set()
+        else:
+            batch.done.wait()
+
+
+class StorageBackend:
+    """Base class for test history stores"""
+
+    name = "base"
+    # Whether load_all_tests(after=position) returns only newer rows
+    incremental_reads = False
+
+    def __init__(self,
+                 logs_dir: str = "test_logs",
+                 screenshots_dir: str = "screenshots"):
+        """
+        Initialize storage
+
+        Args:
+            logs_dir: Directory for detailed logs (compressed archive)
+            screenshots_dir: Directory for screenshots
+        """
+        from app.data.log_archive import LogArchive  # Imports file_lock from here
+
+        self.logs_dir = logs_dir
+        self.screenshots_dir = screenshots_dir
+        os.makedirs(logs_dir, exist_ok=True)
+        os.makedirs(screenshots_dir, exist_ok=True)
+        self.committer = GroupCommit(self.write_rows)
+        self.archive = LogArchive(logs_dir)
+        self._cache: Optional[pd.DataFrame] = None
+        self._cache_version: Optional[Tuple[int, int]] = None
+        self._cache_lock = threading.Lock()
+
+    # ==================== WRITING ====================
+
+    def new_test_id(self) -> str:
+        """Collision-free, time-ordered identifier for a new test run (ULID)"""
+        return new_ulid()
+
+    def build_record(self,
+                     test_id: str,
+                     instruction: str,
+                     state: Dict,
+                     execution_result: Dict) -> Tuple[Dict, Dict]:
+        """
+        Build the history row and the detailed log for one run
+
+        Args:
+            test_id: Run identifier
+            instruction: User's natural language instruction
+            state: Final LangGraph state
+            execution_result: Test execution results
+
+        Returns:
+            (row with HISTORY_COLUMNS, log data)
+        """
+        now = datetime.now()
+
+        # Extract data from state
+        parsed_steps = state.get("parsed_steps", [])
+        browser_open = state.get("browser_open", False)
+        current_url = state.get("current_url", "")
+        logged_in = state.get("logged_in", False)
+        generated_code = state.get("generated_code", "")
+        code_file_path = state.get("code_file_path", "")
+
+        # Extract execution data
+        status = execution_result.get("status", "unknown")
+        passed = execution_result.get("return_code", 1) == 0
+        output = execution_result.get("output", "")
+        errors = execution_result.get("errors", "")
+
+        # Real duration from executor telemetry; older callers only have output
+        duration = execution_result.get("duration_seconds")
+        if duration is None:
+            duration = self._extract_duration(output)
+        step_durations = execution_result.get("step_durations", [])
+
+        # Count steps and features
+        steps_count = len(parsed_steps)
+        login_checked = any(s.get("action") == "CHECK_LOGIN" for s in parsed_steps)
+        screenshots = execution_result.get("screenshots", [])
+        screenshots_taken = len(screenshots) if screenshots else \
+            sum(1 for s in parsed_steps if s.get("action") == "SCREENSHOT")
+
+        row = {
+            'test_id': test_id,
+            'timestamp': now.strftime("%Y-%m-%d %H:%M:%S"),
+            'instruction': instruction,
+            'status': status,
+            'passed': passed,
+            'duration_seconds': duration,
+            'steps_count': steps_count,
+            'browser_opened': browser_open,
+            'url_visited': current_url,
+            'login_checked': login_checked,
+            'login_status': 'Logged In' if logged_in else 'Not Logged In' if login_checked else 'N/A',
+            'screenshots_taken': screenshots_taken,
+            'errors': errors[:500] if errors else "",  # Truncate long errors
+            'code_file_path': code_file_path,
+            'log_file_path': self.archive.location(test_id),
+            'steps_text': steps_text(parsed_steps)  # Search index only, not a column
+        }
+
+        log_data = {
+            'test_id': test_id,
+            'timestamp': now.isoformat(),
+            'instruction': instruction,
+            'parsed_steps': parsed_steps,
+            'browser_state': {
+                'browser_open': browser_open,
+                'current_url': current_url,
+                'logged_in': logged_in
+            },
+            'generated_code': generated_code,
+            'code_file_path': code_file_path,
+            'execution': {
+                'status': status,
+                'passed': passed,
+                'duration_seconds': duration,
+                'output': output,
+                'output_path': execution_result.get("output_path", ""),
+                'errors': errors,
+                'return_code': execution_result.get("return_code", -1),
+                'failure_class': execution_result.get("failure_class", ""),
+                'peak_rss_mb': execution_result.get("peak_rss_mb"),
+                'max_process_rss_mb': execution_result.get("max_process_rss_mb"),
+                'cpu_seconds': execution_result.get("cpu_seconds"),
+                'screenshots': screenshots,
+                'screenshot_cost': execution_result.get("screenshot_cost", {}),
+                'visual_checks': execution_result.get("visual_checks", []),
+                'traces': execution_result.get("traces", []),
+                'trace_cost': execution_result.get("trace_cost", {}),
+                'browsers': execution_result.get("browsers", {}),
+                'matrix': execution_result.get("matrix", {}),
+                'step_durations': step_durations,
+                'telemetry': execution_result.get("telemetry", [])
+            },
+            'metadata': {
+                'steps_count': steps_count,
+                'login_checked': login_checked,
+                'screenshots_taken': screenshots_taken
+            }
+        }
+        return row, log_data
+
+    def save_test_result(self,
+                         instruction: str,
+                         state: Dict,
+                         execution_result: Dict) -> str:
+        """
+        Save complete test result to the history store and log archive
+
+        Args:
+            instruction: User's natural language instruction
+            state: Final LangGraph state
+            execution_result: Test execution results
+
+        Returns:
+            test_id: Unique identifier for this test
+        """
+        test_id = self.new_test_id()
+        row, log_data = self.build_record(test_id, instruction, state, execution_result)
+
+        try:
+            self.insert_rows([row])
+            print(f" Saved to {self.name}: {self.storage_path}")
+        except Exception as e:
+            print(f" {self.name} save error: {e}")
+
+        log_file = self.write_log(test_id, log_data)
+        print(f" Archived log: {log_file}")
+        return test_id
+
+    def insert_rows(self, rows: List[Dict]):
+        """Append history rows (HISTORY_COLUMNS), group-committed; safe from any thread"""
+        self.committer.submit(rows)
+
+    def write_rows(self, rows: List[Dict]):
+        """Write one batch of history rows in a single transaction"""
+        raise NotImplementedError
+
+    def write_log(self, test_id: str, log_data: Dict) -> str:
+        """Archive a run's detailed log; returns its location"""
+        return self.archive.write(test_id, log_data)
+
+    def _extract_duration(self, output: str) -> float:
+        """Extract duration from test output"""
+        # Look for patterns like "5.2s" or "(5.2s)"
+        match = re.search(r'(\d+\.?\d*)\s*s', output)
+        if match:
+            return float(match.group(1))
+        return 0.0
+
+    # ==================== READING ====================
+
+    @property
+    def storage_path(self) -> str:
+        """File holding the history table"""
+        raise NotImplementedError
+
+    def version(self) -> Tuple[int, int]:
+        """
+        Store version, checked before serving cached views: (generation,
+        position), increasing with every write; generation also changes
+        when the history is cleared
+        """
+        raise NotImplementedError
+
+    def load_all_tests(self, after: Optional[int] = None, until: Optional[int] = None) -> pd.DataFrame:
+        """
+        History rows from storage, uncached. Incremental backends return
+        only rows with positions in (after, until], so a load matches the
+        version read before it even while writers keep appending.
+        """
+        raise NotImplementedError
+
+    def get_all_tests(self) -> pd.DataFrame:
+        """
+        Get all test history, with compact dtypes
+
+        Served from an in-process cache until the store version changes;
+        appended rows are loaded alone when the backend supports it. The
+        frame is shared: add columns freely, but do not edit values in place.
+        """
+        version = self.version()
+        with self._cache_lock:
+            cached, cached_version = self._cache, self._cache_version
+            if cached is None or cached_version != version:
+                if (cached is not None and self.incremental_reads
+                        and cached_version[0] == version[0] and cached_version[1] < version[1]):
+                    new_rows = self.load_all_tests(after=cached_version[1], until=version[1])
+                    cached = append_compact(cached, compact_frame(new_rows))
+                else:
+                    cached = compact_frame(self.load_all_tests(until=version[1]))
+                self._cache, self._cache_version = cached, version
+        return cached.copy(deep=False)
+
+    def get_test_by_id(self, test_id: str, fields: Optional[List[str]] = None) -> Optional[Dict]:
+        """
+        Get detailed test data from the log archive (or a legacy JSON log)
+
+        Args:
+            test_id: Run identifier
+            fields: Top-level log fields to load, e.g. ["execution"]
+                (all when None; other fields are not decompressed)
+
+        Returns:
+            Log dictionary, or None when the run has no log
+        """
+        return self.archive.read(test_id, fields)
+
+    def get_statistics(self) -> Dict:
+        """Totals, pass rate and duration percentiles (from the "all" rollups)"""
+        return statistics_from(rollup for _, rollup in self.rollup_rows("all"))
+
+    def get_rollups(self,
+                    granularity: str = "day",
+                    since: Optional[str] = None,
+                    until: Optional[str] = None,
+                    domain: Optional[str] = None,
+                    status: Optional[str] = None,
+                    by: Tuple[str, ...] = ("bucket",)) -> pd.DataFrame:
+        """
+        Time-bucketed statistics
+
+        Args:
+            granularity: hour, day or all
+            since: First bucket ("YYYY-MM-DD[ HH:MM:SS]"), inclusive
+            until: Last bucket, inclusive
+            domain: Only this domain
+            status: Only this status
+            by: Breakdown dimensions (bucket, domain, status)
+
+        Returns:
+            One row per group: count, passed, pass_rate, avg_duration and
+            p50/p90/p99 duration
+        """
+        return rollup_frame(self.rollup_rows(granularity, since, until, domain, status), by)
+
+    def rollup_rows(self,
+                    granularity: str,
+                    since: Optional[str] = None,
+                    until: Optional[str] = None,
+                    domain: Optional[str] = None,
+                    status: Optional[str] = None) -> Iterable[Tuple[RollupKey, Rollup]]:
+        """Rollups of one granularity matching the filters (computed from the full history here)"""
+        df = self.get_all_tests()
+        if df.empty:
+            return []
+        rows = df.astype(object).where(df.notna(), None).to_dict('records')
+        return [(key, rollup) for key, rollup in aggregate(rows).items()
+                if key[0] == granularity and in_range(key, since, until, domain, status)]
+
+    def search_tests(self, query: str, limit: Optional[int] = None) -> pd.DataFrame:
+        """Search tests: every word of the query in instruction, errors or url (field filters as in fulltext.py)"""
+        df = self.get_all_tests()
+        if df.empty:
+            return df
+
+        terms, filters = parse_query(query)
+        mask = pd.Series(True, index=df.index)
+        if filters.get("status"):
+            mask &= df['status'] == filters["status"]
+        for field, text, _ in terms:
+            for word in text.split():
+                fields = [TEXT_COLUMNS[field]] if field in TEXT_COLUMNS else list(TEXT_COLUMNS.values())
+                hit = pd.Series(False, index=df.index)
+                for column in fields:
+                    hit |= df[column].astype(str).str.contains(word, case=False, na=False, regex=False)
+                mask &= hit
+        return df[mask].head(limit) if limit else df[mask]
+
+    def get_recent_tests(self, limit: int = 10) -> pd.DataFrame:
+        """Get most recent tests"""
+        return self.get_tests_page(limit)[0]
+
+    def get_tests_page(self,
+                       limit: int = 20,
+                       cursor: Optional[str] = None,
+                       status: Optional[str] = None,
+                       domain: Optional[str] = None,
+                       since: Optional[str] = None,
+                       until: Optional[str] = None) -> Tuple[pd.DataFrame, Optional[str]]:
+        """
+        One page of test history, newest first (keyset pagination)
+
+        Args:
+            limit: Rows per page
+            cursor: Cursor returned with the previous page (None for the first)
+            status: Only this status
+            domain: Only runs on this domain (see timeout_model.domain_of)
+            since: Earliest timestamp, e.g. "2024-06-01"
+            until: Latest timestamp, as a prefix ("2024-06-30" includes that day)
+
+        Returns:
+            (page, cursor of the next page or None on the last page)
+        """
+        df = self.get_all_tests()
+        if df.empty:
+            return df, None
+
+        mask = time_mask(df['timestamp'], since, until)
+        if status is not None:
+            mask &= df['status'] == status
+        if domain is not None:
+            mask &= df['url_visited'].map(domain_of).astype(str) == domain  # Once per category
+        if cursor:
+            timestamp, test_id = decode_cursor(cursor)
+            timestamp = pd.Timestamp(timestamp)
+            mask &= (df['timestamp'] < timestamp) | ((df['timestamp'] == timestamp) & (df['test_id'] < test_id))
+
+        page = df[mask].sort_values(['timestamp', 'test_id'], ascending=False).head(limit + 1)
+        if len(page) <= limit:
+            return page, None
+        page = page.head(limit)
+        last = page.iloc[-1]
+        return page, encode_cursor(last['timestamp'], last['test_id'])
+
+    # ==================== EXPORT / MAINTENANCE ====================
+
+    def iter_tests(self,
+                   chunk_size: int = 10000,
+                   columns: Optional[List[str]] = None,
+                   since: Optional[str] = None,
+                   until: Optional[str] = None) -> Iterator[pd.DataFrame]:
+        """
+        Test history in chunks, oldest first (for streaming exports)
+
+        Args:
+            chunk_size: Rows per chunk
+            columns: History columns to read (all when None)
+            since: Earliest timestamp, e.g. "2024-06-01"
+            until: Latest timestamp, as a prefix ("2024-06-30" includes that day)
+
+        Yields:
+            DataFrames of at most chunk_size rows
+        """
+        df = self.get_all_tests()  # Already in memory here; SQLite reads chunk by chunk
+        if df.empty:
+            return
+        df = df[time_mask(df['timestamp'], since, until)]
+        if columns:
+            df = df[columns]
+        for start in range(0, len(df), chunk_size):
+            yield df.iloc[start:start + chunk_size]
+
+    def export_to_csv(self,
+                      output_path: str = "test_history.csv",
+                      columns: Optional[List[str]] = None,
+                      since: Optional[str] = None,
+                      until: Optional[str] = None) -> str:
+        """Export test history to CSV (streamed chunk by chunk)"""
+        from app.data.export import csv_stream, write_stream
+        write_stream(csv_stream(self, columns, since, until), output_path)
+        print(f" Exported to CSV: {output_path}")
+        return output_path
+
+    def export_to_parquet(self,
+                          output_path: str = "test_history.parquet",
+                          columns: Optional[List[str]] = None,
+                          since: Optional[str] = None,
+                          until: Optional[str] = None) -> str:
+        """Export test history to Parquet, one row group per chunk (needs pyarrow)"""
+        from app.data.export import parquet_stream, write_stream
+        write_stream(parquet_stream(self, columns, since, until), output_path)
+        print(f" Exported to Parquet: {output_path}")
+        return output_path
+
+    def export_to_excel(self, output_path: str = "test_history.xlsx") -> str:
+        """Export test history to an Excel workbook (on demand)"""
+        df = self.get_all_tests()
+        df.to_excel(output_path, index=False, sheet_name='Test History')
+        print(f" Exported to Excel: {output_path}")
+        return output_path
+
+    def clear_history(self):
+        """Delete every history row"""
+        raise NotImplementedError
+
+    def clear_all_data(self):
+        """Clear all test data (use with caution!)"""
+        self.clear_history()
+
+        # Clear logs
+        self.archive.clear()
+
+        print(" All data cleared")
+
+
+def create_data_manager(backend: str = STORAGE_BACKEND, **options) -> StorageBackend:
+    """
+    Create a test history store
+
+    Args:
+        backend: "sqlite" (default) or "excel"
+        **options: Backend constructor arguments
+
+    Returns:
+        Storage backend instance
+    """
+    if backend == "excel":
+        from app.data.excel_data_manager import ExcelDataManager
+        return ExcelDataManager(**options)
+    from app.data.sqlite_store import SQLiteDataManager
+    return SQLiteDataManager(**options)
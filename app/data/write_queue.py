@@ -0,0 +1,280 @@
+"""
+Write-Behind Persistence
+Saving a result only appends it to a crash-recovery journal and queues it;
+a background writer stores queued results in batches (one group commit
+for the history rows, then the logs). Results not yet written are
+served from memory, so the UI never waits on storage.
+
+Durability:
+    - The journal line is written before save_test_result returns, so a
+      crashed process loses nothing: the next start replays orphaned
+      journals (their owner no longer holds the journal's file lock)
+    - TEST_STORAGE_FSYNC: "always" fsyncs every journal line (survives
+      power loss), "batch" (default) fsyncs once per batch, "never" leaves
+      it to the OS
+    - The queue is drained at interpreter exit (atexit)
+"""
+
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from typing import Dict, List, Optional, Set
+
+from app.data.ids import new_ulid
+from app.data.storage import StorageBackend
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+JOURNAL_DIR = os.getenv("TEST_STORAGE_JOURNAL_DIR", "test_journal")
+FSYNC_POLICIES = ["always", "batch", "never"]
+FSYNC_POLICY = os.getenv("TEST_STORAGE_FSYNC", "batch")
+# Set to 0 to save synchronously
+WRITE_BEHIND = os.getenv("TEST_STORAGE_WRITE_BEHIND", "1") == "1"
+BATCH_SIZE = 50
+FLUSH_INTERVAL = 0.2  # Seconds the writer waits to fill a batch
+# Backoff before a failed batch is retried (doubling up to the maximum)
+RETRY_INITIAL = 0.1
+RETRY_MAX = 5.0
+
+
+class PersistenceQueue:
+    """Write-behind front for a storage backend (same public methods)"""
+
+    def __init__(self,
+                 store: StorageBackend,
+                 journal_dir: str = JOURNAL_DIR,
+                 fsync: str = FSYNC_POLICY,
+                 batch_size: int = BATCH_SIZE,
+                 flush_interval: float = FLUSH_INTERVAL):
+        """
+        Initialize queue, recover orphaned journals and start the writer
+
+        Args:
+            store: Backend that results are eventually written to
+            journal_dir: Directory for crash-recovery journals
+            fsync: Journal fsync policy (always, batch or never)
+            batch_size: Most results stored per batch
+            flush_interval: How long the writer waits to fill a batch
+        """
+        self.store = store
+        self.journal_dir = journal_dir
+        self.fsync = fsync if fsync in FSYNC_POLICIES else "batch"
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pending: Dict[str, Dict] = {}  # test_id -> log data, until written
+        self._stored_rows: Set[str] = set()  # Rows of batches whose logs still failed
+        self.written = 0
+        self.batches = 0
+        self.retries = 0
+        self._retry_delay = 0.0
+        self._queue: "queue.Queue[Optional[Dict]]" = queue.Queue()
+        self._journal_lock = threading.Lock()
+        self._closed = False
+
+        os.makedirs(journal_dir, exist_ok=True)
+        self.journal_path = os.path.join(journal_dir, f"journal_{os.getpid()}_{new_ulid()}.jsonl")
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+        if fcntl is not None:
+            fcntl.flock(self._journal, fcntl.LOCK_EX | fcntl.LOCK_NB)  # Held while this process lives
+
+        self.recover()
+        self._writer = threading.Thread(target=self._run, name="persistence-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def __getattr__(self, name):
+        # Reads, exports and maintenance go straight to the backend
+        return getattr(self.store, name)
+
+    # ==================== ENQUEUE ====================
+
+    def save_test_result(self,
+                         instruction: str,
+                         state: Dict,
+                         execution_result: Dict) -> str:
+        """
+        Queue a test result; returns as soon as it is journaled
+
+        Args:
+            instruction: User's natural language instruction
+            state: Final LangGraph state
+            execution_result: Test execution results
+
+        Returns:
+            test_id: Unique identifier for this test
+        """
+        test_id = self.store.new_test_id()
+        row, log_data = self.store.build_record(test_id, instruction, state, execution_result)
+        entry = {"test_id": test_id, "row": row, "log": log_data}
+        self._enqueue(entry, sync=self.fsync == "always")
+        print(f" Queued result: {test_id} ({self._queue.qsize()} pending)")
+        return test_id
+
+    def _enqueue(self, entry: Dict, sync: bool = False):
+        """Journal an entry and queue it in one step: _compact never sees the line without the entry"""
+        with self._journal_lock:
+            self._write_journal(entry, sync)
+            self.pending[entry["test_id"]] = entry["log"]
+            self._queue.put(entry)
+
+    def _append_journal(self, record: Dict, sync: bool = False):
+        with self._journal_lock:
+            self._write_journal(record, sync)
+
+    def _write_journal(self, record: Dict, sync: bool):
+        """Append a journal line (caller holds _journal_lock)"""
+        self._journal.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        self._journal.flush()  # In the OS: survives a crash of this process
+        if sync:
+            os.fsync(self._journal.fileno())
+
+    # ==================== WRITER ====================
+
+    def _run(self):
+        while True:
+            entry = self._queue.get()
+            if entry is None:
+                return
+            batch = [entry]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    entry = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if entry is None:
+                    self._write_batch(batch)
+                    return
+                batch.append(entry)
+            self._write_batch(batch)
+
+    def _write_batch(self, batch: List[Dict]):
+        """Store one batch, then mark it committed in the journal"""
+        if self.fsync == "batch":
+            with self._journal_lock:
+                os.fsync(self._journal.fileno())
+        try:
+            # A retry only redoes the failed stage: rows already stored by an
+            # earlier attempt would be appended again by non-keyed backends
+            rows = [entry["row"] for entry in batch if entry["test_id"] not in self._stored_rows]
+            if rows:
+                self.store.insert_rows(rows)
+                self._stored_rows.update(entry["test_id"] for entry in batch)
+            for entry in batch:
+                self.store.write_log(entry["test_id"], entry["log"])
+        except Exception as e:
+            # Still uncommitted in the journal (replayed on the next start if
+            # this process dies); retried here after a backoff
+            self._retry_delay = min(max(self._retry_delay * 2, RETRY_INITIAL), RETRY_MAX)
+            self.retries += 1
+            print(f" Persistence error ({len(batch)} results kept in journal, "
+                  f"retrying in {self._retry_delay:.1f}s): {e}")
+            time.sleep(self._retry_delay)
+            for entry in batch:
+                self._queue.put(entry)
+            return
+        self._retry_delay = 0.0
+
+        ids = [entry["test_id"] for entry in batch]
+        self._append_journal({"committed": ids}, sync=self.fsync != "never")
+        for test_id in ids:
+            self.pending.pop(test_id, None)
+            self._stored_rows.discard(test_id)
+        self.written += len(batch)
+        self.batches += 1
+        self._compact()
+
+    def _compact(self):
+        """Empty the journal once everything in it is stored"""
+        with self._journal_lock:
+            if not self.pending and self._queue.empty():
+                self._journal.truncate(0)
+
+    def flush(self, timeout: float = 30.0) -> bool:
+        """Wait until every queued result is stored; False on timeout"""
+        deadline = time.monotonic() + timeout
+        while self.pending and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return not self.pending
+
+    def close(self):
+        """Drain the queue and stop the writer (registered with atexit)"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join()
+        with self._journal_lock:
+            if not self.pending:
+                self._journal.truncate(0)
+            self._journal.close()
+        if not self.pending and os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        print(f" Persistence queue closed: {self.written} results in {self.batches} batches")
+
+    # ==================== RECOVERY ====================
+
+    def recover(self) -> int:
+        """
+        Replay results of journals left by crashed processes
+
+        Returns:
+            Number of results re-queued
+        """
+        recovered = 0
+        for name in sorted(os.listdir(self.journal_dir)):
+            path = os.path.join(self.journal_dir, name)
+            if path == self.journal_path or not name.endswith(".jsonl"):
+                continue
+            with open(path, "a+", encoding="utf-8") as handle:
+                if fcntl is not None:
+                    try:
+                        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except OSError:
+                        continue  # Owner still running
+                handle.seek(0)
+                entries, committed = {}, set()
+                for line in handle:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # Torn last line of a crash
+                    if "committed" in record:
+                        committed.update(record["committed"])
+                    else:
+                        entries[record["test_id"]] = record
+                for test_id, entry in entries.items():
+                    if test_id not in committed:
+                        # Re-journaled here first, so a crash now loses nothing either
+                        self._enqueue(entry, sync=self.fsync != "never")
+                        recovered += 1
+            os.remove(path)
+        if recovered:
+            print(f" Recovered {recovered} unsaved results from journal")
+        return recovered
+
+    # ==================== READS ====================
+
+    def get_test_by_id(self, test_id: str, fields: Optional[List[str]] = None) -> Optional[Dict]:
+        """Detailed test data, also for results still queued"""
+        log_data = self.pending.get(test_id)
+        if log_data is not None:
+            return log_data if fields is None else {f: log_data[f] for f in fields if f in log_data}
+        return self.store.get_test_by_id(test_id, fields)
+
+    def clear_all_data(self):
+        """Clear all test data once queued results are written"""
+        self.flush()
+        self.store.clear_all_data()
+
+    def stats(self) -> Dict:
+        """Queue depth and writer progress"""
+        return {"pending": len(self.pending), "written": self.written, "batches": self.batches,
+                "retries": self.retries, "fsync": self.fsync, "journal": self.journal_path}
@@ -0,0 +1,168 @@
+"""
+Generated Test Store
+Content-addressed storage for generated tests: identical code is stored
+(and byte-compiled) once as test_<hash>.py, a manifest maps runs to
+artifacts, and artifacts no retained run references are garbage-collected
+"""
+
+import hashlib
+import importlib.util
+import json
+import os
+import py_compile
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: manifest updates are only thread-safe
+    fcntl = None
+
+
+GENERATED_TESTS_DIR = os.path.join("app", "generated_tests")
+MANIFEST_NAME = "manifest.json"
+
+# Runs older than this stop keeping their artifacts alive
+RUN_RETENTION_DAYS = 30
+# Garbage collection runs at most this often when storing tests
+GC_INTERVAL_SECONDS = 24 * 3600
+
+
+def content_hash(code: str) -> str:
+    """Short SHA-256 of generated code, used as its artifact id"""
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()[:16]
+
+
+@contextmanager
+def _locked_manifest(test_dir: str):
+    """Load the manifest under an exclusive lock and save it on exit"""
+    os.makedirs(test_dir, exist_ok=True)
+    with open(os.path.join(test_dir, MANIFEST_NAME + ".lock"), "w") as lock:
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        manifest = load_manifest(test_dir)
+        yield manifest
+        path = os.path.join(test_dir, MANIFEST_NAME)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, path)
+
+
+def load_manifest(test_dir: str = GENERATED_TESTS_DIR) -> Dict:
+    """Manifest with artifacts by hash and runs by id"""
+    path = os.path.join(test_dir, MANIFEST_NAME)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"artifacts": {}, "runs": {}, "last_gc": 0}
+
+
+def store_test(code: str,
+               kind: str = "test",
+               run_id: Optional[str] = None,
+               test_dir: str = GENERATED_TESTS_DIR) -> Dict:
+    """
+    Store generated code by content hash and record the run using it
+
+    Args:
+        code: Generated Python source
+        kind: File prefix, "test" or "suite"
+        run_id: Run identifier (generated if omitted)
+        test_dir: Directory for artifacts and the manifest
+
+    Returns:
+        Dictionary with path, hash, run_id and whether the artifact was reused
+    """
+    digest = content_hash(code)
+    path = os.path.join(test_dir, f"{kind}_{digest}.py")
+    run_id = run_id or f"{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+    now = time.time()
+
+    with _locked_manifest(test_dir) as manifest:
+        # Generated tests are run with `python -m` so their bytecode is reused
+        init_path = os.path.join(test_dir, "__init__.py")
+        if not os.path.exists(init_path):
+            open(init_path, "w").close()
+
+        reused = os.path.exists(path)
+        if not reused:
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(code)
+            os.replace(tmp_path, path)
+            py_compile.compile(path, cfile=importlib.util.cache_from_source(path))
+
+        artifact = manifest["artifacts"].setdefault(
+            digest, {"path": path, "kind": kind, "created": now, "runs": 0, "bytes": len(code)}
+        )
+        artifact["runs"] += 1
+        artifact["last_used"] = now
+        manifest["runs"][run_id] = {"hash": digest, "time": now}
+
+        due_for_gc = now - manifest.get("last_gc", 0) > GC_INTERVAL_SECONDS
+
+    if due_for_gc:
+        collect_garbage(test_dir=test_dir)
+
+    return {"path": path, "hash": digest, "run_id": run_id, "reused": reused}
+
+
+def collect_garbage(retention_days: float = RUN_RETENTION_DAYS,
+                    test_dir: str = GENERATED_TESTS_DIR,
+                    dry_run: bool = False) -> Dict:
+    """
+    Forget runs older than the retention window and delete every artifact
+    (and its bytecode) that no remaining run references. Files from before
+    content addressing (test_<timestamp>.py) are removed once they are
+    older than the window.
+
+    Args:
+        retention_days: How long a run keeps its artifact alive
+        test_dir: Directory for artifacts and the manifest
+        dry_run: Only report what would be removed
+
+    Returns:
+        Dictionary with runs_expired, artifacts_removed and bytes_freed
+    """
+    cutoff = time.time() - retention_days * 24 * 3600
+    stats = {"runs_expired": 0, "artifacts_removed": 0, "bytes_freed": 0}
+    if not os.path.isdir(test_dir):
+        return stats
+
+    with _locked_manifest(test_dir) as manifest:
+        expired = [run_id for run_id, run in manifest["runs"].items() if run["time"] < cutoff]
+        live_runs = {k: v for k, v in manifest["runs"].items() if k not in expired}
+        referenced = {run["hash"] for run in live_runs.values()}
+        tracked = {os.path.basename(a["path"]) for a in manifest["artifacts"].values()}
+        stats["runs_expired"] = len(expired)
+
+        doomed = [digest for digest in manifest["artifacts"] if digest not in referenced]
+        paths = [manifest["artifacts"][digest]["path"] for digest in doomed]
+        for name in os.listdir(test_dir):
+            path = os.path.join(test_dir, name)
+            if (name.endswith(".py") and name != "__init__.py" and name not in tracked
+                    and os.path.getmtime(path) < cutoff):
+                paths.append(path)
+
+        for path in paths:
+            for file_path in (path, importlib.util.cache_from_source(path)):
+                if os.path.exists(file_path):
+                    stats["bytes_freed"] += os.path.getsize(file_path)
+                    if not dry_run:
+                        os.remove(file_path)
+            stats["artifacts_removed"] += 1
+
+        if not dry_run:
+            manifest["runs"] = live_runs
+            for digest in doomed:
+                del manifest["artifacts"][digest]
+            manifest["last_gc"] = time.time()
+
+    if stats["artifacts_removed"] and not dry_run:
+        print(f"🗑️  Removed {stats['artifacts_removed']} unreferenced tests "
+              f"({stats['bytes_freed'] / 1024:.1f} KB)")
+    return stats
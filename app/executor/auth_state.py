@@ -0,0 +1,146 @@
+"""
+Authenticated Storage State
+Saves a Playwright storageState snapshot after a successful login sequence
+and lets later tests against the same origin skip the login prefix
+"""
+
+import json
+import os
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+
+# Where snapshots live and how long a saved session is trusted
+AUTH_STATE_DIR = "auth_states"
+AUTH_STATE_TTL = 3600
+
+# Hints that a TYPE step fills in a password field
+PASSWORD_HINTS = ("password", "passwd", "pass", "pwd")
+
+
+def normalize_url(url: str) -> str:
+    """Add https:// like the generator does for bare domains"""
+    if url and not url.startswith(("http://", "https://")):
+        url = f"https://{url}"
+    return url
+
+
+def origin_of(url: str) -> str:
+    """Scheme + host (+ port) of a URL"""
+    parsed = urlparse(normalize_url(url))
+    return f"{parsed.scheme}://{parsed.netloc}"
+
+
+def is_password_step(step: Dict) -> bool:
+    """Whether a TYPE step targets a password field"""
+    text = f"{step.get('selector', '')} {step.get('description', '')}".lower()
+    return any(hint in text for hint in PASSWORD_HINTS)
+
+
+def find_login_sequence(steps: List[Dict]) -> Optional[Tuple[int, int, str]]:
+    """
+    Locate the login prefix: the TYPE steps that follow an OPEN_BROWSER,
+    fill in a password, and end with the CLICK that submits the form
+
+    Args:
+        steps: Parsed test steps
+
+    Returns:
+        (first_index, last_index, origin) of the login sequence, or None
+    """
+    origin = ""
+    start = None
+    saw_password = False
+
+    for i, step in enumerate(steps):
+        action = step.get("action")
+
+        if action == "OPEN_BROWSER":
+            origin = origin_of(step.get("url", ""))
+            start, saw_password = None, False
+
+        elif action == "TYPE" and origin:
+            if start is None:
+                start = i
+            saw_password = saw_password or is_password_step(step)
+
+        elif action == "CLICK" and start is not None:
+            if saw_password:
+                return start, i, origin
+            start = None
+
+        else:
+            start, saw_password = None, False
+
+    return None
+
+
+def state_path(origin: str, state_dir: str = AUTH_STATE_DIR) -> str:
+    """Snapshot path for an origin"""
+    slug = re.sub(r"[^A-Za-z0-9.-]+", "_", urlparse(origin).netloc or origin)
+    return os.path.join(state_dir, f"{slug}.json")
+
+
+def is_state_valid(path: str, ttl: float = AUTH_STATE_TTL) -> bool:
+    """
+    Check a snapshot is recent enough and still holds a live session
+
+    Args:
+        path: Snapshot path
+        ttl: Maximum snapshot age in seconds
+
+    Returns:
+        True if the snapshot can be reused
+    """
+    if not os.path.exists(path):
+        return False
+    if time.time() - os.path.getmtime(path) > ttl:
+        return False
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return False
+
+    # Session cookies (expires == -1) are fine; all-expired means logged out
+    cookies = state.get("cookies", [])
+    now = time.time()
+    live = [c for c in cookies if c.get("expires", -1) == -1 or c["expires"] > now]
+    return bool(live) or bool(state.get("origins"))
+
+
+def invalidate(origin: str, state_dir: str = AUTH_STATE_DIR) -> bool:
+    """Drop the snapshot for an origin; returns True if one existed"""
+    path = state_path(origin, state_dir)
+    if os.path.exists(path):
+        os.remove(path)
+        return True
+    return False
+
+
+def resolve_auth_state(origin: str,
+                       ttl: float = AUTH_STATE_TTL,
+                       state_dir: str = AUTH_STATE_DIR) -> Dict:
+    """
+    Decide whether a run can reuse a saved session
+
+    Args:
+        origin: Origin of the login sequence ("" if the test has none)
+        ttl: Maximum snapshot age in seconds
+        state_dir: Snapshot directory
+
+    Returns:
+        Dictionary with path and valid flag (path "" if no login)
+    """
+    if not origin:
+        return {"path": "", "valid": False}
+
+    path = state_path(origin, state_dir)
+    valid = is_state_valid(path, ttl)
+    if not valid and os.path.exists(path):
+        os.remove(path)  # Expired snapshots are never reused
+    os.makedirs(state_dir, exist_ok=True)
+    return {"path": path, "valid": valid}
@@ -0,0 +1,154 @@
+"""
+Browser Matrix
+Runs one generated test on Chromium, Firefox and WebKit at the same time
+(one test process per engine) and merges the per-engine results, so
+cross-browser coverage costs about the wall time of the slowest engine
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from app.executor.network_archive import NetworkArchiveError, resolve_network_mode
+from app.executor.python_executor_enhanced import ensure_runtime_compiled, execute_python_test
+
+
+BROWSERS = ["chromium", "firefox", "webkit"]
+
+# Per-engine result fields merged across engines (lists tagged by browser, counters summed)
+LIST_FIELDS = ["screenshots", "traces", "visual_checks", "telemetry", "step_durations", "navigation_timings"]
+COST_FIELDS = ["screenshot_cost", "trace_cost"]
+
+
+def execute_browser_matrix(test_file_path: str,
+                           browsers: List[str] = None,
+                           network_mode: str = "live",
+                           stale_policy: str = "rerecord",
+                           **options) -> Dict:
+    """
+    Execute a test on several engines in parallel
+
+    Args:
+        test_file_path: Path to .py test file
+        browsers: Engines to run on (default: all three)
+        network_mode: live, record or replay; resolved once for the whole
+            matrix. When that means recording (also a replay whose archive
+            is missing or stale), only the first engine records (one
+            archive per test), the rest run live
+        stale_policy: Policy for missing/stale archives in replay mode
+        **options: Passed on to execute_python_test (timeout, auth_origin, ...)
+
+    Returns:
+        Merged results (see merge_results)
+    """
+    browsers = [b for b in (browsers or BROWSERS) if b in BROWSERS]
+    print(f"\n🌐 Browser matrix: {', '.join(browsers)}")
+    ensure_runtime_compiled()  # Once, before the engines start
+
+    try:
+        resolved = resolve_network_mode(test_file_path, network_mode, stale_policy)["mode"]
+    except NetworkArchiveError as e:
+        return {"status": "error", "output": "", "errors": str(e), "return_code": -1,
+                "network_mode": network_mode}
+
+    def run(browser: str) -> Dict:
+        mode, policy = resolved, stale_policy
+        if resolved == "record" and browser != browsers[0]:
+            mode = "live"
+        elif resolved == "replay":
+            policy = "serve"  # Already checked fresh: never switch to recording mid-matrix
+        started = time.perf_counter()
+        result = execute_python_test(test_file_path, network_mode=mode, stale_policy=policy,
+                                     browser=browser, **options)
+        return {**result, "wall_seconds": round(time.perf_counter() - started, 3)}
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(browsers)) as pool:
+        results = dict(zip(browsers, pool.map(run, browsers)))
+    return merge_results(results, time.perf_counter() - started)
+
+
+def merge_results(results: Dict[str, Dict], wall_seconds: float) -> Dict:
+    """
+    Merge per-engine execution results into one
+
+    The merged result has the same fields as a single run, passes only if
+    every engine passed, and holds every engine's data: list fields
+    (screenshots, traces, telemetry, ...) are concatenated with each item
+    tagged by browser, cost counters are summed, errors and failure_class
+    come from the failed engines. Scalar fields without a merge rule
+    (har_path, ...) are the first engine's. It adds:
+
+    - browsers: per-engine status, return_code, duration_seconds (test
+      steps), wall_seconds (whole process), failure_class, errors,
+      output_path, peak_rss_mb (cgroup only), max_process_rss_mb and
+      step_durations
+    - matrix: engines, failed engines, wall_seconds, sum_seconds (what
+      running them one after another would have cost) and speedup
+
+    Args:
+        results: Execution result by engine, in matrix order
+        wall_seconds: Wall time of the whole matrix
+
+    Returns:
+        Merged execution result
+    """
+    engines = {}
+    for browser, result in results.items():
+        engines[browser] = {
+            "status": result.get("status", "error"),
+            "return_code": result.get("return_code", -1),
+            "duration_seconds": result.get("duration_seconds"),
+            "wall_seconds": result.get("wall_seconds", 0.0),
+            "failure_class": result.get("failure_class", ""),
+            "errors": result.get("errors", ""),
+            "output_path": result.get("output_path", ""),
+            "peak_rss_mb": result.get("peak_rss_mb"),
+            "max_process_rss_mb": result.get("max_process_rss_mb"),
+            "step_durations": result.get("step_durations", [])
+        }
+
+    failed = [b for b, engine in engines.items() if engine["return_code"] != 0]
+    sum_seconds = sum(engine["wall_seconds"] for engine in engines.values())
+    primary = next(iter(results.values()))
+
+    def tagged(field: str) -> List[Dict]:
+        return [{**item, "browser": browser}
+                for browser, result in results.items() for item in result.get(field) or []]
+
+    def summed(field: str) -> Dict:
+        total = {}
+        for result in results.values():
+            for key, value in (result.get(field) or {}).items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    total[key] = total.get(key, 0) + value
+        return total
+
+    merged = {
+        **primary,
+        "status": "passed" if not failed else "failed",
+        "return_code": 0 if not failed else 1,
+        "output": "\n".join(f"===== {browser} =====\n{result.get('output', '')}"
+                            for browser, result in results.items()),
+        "errors": "\n".join(f"[{browser}] {engines[browser]['errors'] or engines[browser]['failure_class']}"
+                            for browser in failed),
+        "failure_class": next((engines[b]["failure_class"] for b in failed if engines[b]["failure_class"]), ""),
+        "duration_seconds": round(wall_seconds, 3),
+        **{field: tagged(field) for field in LIST_FIELDS},
+        **{field: summed(field) for field in COST_FIELDS},
+        "visual_regressions": sum(result.get("visual_regressions") or 0 for result in results.values()),
+        "killed_processes": sum(result.get("killed_processes") or 0 for result in results.values()),
+        "browsers": engines,
+        "matrix": {
+            "browsers": list(results),
+            "failed": failed,
+            "wall_seconds": round(wall_seconds, 3),
+            "sum_seconds": round(sum_seconds, 3),
+            "speedup": round(sum_seconds / wall_seconds, 2) if wall_seconds else None
+        }
+    }
+
+    summary = ", ".join(f"{b} {'✅' if b not in failed else '❌'} "
+                        f"{engines[b]['wall_seconds']:.1f}s" for b in engines)
+    print(f"🌐 Matrix finished in {wall_seconds:.1f}s ({summary})")
+    return merged
@@ -0,0 +1,165 @@
+"""
+Network Archive (HAR record/replay)
+Captures each test's network traffic into a HAR archive keyed by test
+and serves it back through Playwright route interception on reruns
+"""
+
+import hashlib
+import os
+import time
+from typing import Dict, Optional
+
+
+# Where archives live and how long a recording is trusted
+HAR_DIR = "network_archives"
+HAR_MAX_AGE_SECONDS = 7 * 24 * 3600
+# Deleted after each run once this old (longer, so stale_policy="serve" still has them)
+HAR_RETENTION_SECONDS = 30 * 24 * 3600
+
+# Network modes understood by generated tests (TEST_NETWORK_MODE)
+NETWORK_MODES = ("live", "record", "replay")
+
+# What to do when replay finds a missing or stale archive:
+#   rerecord - run live and record a fresh archive
+#   fail     - refuse to run (strict offline mode)
+#   serve    - replay the stale archive anyway (missing still re-records)
+STALE_POLICIES = ("rerecord", "fail", "serve")
+
+
+class NetworkArchiveError(Exception):
+    """Raised when a replay cannot be served under the staleness policy"""
+    pass
+
+
+def archive_key(test_file_path: str) -> str:
+    """
+    Key an archive by the test's content, so identical generated code
+    shares one recording no matter which run produced the file
+
+    Args:
+        test_file_path: Path to .py test file
+
+    Returns:
+        16-char hex key
+    """
+    with open(test_file_path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+def archive_path(key: str, har_dir: str = HAR_DIR) -> str:
+    """Path of the HAR zip archive for a test key"""
+    return os.path.join(har_dir, f"{key}.har.zip")
+
+
+def archive_status(path: str, max_age: float = HAR_MAX_AGE_SECONDS) -> str:
+    """
+    Classify an archive as missing, stale or fresh
+
+    Args:
+        path: Archive path
+        max_age: Maximum age in seconds before a recording is stale
+
+    Returns:
+        "missing", "stale" or "fresh"
+    """
+    if not os.path.exists(path):
+        return "missing"
+    age = time.time() - os.path.getmtime(path)
+    return "stale" if age > max_age else "fresh"
+
+
+def resolve_network_mode(test_file_path: str,
+                         mode: str = "live",
+                         stale_policy: str = "rerecord",
+                         max_age: float = HAR_MAX_AGE_SECONDS,
+                         har_dir: str = HAR_DIR) -> Dict:
+    """
+    Decide how a test run should use the network
+
+    Args:
+        test_file_path: Path to .py test file
+        mode: Requested mode (live/record/replay)
+        stale_policy: Policy for missing/stale archives in replay mode
+        max_age: Maximum archive age in seconds
+        har_dir: Archive directory
+
+    Returns:
+        Dictionary with effective mode, har_path, key and archive_status
+
+    Raises:
+        NetworkArchiveError: If replay is impossible under the policy
+    """
+    if mode not in NETWORK_MODES:
+        raise NetworkArchiveError(f"Unknown network mode: {mode}")
+    if stale_policy not in STALE_POLICIES:
+        raise NetworkArchiveError(f"Unknown staleness policy: {stale_policy}")
+
+    if mode == "live":
+        return {"mode": "live", "har_path": "", "key": "", "archive_status": ""}
+
+    key = archive_key(test_file_path)
+    path = archive_path(key, har_dir)
+    status = archive_status(path, max_age)
+
+    if mode == "replay" and status != "fresh":
+        if stale_policy == "fail":
+            raise NetworkArchiveError(
+                f"Network archive {path} is {status} (policy: fail)"
+            )
+        if stale_policy == "rerecord" or status == "missing":
+            print(f"   Network archive {status} - re-recording")
+            mode = "record"
+
+    return {"mode": mode, "har_path": path, "key": key, "archive_status": status}
+
+
+def recording_path(har_path: str) -> str:
+    """Temporary path a recording is written to before it is committed"""
+    return har_path[:-len(".har.zip")] + ".partial.har.zip"
+
+
+def commit_recording(har_path: str, succeeded: bool) -> Optional[str]:
+    """
+    Promote a finished recording to the archive, or discard it
+
+    Only recordings of passing runs are kept, so a failed or flaky
+    rerun never replaces a good archive.
+
+    Args:
+        har_path: Final archive path
+        succeeded: Whether the recorded run passed
+
+    Returns:
+        Archive path if committed, else None
+    """
+    partial = recording_path(har_path)
+    if not os.path.exists(partial):
+        return None
+    if not succeeded:
+        os.remove(partial)
+        return None
+    os.replace(partial, har_path)
+    print(f"   Network archive saved: {har_path}")
+    return har_path
+
+
+def purge_stale_archives(max_age: float = HAR_MAX_AGE_SECONDS,
+                         har_dir: str = HAR_DIR) -> int:
+    """
+    Delete stale archives and abandoned partial recordings
+
+    Returns:
+        Number of files removed
+    """
+    if not os.path.isdir(har_dir):
+        return 0
+    removed = 0
+    for name in os.listdir(har_dir):
+        path = os.path.join(har_dir, name)
+        if archive_status(path, max_age) == "stale":
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass  # Purged by another process
+    return removed
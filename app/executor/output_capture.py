@@ -0,0 +1,270 @@
+"""
+Bounded Output Capture
+Streams a test subprocess's stdout/stderr through pipes into bounded
+head/tail buffers, tees it to the terminal, and writes the full stream to a
+gzip sidecar file, so memory stays flat however chatty a test is
+"""
+
+import gzip
+import os
+import sys
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, IO, List, Optional, Tuple
+
+from app.data.ids import new_ulid
+
+
+OUTPUT_DIR = "test_outputs"
+
+# What is kept in memory (and ends up in TestState / the JSON log)
+HEAD_BYTES = 16 * 1024
+TAIL_BYTES = 64 * 1024
+MAX_LINE_BYTES = 4 * 1024
+CUT_MARKER = " ... [line cut, see full output file]\n"
+
+# The sidecar stops growing here (uncompressed bytes)
+SIDECAR_MAX_BYTES = 50 * 1024 * 1024
+
+# Captures of running tests, for incremental readers (e.g. the UI)
+_ACTIVE_CAPTURES = {}
+_ACTIVE_LOCK = threading.Lock()
+
+
+class BoundedOutputBuffer:
+    """
+    Thread-safe line buffer keeping the first HEAD_BYTES and the most recent
+    TAIL_BYTES of a stream; everything in between is counted and dropped
+    """
+
+    def __init__(self, head_bytes: int = HEAD_BYTES, tail_bytes: int = TAIL_BYTES):
+        """
+        Initialize buffer
+
+        Args:
+            head_bytes: Bytes kept from the start of the stream
+            tail_bytes: Bytes kept from the end of the stream
+        """
+        self.head_bytes = head_bytes
+        self.tail_bytes = tail_bytes
+        self.head: List[Tuple[int, str]] = []
+        self.tail = deque()
+        self.head_size = 0
+        self.tail_size = 0
+        self.next_seq = 0
+        self.total_bytes = 0
+        self.dropped_lines = 0
+        self.dropped_bytes = 0
+        self._lock = threading.Lock()
+
+    def append(self, line: str):
+        """Add one line (already decoded, newline included)"""
+        if len(line) > MAX_LINE_BYTES:
+            line = line[:MAX_LINE_BYTES] + f"... [{len(line) - MAX_LINE_BYTES} chars cut]\n"
+        size = len(line.encode("utf-8", errors="replace"))
+
+        with self._lock:
+            seq = self.next_seq
+            self.next_seq += 1
+            self.total_bytes += size
+
+            if not self.tail and self.head_size + size <= self.head_bytes:
+                self.head.append((seq, line))
+                self.head_size += size
+                return
+
+            self.tail.append((seq, line, size))
+            self.tail_size += size
+            while self.tail_size > self.tail_bytes and len(self.tail) > 1:
+                _, _, dropped = self.tail.popleft()
+                self.tail_size -= dropped
+                self.dropped_lines += 1
+                self.dropped_bytes += dropped
+
+    def read_since(self, cursor: int = 0) -> Tuple[str, int]:
+        """
+        Incremental read: lines appended since a previous call
+
+        Args:
+            cursor: Value returned by the previous call (0 to start)
+
+        Returns:
+            (new text, next cursor); lines already dropped are skipped
+        """
+        with self._lock:
+            lines = [line for seq, line in self.head if seq >= cursor]
+            lines += [line for seq, line, _ in self.tail if seq >= cursor]
+            return "".join(lines), self.next_seq
+
+    def text(self) -> str:
+        """Head, a truncation marker if anything was dropped, and tail"""
+        with self._lock:
+            parts = [line for _, line in self.head]
+            if self.dropped_lines:
+                parts.append(f"\n... [{self.dropped_lines} lines / {self.dropped_bytes} bytes "
+                             f"truncated, see full output file] ...\n\n")
+            parts += [line for _, line, _ in self.tail]
+            return "".join(parts)
+
+    @property
+    def truncated(self) -> bool:
+        return self.dropped_lines > 0
+
+
+class OutputCapture:
+    """Reader threads draining a process's pipes into bounded buffers"""
+
+    def __init__(self,
+                 name: str,
+                 output_dir: str = OUTPUT_DIR,
+                 tee: bool = True,
+                 on_line: Optional[Callable[[str, str], None]] = None):
+        """
+        Initialize capture
+
+        Args:
+            name: Label for the sidecar file (usually the test file stem)
+            output_dir: Directory for gzip sidecar files
+            tee: Also echo the output to this process's terminal
+            on_line: Optional callback(stream, line) called per line
+        """
+        self.name = name
+        self.tee = tee
+        self.on_line = on_line
+        self.stdout = BoundedOutputBuffer()
+        self.stderr = BoundedOutputBuffer()
+        self.sidecar_bytes = 0
+        self.sidecar_full = False
+        self._sidecar_closed = False
+        self._threads: List[threading.Thread] = []
+        self._sidecar_lock = threading.Lock()
+
+        os.makedirs(output_dir, exist_ok=True)
+        # ULID: unique even for two runs of one test in the same second
+        self.sidecar_path = os.path.join(output_dir, f"{name}_{new_ulid()}.log.gz")
+        self._sidecar = gzip.open(self.sidecar_path, "wt", encoding="utf-8", compresslevel=6)
+
+    def start(self, process):
+        """
+        Start draining a Popen's stdout/stderr pipes
+
+        Args:
+            process: subprocess.Popen with stdout/stderr=PIPE
+        """
+        with _ACTIVE_LOCK:
+            _ACTIVE_CAPTURES[self.name] = self
+        for stream_name, pipe, buffer, echo in (
+            ("stdout", process.stdout, self.stdout, sys.stdout),
+            ("stderr", process.stderr, self.stderr, sys.stderr),
+        ):
+            if pipe is None:
+                continue
+            thread = threading.Thread(
+                target=self._drain, args=(stream_name, pipe, buffer, echo), daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def _drain(self, stream_name: str, pipe: IO[bytes], buffer: BoundedOutputBuffer, echo: IO):
+        # Reads at most MAX_LINE_BYTES at a time: a line without newlines
+        # must not be accumulated whole. Only the first piece of an
+        # over-long line is kept in memory; the sidecar gets all pieces.
+        continuation = False
+        for raw in iter(lambda: pipe.readline(MAX_LINE_BYTES), b""):
+            piece = raw.decode("utf-8", errors="replace")
+            self._write_sidecar(stream_name, piece, continuation)
+            complete = raw.endswith(b"\n")
+            if continuation:
+                continuation = not complete
+                continue
+            continuation = not complete
+            line = piece if complete else piece[:MAX_LINE_BYTES - len(CUT_MARKER)] + CUT_MARKER
+            buffer.append(line)
+            if self.tee:
+                try:
+                    echo.write(line)
+                    echo.flush()
+                except (OSError, ValueError):
+                    pass  # Terminal gone; capture still works
+            if self.on_line:
+                self.on_line(stream_name, line)
+        pipe.close()
+
+    def _write_sidecar(self, stream_name: str, line: str, continuation: bool = False):
+        with self._sidecar_lock:
+            if self.sidecar_full or self._sidecar_closed:
+                return  # Closed: a reader thread outlived finish()
+            prefix = "[stderr] " if stream_name == "stderr" and not continuation else ""
+            record = prefix + line
+            self.sidecar_bytes += len(record.encode("utf-8"))
+            if self.sidecar_bytes > SIDECAR_MAX_BYTES:
+                self.sidecar_full = True
+                record = f"\n... [output file limit of {SIDECAR_MAX_BYTES} bytes reached] ...\n"
+            self._sidecar.write(record)
+
+    def read_since(self, cursor: int = 0) -> Tuple[str, int]:
+        """Incremental stdout read while the test runs (see BoundedOutputBuffer)"""
+        return self.stdout.read_since(cursor)
+
+    def finish(self, join_timeout: float = 5.0) -> Dict:
+        """
+        Wait for the pipes to drain, close the sidecar and summarize
+
+        Args:
+            join_timeout: Seconds to wait for each reader thread
+
+        Returns:
+            Result fields: output, errors, output_path, output_bytes,
+            output_truncated
+        """
+        for thread in self._threads:
+            thread.join(join_timeout)
+        with self._sidecar_lock:
+            self._sidecar_closed = True  # Late lines from stuck readers are dropped
+            self._sidecar.close()
+        with _ACTIVE_LOCK:
+            if _ACTIVE_CAPTURES.get(self.name) is self:
+                del _ACTIVE_CAPTURES[self.name]
+
+        return {
+            "output": self.stdout.text(),
+            "errors": self.stderr.text(),
+            "output_path": self.sidecar_path,
+            "output_bytes": self.stdout.total_bytes + self.stderr.total_bytes,
+            "output_truncated": self.stdout.truncated or self.stderr.truncated
+        }
+
+
+def active_capture(name: str) -> Optional[OutputCapture]:
+    """Capture of a running test by name, for incremental reads"""
+    with _ACTIVE_LOCK:
+        return _ACTIVE_CAPTURES.get(name)
+
+
+def read_output_file(path: str) -> str:
+    """Full output of a finished run from its gzip sidecar"""
+    if not path or not os.path.exists(path):
+        return ""
+    with gzip.open(path, "rt", encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+def purge_old_outputs(max_age_seconds: float = 7 * 24 * 3600,
+                      output_dir: str = OUTPUT_DIR) -> int:
+    """
+    Remove sidecar files older than max_age_seconds
+
+    Returns:
+        Number of files removed
+    """
+    if not os.path.isdir(output_dir):
+        return 0
+    removed = 0
+    cutoff = time.time() - max_age_seconds
+    for name in os.listdir(output_dir):
+        path = os.path.join(output_dir, name)
+        if name.endswith(".log.gz") and os.path.getmtime(path) < cutoff:
+            os.remove(path)
+            removed += 1
+    return removed
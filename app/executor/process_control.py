@@ -0,0 +1,384 @@
+"""
+Test Process Control
+Runs each test in its own session so the whole process tree (Python,
+Playwright driver, browser) can be torn down on timeout or cancellation,
+applies optional memory (cgroup) and CPU caps, and reports resource usage
+"""
+
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+
+IS_POSIX = os.name == "posix"
+
+# Optional caps (0 = unlimited); override per run via execute_python_test
+MEMORY_LIMIT_MB = int(os.getenv("TEST_MEMORY_LIMIT_MB", "0"))
+CPU_LIMIT_SECONDS = int(os.getenv("TEST_CPU_LIMIT_SECONDS", "0"))
+
+# Delegated cgroup v2 directory to create per-test cgroups under, e.g.
+# /sys/fs/cgroup/ai_agent_tests; caps the whole tree instead of each process
+CGROUP_ROOT = os.getenv("TEST_CGROUP_ROOT", "")
+
+# Seconds between SIGTERM and SIGKILL during teardown
+KILL_GRACE_SECONDS = 3.0
+
+# Running tests by name, so they can be cancelled from another thread
+_RUNNING = {}
+_RUNNING_LOCK = threading.Lock()
+
+
+def popen_kwargs() -> Dict:
+    """Popen arguments that put the test in its own session/process group"""
+    if IS_POSIX:
+        return {"start_new_session": True}
+    return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+
+
+def _children_map() -> Dict[int, List[int]]:
+    """Parent pid -> child pids, from /proc (Linux)"""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                stat = f.read()
+        except OSError:
+            continue  # Exited while we were looking
+        # Fields after the parenthesised command name: state, ppid, ...
+        ppid = int(stat.rsplit(")", 1)[1].split()[1])
+        children.setdefault(ppid, []).append(int(entry))
+    return children
+
+
+def process_start_time(pid: int) -> Optional[int]:
+    """
+    Start time of a process in clock ticks since boot (/proc/<pid>/stat
+    field 22), None when it is gone or /proc is unavailable; a pid reused
+    by another process has a different start time
+    """
+    try:
+        with open(f"/proc/{pid}/stat", "r") as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # Fields after the parenthesised command name start at field 3 (state)
+    return int(stat.rsplit(")", 1)[1].split()[19])
+
+
+def _same_process(pid: int, start_time: Optional[int]) -> bool:
+    """Whether pid still is the process whose start time was recorded"""
+    return start_time is not None and process_start_time(pid) == start_time
+
+
+def snapshot_tree(pid: int) -> Dict[int, Optional[int]]:
+    """Descendants of pid with their start times"""
+    return {child: process_start_time(child) for child in descendants(pid)}
+
+
+def descendants(pid: int) -> List[int]:
+    """
+    All processes below pid, including ones that left its session
+    (Playwright launches the browser detached, in a session of its own)
+
+    Args:
+        pid: Root process id
+
+    Returns:
+        Descendant pids, parents before children
+    """
+    if not os.path.isdir("/proc"):
+        return []
+    children = _children_map()
+    found = []
+    stack = list(children.get(pid, []))
+    while stack:
+        child = stack.pop()
+        found.append(child)
+        stack.extend(children.get(child, []))
+    return found
+
+
+def _signal_tree(pid: int, pids: Dict[int, Optional[int]], sig: int):
+    try:
+        os.killpg(pid, sig)  # The test's own session
+    except (ProcessLookupError, PermissionError):
+        pass
+    for child, start_time in pids.items():
+        if not _same_process(child, start_time):
+            continue  # Exited, and the pid may belong to another process now
+        try:
+            os.kill(child, sig)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+
+def kill_process_tree(process: subprocess.Popen,
+                      grace: float = KILL_GRACE_SECONDS,
+                      cgroup: "TestCgroup" = None) -> int:
+    """
+    Terminate a test and everything it started: SIGTERM, then SIGKILL
+    after a grace period
+
+    Args:
+        process: Test process started with popen_kwargs()
+        grace: Seconds to wait for a clean exit before SIGKILL
+        cgroup: The test's cgroup, if any (killed as a unit)
+
+    Returns:
+        Number of processes that were signalled
+    """
+    if not IS_POSIX:
+        # taskkill walks the tree by parent pid on Windows
+        subprocess.run(["taskkill", "/F", "/T", "/PID", str(process.pid)],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return 1
+
+    # Snapshot before killing: orphans are reparented and can't be found later
+    tree = snapshot_tree(process.pid)
+    _signal_tree(process.pid, tree, signal.SIGTERM)
+
+    deadline = time.monotonic() + grace
+    while time.monotonic() < deadline and process.poll() is None:
+        time.sleep(0.1)
+
+    tree.update(snapshot_tree(process.pid))
+    survivors = {pid: start for pid, start in tree.items() if _same_process(pid, start)}
+    _signal_tree(process.pid, survivors, signal.SIGKILL)
+    if cgroup:
+        cgroup.kill()
+    return len(tree) + 1
+
+
+def reap_leftovers(pid: int, tracked: Dict[int, Optional[int]]) -> int:
+    """
+    Kill processes a test left behind after exiting on its own (e.g. a
+    browser that was never closed)
+
+    Only processes still in the test's process group, or tracked ones
+    whose start time is unchanged, are killed: a tracked pid that exited
+    during the run may have been reused by an unrelated process.
+
+    Args:
+        pid: The test process (leader of its process group)
+        tracked: Descendants and start times recorded by wait_with_rusage()
+
+    Returns:
+        Number of processes killed
+    """
+    if not IS_POSIX:
+        return 0
+    leftovers = [child for child, start_time in tracked.items() if _same_process(child, start_time)]
+    try:
+        os.killpg(pid, signal.SIGKILL)  # Whatever stayed in the test's session
+    except (ProcessLookupError, PermissionError):
+        pass
+    for child in leftovers:
+        try:
+            os.kill(child, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+    return len(leftovers)
+
+
+class TestCgroup:
+    """Per-test cgroup v2 with memory.max, when one is delegated to us"""
+
+    def __init__(self, name: str, memory_limit_mb: int):
+        """
+        Create the cgroup
+
+        Args:
+            name: Unique cgroup name
+            memory_limit_mb: memory.max for the whole test tree (0 = none)
+
+        Raises:
+            OSError: If CGROUP_ROOT is missing or not writable
+        """
+        self.path = os.path.join(CGROUP_ROOT, name)
+        os.makedirs(self.path)
+        if memory_limit_mb:
+            self._write("memory.max", str(memory_limit_mb * 1024 * 1024))
+
+    def _write(self, name: str, value: str):
+        with open(os.path.join(self.path, name), "w") as f:
+            f.write(value)
+
+    def _read(self, name: str) -> str:
+        try:
+            with open(os.path.join(self.path, name), "r") as f:
+                return f.read()
+        except OSError:
+            return ""
+
+    def add(self, pid: int):
+        """Move a process in; processes it starts afterwards follow"""
+        self._write("cgroup.procs", str(pid))
+
+    def kill(self):
+        """Kill every process in the cgroup (kernel 5.14+)"""
+        try:
+            self._write("cgroup.kill", "1")
+        except OSError:
+            pass
+
+    def usage(self) -> Dict:
+        """Peak memory and CPU time of the whole tree"""
+        usage = {}
+        peak = self._read("memory.peak").strip()
+        if peak.isdigit():
+            usage["peak_rss_mb"] = round(int(peak) / (1024 * 1024), 1)
+        for line in self._read("cpu.stat").splitlines():
+            key, _, value = line.partition(" ")
+            if key == "usage_usec":
+                usage["cpu_seconds"] = round(int(value) / 1e6, 3)
+        return usage
+
+    def remove(self):
+        """Remove the (empty) cgroup"""
+        for _ in range(20):
+            try:
+                os.rmdir(self.path)
+                return
+            except OSError:
+                time.sleep(0.05)  # Killed processes still exiting
+
+
+def apply_limits(process: subprocess.Popen,
+                 name: str,
+                 memory_limit_mb: int = MEMORY_LIMIT_MB,
+                 cpu_limit_seconds: int = CPU_LIMIT_SECONDS) -> Dict:
+    """
+    Cap a freshly started test process
+
+    Memory is only capped through a cgroup (TEST_CGROUP_ROOT), for the whole
+    tree: an address-space rlimit would stop Chromium and Node, which
+    reserve large virtual ranges, from starting at all. Without a cgroup
+    the test runs without a memory cap (with a warning). The CPU cap is a
+    per-process rlimit inherited by everything the test starts. Applied
+    right after spawn, before the test has imported Playwright.
+
+    Args:
+        process: Test process
+        name: Unique name for the cgroup
+        memory_limit_mb: Memory cap in MB (0 = none)
+        cpu_limit_seconds: CPU time cap in seconds (0 = none)
+
+    Returns:
+        Dictionary with the limits applied and the cgroup (or None)
+    """
+    limits = {"memory_limit_mb": memory_limit_mb, "cpu_limit_seconds": cpu_limit_seconds,
+              "enforced_by": "none", "cgroup": None}
+    if not IS_POSIX or not (memory_limit_mb or cpu_limit_seconds or CGROUP_ROOT):
+        return limits
+
+    if CGROUP_ROOT:
+        try:
+            cgroup = TestCgroup(name, memory_limit_mb)
+            cgroup.add(process.pid)
+            limits.update(enforced_by="cgroup", cgroup=cgroup)
+        except OSError as e:
+            print(f"⚠️  cgroup unavailable ({e}), falling back to rlimits")
+
+    if memory_limit_mb and limits["enforced_by"] != "cgroup":
+        print(f"⚠️  No cgroup available: running without the {memory_limit_mb} MB memory cap")
+        limits["memory_limit_mb"] = 0
+
+    if cpu_limit_seconds:
+        import resource
+        try:
+            # Per process: every browser process gets its own budget
+            resource.prlimit(process.pid, resource.RLIMIT_CPU,
+                             (cpu_limit_seconds, cpu_limit_seconds + 5))
+            if limits["enforced_by"] == "none":
+                limits["enforced_by"] = "rlimit"
+        except (OSError, ValueError, AttributeError) as e:
+            print(f"⚠️  Could not apply CPU limit: {e}")
+
+    return limits
+
+
+def wait_with_rusage(process: subprocess.Popen,
+                     timeout: float,
+                     track: Dict[int, Optional[int]] = None) -> Dict:
+    """
+    Wait for a test to exit and collect its resource usage with wait4
+
+    Args:
+        process: Test process
+        timeout: Seconds to wait
+        track: Optional dict filled with the test's descendants (pid ->
+            start time) while it runs, so processes it leaks can be found
+            after it exits
+
+    Returns:
+        Dictionary with return_code, max_process_rss_mb (largest single
+        reaped process, not the tree's total) and cpu_seconds (reaped
+        processes only)
+
+    Raises:
+        subprocess.TimeoutExpired: If the test is still running at timeout
+    """
+    if not hasattr(os, "wait4"):
+        return {"return_code": process.wait(timeout=timeout)}
+
+    deadline = time.monotonic() + timeout
+    delay = 0.01
+    next_scan = 0.0
+    while True:
+        if track is not None and time.monotonic() >= next_scan:
+            for pid in descendants(process.pid):
+                if pid not in track:
+                    track[pid] = process_start_time(pid)
+            next_scan = time.monotonic() + 1.0
+        pid, status, rusage = os.wait4(process.pid, os.WNOHANG)
+        if pid:
+            process.returncode = os.waitstatus_to_exitcode(status)
+            # ru_maxrss is KB on Linux, bytes on macOS; it is the largest
+            # single reaped process, so it says nothing about the tree's
+            # total (only a cgroup's memory.peak does)
+            scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+            return {
+                "return_code": process.returncode,
+                "max_process_rss_mb": round(rusage.ru_maxrss / scale, 1),
+                "cpu_seconds": round(rusage.ru_utime + rusage.ru_stime, 3)
+            }
+        if time.monotonic() >= deadline:
+            raise subprocess.TimeoutExpired(process.args, timeout)
+        time.sleep(delay)
+        delay = min(delay * 2, 0.25)
+
+
+def register(name: str, process: subprocess.Popen, cgroup: "TestCgroup" = None):
+    """Track a running test so cancel_test() can reach it"""
+    with _RUNNING_LOCK:
+        _RUNNING[name] = (process, cgroup)
+
+
+def unregister(name: str):
+    with _RUNNING_LOCK:
+        _RUNNING.pop(name, None)
+
+
+def cancel_test(name: str) -> bool:
+    """
+    Tear down a running test's whole process tree (every engine's run
+    when it runs in a browser matrix)
+
+    Args:
+        name: Test name (test file stem)
+
+    Returns:
+        True if a running test was found
+    """
+    with _RUNNING_LOCK:
+        entries = [entry for key, entry in _RUNNING.items()
+                   if key == name or key.startswith(name + "@")]
+    for process, cgroup in entries:
+        kill_process_tree(process, cgroup=cgroup)
+    return bool(entries)
@@ -1,8 +1,42 @@
 
+import compileall
+import os
 import subprocess
 import sys
+import tempfile
+import threading
 import time
-from typing import Dict, List
+import uuid
+from pprint import pformat
+from typing import Callable, Dict, List
+
+from app.executor.auth_state import resolve_auth_state
+from app.executor.network_archive import (
+    HAR_RETENTION_SECONDS,
+    NetworkArchiveError,
+    commit_recording,
+    purge_stale_archives,
+    recording_path,
+    resolve_network_mode,
+)
+from app.executor.output_capture import OutputCapture, purge_old_outputs
+from app.executor import process_control, tracing
+from app.executor.screenshots import enforce_retention
+from app.executor.telemetry import read_events, summarize, wait_samples
+from app.executor.timeout_model import TIMING_HISTORY_PATH, TimeoutModel
+
+
+# Modules a generated test imports (relative to app/executor)
+RUNTIME_MODULES = ["runtime.py", "auth_state.py", "readiness.py", "screenshots.py",
+                   "timeout_model.py", "tracing.py"]
+_RUNTIME_COMPILED = False
+
+# Runs of a browser matrix finish concurrently; the timing history and the
+# artifact retention sweeps are read-modify-write
+_SHARED_FILES_LOCK = threading.Lock()
+
+# Directory holding the app package
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 
 def generate_adaptive_python_test(
@@ -17,6 +51,12 @@ def generate_adaptive_python_test(
     - Multi-site search support (Google, YouTube, Amazon)
     - Cookie consent handling
     - Slow motion for visibility
+    - Per-step timeouts (learned per domain, see timeout_model)
+    
+    The test itself is only its step list; helpers and the step logic live
+    in app.executor.runtime, which is imported (and compiled) once. Learned
+    timeouts are looked up when the test runs, so the file (and with it
+    the network archive and artifact keys) only changes with the steps.
     """
     
     lines = []
@@ -24,294 +64,310 @@ def generate_adaptive_python_test(
     lines.append('Auto-generated Playwright test with adaptive selectors\n')
     lines.append('Browser: VISIBLE MODE for demonstration\n')
     lines.append('"""\n\n')
-    
-    lines.append('from playwright.sync_api import sync_playwright, expect, TimeoutError as PWTimeoutError\n')
-    lines.append('import sys\n')
-    lines.append('import time\n\n\n')
-    
-    # Add helper function for adaptive selector finding
-    lines.append('def find_element_adaptive(page, selectors, element_name="element"):\n')
-    lines.append('    """Try multiple selectors until one works"""\n')
-    lines.append('    for selector in selectors:\n')
-    lines.append('        try:\n')
-    lines.append('            elem = page.locator(selector).first\n')
-    lines.append('            elem.wait_for(state="visible", timeout=5000)\n')
-    lines.append('            print(f"   Found {element_name} using: {selector}")\n')
-    lines.append('            return elem\n')
-    lines.append('        except:\n')
-    lines.append('            continue\n')
-    lines.append('    raise Exception(f"Could not find {element_name} with any selector")\n\n\n')
-    
-    lines.append('def handle_cookie_consent(page):\n')
-    lines.append('    """Handle common cookie consent popups"""\n')
-    lines.append('    consent_selectors = [\n')
-    lines.append('        "button:has-text(\\"Accept all\\")",\n')
-    lines.append('        "button:has-text(\\"Accept\\")",\n')
-    lines.append('        "button:has-text(\\"I agree\\")",\n')
-    lines.append('        "[id*=\\"accept\\"]",\n')
-    lines.append('        "[class*=\\"accept\\"]"\n')
-    lines.append('    ]\n')
-    lines.append('    for selector in consent_selectors:\n')
-    lines.append('        try:\n')
-    lines.append('            page.locator(selector).click(timeout=3000)\n')
-    lines.append('            print("   Accepted cookies")\n')
-    lines.append('            return True\n')
-    lines.append('        except:\n')
-    lines.append('            continue\n')
-    lines.append('    return False\n\n\n')
-    
-    lines.append('def run_test():\n')
-    lines.append('    """Execute the test with error handling"""\n')
-    lines.append('    print(" Starting test execution in VISIBLE MODE...")\n')
-    lines.append('    \n')
-    lines.append('    with sync_playwright() as p:\n')
-    lines.append('        # Launch VISIBLE browser with slow motion\n')
-    lines.append('        browser = p.chromium.launch(\n')
-    lines.append('            headless=True,  # Visible for demo\n')
-    lines.append('            slow_mo=900       # Slow motion effect\n')
-    lines.append('        )\n')
-    lines.append('        context = browser.new_context(\n')
-    lines.append('            viewport={"width": 1280, "height": 720},\n')
-    lines.append('            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"\n')
-    lines.append('        )\n')
-    lines.append('        page = context.new_page()\n')
-    lines.append('        \n')
-    lines.append('        try:\n')
-    
-    # Generate steps with error handling
-    for i, step in enumerate(steps, 1):
-        action = step.get("action", "")
-        
-        lines.append(f'            print("\\n  Step {i}: {action}")\n')
-        lines.append('            try:\n')
-        
-        if action == "OPEN_BROWSER":
-            url = step.get("url", "")
-            if not url.startswith(("http://", "https://")):
-                url = f"https://{url}"
-            
-            lines.append(f'                print("   Opening {url}...")\n')
-            lines.append(f'                page.goto("{url}", wait_until="domcontentloaded", timeout=30000)\n')
-            lines.append('                page.wait_for_load_state("domcontentloaded")\n')
-            lines.append('                time.sleep(2)  # Let page stabilize\n')
-            lines.append('                \n')
-            lines.append('                # Handle cookie consent\n')
-            lines.append('                handle_cookie_consent(page)\n')
-            lines.append('                \n')
-            lines.append('                print("   Page loaded")\n')
-        
-        elif action == "SEARCH":
-            query = step.get("query", "")
-            query = query.replace('"', '\\"')
-            
-            lines.append(f'                print("   Searching for: {query}")\n')
-            lines.append('                \n')
-            lines.append('                # Click somewhere to activate page\n')
-            lines.append('                page.mouse.click(300, 300)\n')
-            lines.append('                time.sleep(1)\n')
-            lines.append('                \n')
-            lines.append('                # Detect site and use appropriate search\n')
-            lines.append('                current_url = page.url.lower()\n')
-            lines.append('                \n')
-            
-            # GOOGLE
-            lines.append('                if "google." in current_url:\n')
-            lines.append('                    print("   Google search detected")\n')
-            lines.append('                    search_selectors = [\n')
-            lines.append('                        "textarea[name=\\"q\\"]",\n')
-            lines.append('                        "input[name=\\"q\\"]",\n')
-            lines.append('                        "input[type=\\"search\\"]"\n')
-            lines.append('                    ]\n')
-            lines.append('                    search_box = find_element_adaptive(page, search_selectors, "Google search box")\n')
-            lines.append(f'                    search_box.fill("{query}")\n')
-            lines.append('                    page.keyboard.press("Enter")\n')
-            lines.append('                \n')
-            
-            # YOUTUBE
-            lines.append('                elif "youtube.com" in current_url:\n')
-            lines.append('                    print("   YouTube search detected")\n')
-            lines.append('                    page.wait_for_selector("input[name=\\"search_query\\"]", timeout=30000)\n')
-            lines.append('                    page.click("input[name=\\"search_query\\"]")\n')
-            lines.append(f'                    page.fill("input[name=\\"search_query\\"]", "{query}")\n')
-            lines.append('                    page.keyboard.press("Enter")\n')
-            lines.append('                \n')
-            
-            # AMAZON
-            lines.append('                elif "amazon." in current_url:\n')
-            lines.append('                    print("   Amazon search detected")\n')
-            lines.append('                    amazon_selectors = [\n')
-            lines.append('                        "#twotabsearchtextbox",\n')
-            lines.append('                        "input[type=\\"text\\"][name=\\"field-keywords\\"]"\n')
-            lines.append('                    ]\n')
-            lines.append('                    search_box = find_element_adaptive(page, amazon_selectors, "Amazon search")\n')
-            lines.append(f'                    search_box.fill("{query}")\n')
-            lines.append('                    page.keyboard.press("Enter")\n')
-            lines.append('                \n')
-            
-            # FALLBACK
-            lines.append('                else:\n')
-            lines.append('                    print("    Generic search - trying common selectors")\n')
-            lines.append('                    generic_selectors = [\n')
-            lines.append('                        "input[type=\\"search\\"]",\n')
-            lines.append('                        "input[name*=\\"search\\"]",\n')
-            lines.append('                        "input[placeholder*=\\"Search\\"]",\n')
-            lines.append('                        "[data-testid*=\\"search\\"]"\n')
-            lines.append('                    ]\n')
-            lines.append('                    search_box = find_element_adaptive(page, generic_selectors, "search box")\n')
-            lines.append(f'                    search_box.fill("{query}")\n')
-            lines.append('                    page.keyboard.press("Enter")\n')
-            lines.append('                \n')
-            lines.append('                page.wait_for_load_state("networkidle", timeout=15000)\n')
-            lines.append('                time.sleep(3)  # Let results load\n')
-            lines.append('                print("   Search completed")\n')
-        
-        elif action == "CLICK":
-            selector = step.get("selector", "")
-            description = step.get("description", "element")
-            
-            lines.append(f'                print("   Clicking: {description}")\n')
-            lines.append(f'                page.locator("{selector}").wait_for(state="visible", timeout=10000)\n')
-            lines.append(f'                page.locator("{selector}").click()\n')
-            lines.append('                time.sleep(2)\n')
-            lines.append('                print("   Clicked")\n')
-        
-        elif action == "TYPE":
-            selector = step.get("selector", "")
-            value = step.get("value", "")
-            value = value.replace('"', '\\"')
-            
-            lines.append(f'                print("  ⌨  Typing...")\n')
-            lines.append(f'                page.locator("{selector}").wait_for(state="visible", timeout=10000)\n')
-            lines.append(f'                page.locator("{selector}").click()\n')
-            lines.append(f'                page.locator("{selector}").fill("{value}")\n')
-            lines.append('                time.sleep(1)\n')
-            lines.append('                print("   Typed")\n')
-        
-        elif action == "CHECK_LOGIN":
-            expected = step.get("expected", False)
-            
-            lines.append(f'                print("   Checking login status (expected: {expected})")\n')
-            lines.append('                logout_selectors = [\n')
-            lines.append('                    "a[href*=\\"logout\\"]",\n')
-            lines.append('                    "button:has-text(\\"Sign Out\\")",\n')
-            lines.append('                    "button:has-text(\\"Log Out\\")",\n')
-            lines.append('                    "[data-testid*=\\"user\\"]",\n')
-            lines.append('                    ".user-menu"\n')
-            lines.append('                ]\n')
-            lines.append('                is_logged_in = False\n')
-            lines.append('                for selector in logout_selectors:\n')
-            lines.append('                    try:\n')
-            lines.append('                        page.locator(selector).wait_for(state="visible", timeout=3000)\n')
-            lines.append('                        is_logged_in = True\n')
-            lines.append('                        print(f"   Login detected via: {selector}")\n')
-            lines.append('                        break\n')
-            lines.append('                    except:\n')
-            lines.append('                        continue\n')
-            
-            if expected:
-                lines.append('                assert is_logged_in, "Expected to be logged in"\n')
-            else:
-                lines.append('                assert not is_logged_in, "Expected to be logged out"\n')
-            
-            lines.append('                print("   Login check passed")\n')
-        
-        elif action == "WAIT":
-            duration = step.get("duration", 3000)
-            lines.append(f'                print("    Waiting {duration}ms")\n')
-            lines.append(f'                page.wait_for_timeout({duration})\n')
-        
-        elif action == "SCREENSHOT":
-            filename = step.get("filename", "screenshot.png")
-            lines.append(f'                print("   Taking screenshot: {filename}")\n')
-            lines.append(f'                page.screenshot(path="screenshots/{filename}")\n')
-            lines.append('                print("   Screenshot saved")\n')
-        
-        # Close try block for step
-        lines.append('            except Exception as step_error:\n')
-        lines.append(f'                print(f"    Step {i} error: {{step_error}}")\n')
-        lines.append('                page.screenshot(path="screenshots/error_step_{i}.png")\n')
-        lines.append('                raise\n')
-        lines.append('            \n')
-    
-    # Success case
-    lines.append('            print("\\n All steps PASSED!")\n')
-    lines.append('            print(" Browser stays open for 20 seconds for inspection")\n')
-    lines.append('            time.sleep(20)\n')
-    lines.append('            browser.close()\n')
-    lines.append('            return 0\n')
-    lines.append('            \n')
-    
-    # Error handling
-    lines.append('        except AssertionError as e:\n')
-    lines.append('            print(f"\\n Assertion failed: {e}")\n')
-    lines.append('            page.screenshot(path="screenshots/assertion_failed.png")\n')
-    lines.append('            time.sleep(20)\n')
-    lines.append('            browser.close()\n')
-    lines.append('            return 1\n')
-    lines.append('            \n')
-    lines.append('        except PWTimeoutError as e:\n')
-    lines.append('            print(f"\\n  Timeout: {e}")\n')
-    lines.append('            page.screenshot(path="screenshots/timeout_error.png")\n')
-    lines.append('            time.sleep(20)\n')
-    lines.append('            browser.close()\n')
-    lines.append('            return 1\n')
-    lines.append('            \n')
-    lines.append('        except Exception as e:\n')
-    lines.append('            print(f"\\n Test FAILED: {e}")\n')
-    lines.append('            page.screenshot(path="screenshots/test_error.png")\n')
-    lines.append('            time.sleep(20)\n')
-    lines.append('            browser.close()\n')
-    lines.append('            return 1\n')
-    lines.append('\n\n')
+    lines.extend(generate_runtime_bootstrap())
+    lines.append('from app.executor.runtime import run_test\n\n')
+    lines.append(f'STEPS = {pformat(steps, sort_dicts=False)}\n\n\n')
     lines.append('if __name__ == "__main__":\n')
-    lines.append('    exit_code = run_test()\n')
+    lines.append('    exit_code = run_test(STEPS)\n')
     lines.append('    sys.exit(exit_code)\n')
     
     return "".join(lines)
 
 
-def execute_python_test(test_file_path: str, timeout: int = 180) -> Dict:
+def generate_runtime_bootstrap() -> List[str]:
+    """Imports that make app.executor.runtime importable from a generated test"""
+    return [
+        'import os\n',
+        'import sys\n\n',
+        '# Generated tests live in app/generated_tests; the project root holds app/\n',
+        'sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))\n\n',
+    ]
+
+
+def ensure_runtime_compiled():
+    """
+    Byte-compile the runtime and the modules it imports, so test processes
+    load cached bytecode instead of compiling it themselves
+    """
+    global _RUNTIME_COMPILED
+    if _RUNTIME_COMPILED:
+        return
+    executor_dir = os.path.dirname(os.path.abspath(__file__))
+    for module in RUNTIME_MODULES:
+        compileall.compile_file(os.path.join(executor_dir, module), quiet=1)
+    _RUNTIME_COMPILED = True
+
+
+def test_command(test_file_path: str) -> List[str]:
+    """
+    Command line for a test: `python -m app.generated_tests.<name>` when the
+    file is inside the app package, so its cached bytecode is reused
+    (running a script path always recompiles it); the plain path otherwise
+    """
+    path = os.path.abspath(test_file_path)
+    relative = os.path.relpath(path, PROJECT_ROOT)
+    parts = relative[:-len(".py")].split(os.sep)
+    
+    is_package = not relative.startswith("..") and all(
+        os.path.exists(os.path.join(PROJECT_ROOT, *parts[:depth], "__init__.py"))
+        for depth in range(1, len(parts))
+    )
+    if relative.endswith(".py") and len(parts) > 1 and is_package:
+        return [sys.executable, "-m", ".".join(parts)]
+    return [sys.executable, test_file_path]
+
+
+def execute_python_test(test_file_path: str,
+                        timeout: int = 180,
+                        network_mode: str = "live",
+                        stale_policy: str = "rerecord",
+                        auth_origin: str = "",
+                        extra_env: Dict = None,
+                        on_output: Callable[[str, str], None] = None,
+                        memory_limit_mb: int = None,
+                        cpu_limit_seconds: int = None,
+                        trace_mode: str = None,
+                        browser: str = None) -> Dict:
     """
     Execute Python test with longer timeout for visible mode
     
     Args:
         test_file_path: Path to .py test file
         timeout: Maximum execution time (180s for visible mode)
+        network_mode: live, record (capture HAR) or replay (serve HAR)
+        stale_policy: What replay does with a missing/stale archive
+        auth_origin: Origin of the test's login sequence, enables
+            saving/reusing its authenticated storage state
+        extra_env: Additional environment variables for the test process
+        on_output: Optional callback(stream, line) for live output lines
+        memory_limit_mb: Memory cap for the test (default TEST_MEMORY_LIMIT_MB)
+        cpu_limit_seconds: CPU time cap (default TEST_CPU_LIMIT_SECONDS)
+        trace_mode: "failure" to keep Playwright traces of failed/flaky
+            steps, "off" for none (default TEST_TRACE)
+        browser: chromium, firefox or webkit (default TEST_BROWSER or
+            chromium); runs of the same test on different engines can
+            execute concurrently
         
     Returns:
-        Execution results dictionary
+        Execution results dictionary; output/errors hold the bounded
+        head and tail, output_path the full gzip-compressed stream,
+        peak_rss_mb/cpu_seconds the test's resource usage, traces the
+        trace archives kept
     """
     
     print(f"\n🎭 Executing: {test_file_path}")
     print("👁️  Running in VISIBLE MODE - Browser will appear")
     
+    ensure_runtime_compiled()
+    
     try:
-        result = subprocess.run(
-            [sys.executable, test_file_path],
-            stdout=sys.stdout,  # Live output to terminal
-            stderr=sys.stderr,  # Live errors to terminal
-            timeout=timeout
-        )
-        
+        network = resolve_network_mode(test_file_path, network_mode, stale_policy)
+    except NetworkArchiveError as e:
         return {
-            "status": "passed" if result.returncode == 0 else "failed",
-            "output": "Live output shown in terminal (visible mode)",
-            "errors": "",
-            "return_code": result.returncode
+            "status": "error",
+            "output": "",
+            "errors": str(e),
+            "return_code": -1,
+            "network_mode": network_mode
         }
+    
+    env = os.environ.copy()
+    env["TEST_NETWORK_MODE"] = network["mode"]
+    if network["mode"] == "record":
+        os.makedirs(os.path.dirname(network["har_path"]), exist_ok=True)
+        env["TEST_HAR_PATH"] = recording_path(network["har_path"])
+    else:
+        env["TEST_HAR_PATH"] = network["har_path"]
+    
+    auth = resolve_auth_state(auth_origin)
+    env["TEST_AUTH_STATE_PATH"] = auth["path"]
+    env["TEST_AUTH_STATE_VALID"] = "1" if auth["valid"] else "0"
+    if auth["valid"]:
+        print(f"🔑 Reusing saved session for {auth_origin}")
+    
+    env.update(extra_env or {})
+    
+    # Telemetry side channel: per-step events, also feeds the timeout model
+    fd, telemetry_path = tempfile.mkstemp(suffix=".jsonl", prefix="telemetry_")
+    os.close(fd)
+    env["TEST_TELEMETRY_PATH"] = telemetry_path
+    env["TEST_TIMING_HISTORY_PATH"] = os.path.abspath(TIMING_HISTORY_PATH)  # Timeouts looked up at run time
+    env["PYTHONUNBUFFERED"] = "1"  # Stream lines as they are printed
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [PROJECT_ROOT, env.get("PYTHONPATH")]))
+    
+    # Output goes through pipes: still echoed live to the terminal, but
+    # kept (bounded) for the UI and logs, full copy in a gzip sidecar
+    test_name = os.path.splitext(os.path.basename(test_file_path))[0]
+    if browser:
+        env["TEST_BROWSER"] = browser
+        test_name = f"{test_name}@{browser}"  # One entry per engine in the matrix
+    browser = env.get("TEST_BROWSER", "chromium")
+    capture = OutputCapture(test_name, on_line=on_output)
+    
+    # Screenshots of this run go to screenshots/<run id>/
+    env["TEST_RUN_ID"] = f"{test_name}_{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+    env["TEST_TRACE"] = trace_mode or tracing.TRACE_MODE
+    
+    if memory_limit_mb is None:
+        memory_limit_mb = process_control.MEMORY_LIMIT_MB
+    if cpu_limit_seconds is None:
+        cpu_limit_seconds = process_control.CPU_LIMIT_SECONDS
+    
+    process = None
+    limits = {"cgroup": None}
+    tree = {}  # Descendant pid -> start time
+    started = time.perf_counter()
+    try:
+        # Own session: timeout/cancel tears down the browser too
+        process = subprocess.Popen(
+            test_command(test_file_path),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env=env,
+            **process_control.popen_kwargs()
+        )
+        limits = process_control.apply_limits(
+            process, f"{test_name}_{process.pid}", memory_limit_mb, cpu_limit_seconds
+        )
+        process_control.register(test_name, process, limits["cgroup"])
+        capture.start(process)
+        
+        try:
+            usage = process_control.wait_with_rusage(process, timeout, track=tree)
+        except subprocess.TimeoutExpired:
+            killed = process_control.kill_process_tree(process, cgroup=limits["cgroup"])
+            print(f"⏱️  Timed out, killed {killed} processes")
+            if network["mode"] == "record":
+                commit_recording(network["har_path"], False)
+            captured = capture.finish()
+            return {
+                "status": "timeout",
+                **captured,
+                "errors": f"Test timed out after {timeout} seconds\n{captured['errors']}",
+                "return_code": -1,
+                "network_mode": network["mode"],
+                "killed_processes": killed,
+                **_resource_fields(limits, {}),
+                **_collect_telemetry(telemetry_path, network["mode"], started)
+            }
+        
+        # Browser processes a crashed test never closed
+        leaked = process_control.reap_leftovers(process.pid, tree)
+        if leaked:
+            print(f"🧹 Killed {leaked} leftover processes")
         
-    except subprocess.TimeoutExpired:
+        return_code = usage["return_code"]
+        if network["mode"] == "record":
+            commit_recording(network["har_path"], return_code == 0)
+        
+        telemetry = _collect_telemetry(telemetry_path, network["mode"], started)
         return {
-            "status": "timeout",
-            "output": "",
-            "errors": f"Test timed out after {timeout} seconds",
-            "return_code": -1
+            "status": "passed" if return_code == 0 else "failed",
+            **capture.finish(),
+            "return_code": return_code,
+            "network_mode": network["mode"],
+            "har_path": network["har_path"],
+            "browser": browser,
+            "killed_processes": leaked,
+            **_resource_fields(limits, usage),
+            **telemetry,
+            **run_visual_checks(telemetry["screenshots"], env["TEST_RUN_ID"],
+                                "" if browser == "chromium" else browser)
         }
     
     except Exception as e:
         return {
             "status": "error",
-            "output": "",
+            **capture.finish(),
             "errors": str(e),
-            "return_code": -1
-        }
\ No newline at end of file
+            "return_code": -1,
+            "network_mode": network["mode"]
+        }
+    
+    finally:
+        # Also reached on KeyboardInterrupt / cancellation of the caller
+        if process is not None:
+            if process.poll() is None:
+                process_control.kill_process_tree(process, cgroup=limits["cgroup"])
+            process_control.unregister(test_name)
+        if limits["cgroup"]:
+            limits["cgroup"].kill()
+            limits["cgroup"].remove()
+        os.remove(telemetry_path)
+        with _SHARED_FILES_LOCK:
+            enforce_retention()
+            enforce_retention(tracing.TRACE_MAX_RUNS, tracing.TRACE_MAX_MB, tracing.TRACES_DIR)
+            purge_old_outputs()
+            purge_stale_archives(HAR_RETENTION_SECONDS)
+
+
+def _resource_fields(limits: Dict, usage: Dict) -> Dict:
+    """Result fields for a run's limits and resource usage"""
+    cgroup = limits.get("cgroup")
+    if cgroup:
+        usage = {**usage, **cgroup.usage()}  # Whole tree, not just one process
+    return {
+        # Whole-tree peak only with a cgroup; wait4 only knows single reaped processes
+        "peak_rss_mb": usage.get("peak_rss_mb"),
+        "max_process_rss_mb": usage.get("max_process_rss_mb"),
+        "cpu_seconds": usage.get("cpu_seconds"),
+        "resource_limits": {k: v for k, v in limits.items() if k != "cgroup"}
+    }
+
+
+def _collect_telemetry(telemetry_path: str, network_mode: str, started: float) -> Dict:
+    """
+    Read a run's telemetry, learn its wait latencies and summarize it
+    
+    Returns:
+        Result fields: telemetry events, per-step summary, real duration
+    """
+    events = read_events(telemetry_path)
+    
+    # Replayed responses are local and would teach unrealistically short timeouts
+    if network_mode != "replay":
+        with _SHARED_FILES_LOCK:
+            TimeoutModel().record_run(wait_samples(events))
+    
+    summary = summarize(events)
+    duration = summary["duration_seconds"]
+    if duration is None:
+        duration = round(time.perf_counter() - started, 3)  # Test never reported
+    
+    return {
+        "telemetry": events,
+        "step_durations": summary["steps"],
+        "navigation_timings": summary["navigation"],
+        "screenshots": summary["screenshots"],
+        "screenshot_cost": summary["screenshot_cost"],
+        "traces": summary["traces"],
+        "trace_cost": summary["trace_cost"],
+        "failure_class": summary["failure_class"],
+        "duration_seconds": duration
+    }
+
+
+def run_visual_checks(screenshots: List[Dict], run_id: str, variant: str = "") -> Dict:
+    """
+    Compare a run's SCREENSHOT step captures with their baselines
+    
+    Args:
+        screenshots: Screenshot records from telemetry
+        run_id: Run id, names the heatmap directory
+        variant: Baseline key suffix (engines render differently)
+    
+    Returns:
+        Result fields: visual_checks and visual_regressions (count)
+    """
+    try:
+        from app.executor.visual_regression import check_screenshots
+    except ImportError as e:
+        print(f"⚠️  Visual regression unavailable: {e}")
+        return {"visual_checks": [], "visual_regressions": 0}
+    
+    checks = check_screenshots(screenshots, run_id, variant=variant)
+    regressions = [c for c in checks if not c["passed"]]
+    for check in regressions:
+        print(f"🖼️  Visual change in {check['key']}: {check['reason']} "
+              f"({check.get('diff_ratio', 0):.2%} of pixels)")
+    return {"visual_checks": checks, "visual_regressions": len(regressions)}
@@ -0,0 +1,330 @@
+"""
+Readiness Engine
+Composable "page is ready" conditions used instead of networkidle and fixed
+sleeps. Conditions are armed before the action that changes the page (so
+they see the requests and navigations it triggers), then polled together
+until all of them hold at once; each one reports how long it took.
+
+Conditions:
+    DomQuiet       - no DOM mutations for quiet_ms
+    ElementStable  - element visible with an unchanged bounding box
+    UrlChanged     - the URL changed (or, with grace_ms, no navigation started)
+    ResponseSeen   - a response whose URL matches a pattern arrived
+    NetworkQuiet   - no (first-party) requests in flight for quiet_ms,
+                     bounded: gives up after max_ms instead of failing
+    AnyOf          - the first of several conditions
+"""
+
+import re
+import time
+from typing import Dict, List, Optional
+
+from app.executor.timeout_model import domain_of
+
+
+# Requests that never "finish" and would keep the network busy forever
+IGNORED_RESOURCE_TYPES = ("websocket", "eventsource", "media")
+
+# Installs a MutationObserver in the current document on first use (and
+# again after every navigation) and reports whether it has been quiet.
+# Only content changes count: attribute churn is mostly animation.
+DOM_QUIET_JS = """
+(quietMs) => {
+    if (!window.__readiness) {
+        const state = { last: performance.now() };
+        new MutationObserver(() => { state.last = performance.now(); })
+            .observe(document, { subtree: true, childList: true, characterData: true });
+        window.__readiness = state;
+    }
+    return performance.now() - window.__readiness.last >= quietMs;
+}
+"""
+
+
+class ReadinessTimeout(Exception):
+    """A required condition was not met in time"""
+
+
+class Condition:
+    """Base condition: armed before the action, polled after it"""
+
+    name = "condition"
+
+    def __init__(self, required: bool = True, max_ms: Optional[int] = None):
+        """
+        Args:
+            required: Raise ReadinessTimeout when not met in time; optional
+                conditions are reported as unmet and no longer waited for
+            max_ms: Own time limit, within the overall timeout
+        """
+        self.required = required
+        self.max_ms = max_ms
+
+    def arm(self, page):
+        """Start observing (before the action)"""
+
+    def poll(self, page) -> bool:
+        """Whether the condition is met now"""
+        raise NotImplementedError
+
+    def disarm(self, page):
+        """Stop observing"""
+
+
+class DomQuiet(Condition):
+    """
+    No DOM content mutations for quiet_ms. Tickers and carousels never go
+    quiet, so runtime steps use it bounded (optional with max_ms).
+    """
+
+    name = "dom_quiet"
+
+    def __init__(self, quiet_ms: int = 500, **options):
+        super().__init__(**options)
+        self.quiet_ms = quiet_ms
+
+    def poll(self, page) -> bool:
+        try:
+            return bool(page.evaluate(DOM_QUIET_JS, self.quiet_ms))
+        except Exception:
+            return False  # Context destroyed by a navigation in progress
+
+
+class ElementStable(Condition):
+    """Element visible and not moving (same bounding box for stable_ms)"""
+
+    name = "element_stable"
+
+    def __init__(self, selector: str, stable_ms: int = 150, **options):
+        super().__init__(**options)
+        self.selector = selector
+        self.stable_ms = stable_ms
+        self._box = None
+        self._since = 0.0
+
+    def poll(self, page) -> bool:
+        locator = page.locator(self.selector).first
+        try:
+            box = locator.bounding_box(timeout=100) if locator.is_visible() else None
+        except Exception:
+            box = None
+        now = time.perf_counter()
+        if box is None or box != self._box:
+            self._box, self._since = box, now
+            return False
+        return (now - self._since) * 1000 >= self.stable_ms
+
+
+class UrlChanged(Condition):
+    """
+    URL differs from the one at arm time. With grace_ms, also met when no
+    main-frame navigation started within grace_ms (the action stayed on
+    the page), so it can follow clicks that may or may not navigate.
+    """
+
+    name = "url_changed"
+
+    def __init__(self, grace_ms: Optional[int] = None, **options):
+        super().__init__(**options)
+        self.grace_ms = grace_ms
+        self.from_url = ""
+        self._armed_at = 0.0
+        self._navigating = False
+
+    def _on_request(self, request):
+        try:
+            if request.is_navigation_request() and request.frame.parent_frame is None:
+                self._navigating = True
+        except Exception:
+            pass
+
+    def arm(self, page):
+        self.from_url = page.url
+        self._armed_at = time.perf_counter()
+        page.on("request", self._on_request)
+
+    def poll(self, page) -> bool:
+        if page.url != self.from_url:
+            return True
+        if self.grace_ms is None or self._navigating:
+            return False
+        return (time.perf_counter() - self._armed_at) * 1000 >= self.grace_ms
+
+    def disarm(self, page):
+        page.remove_listener("request", self._on_request)
+
+
+class ResponseSeen(Condition):
+    """A response whose URL matches a regular expression arrived"""
+
+    name = "response_seen"
+
+    def __init__(self, pattern: str, **options):
+        super().__init__(**options)
+        self.pattern = re.compile(pattern)
+        self.seen = False
+
+    def _on_response(self, response):
+        if self.pattern.search(response.url):
+            self.seen = True
+
+    def arm(self, page):
+        page.on("response", self._on_response)
+
+    def poll(self, page) -> bool:
+        return self.seen
+
+    def disarm(self, page):
+        page.remove_listener("response", self._on_response)
+
+
+class NetworkQuiet(Condition):
+    """
+    At most max_inflight requests in flight for quiet_ms. Third-party
+    requests (ads, analytics) are ignored by default, and the wait is
+    bounded: after max_ms it is reported unmet instead of failing the step.
+    """
+
+    name = "network_quiet"
+
+    def __init__(self, quiet_ms: int = 500, max_inflight: int = 0,
+                 first_party_only: bool = True, max_ms: int = 3000, required: bool = False):
+        super().__init__(required=required, max_ms=max_ms)
+        self.quiet_ms = quiet_ms
+        self.max_inflight = max_inflight
+        self.first_party_only = first_party_only
+        self.inflight = set()
+        self._since = None
+
+    def _on_request(self, request):
+        if request.resource_type not in IGNORED_RESOURCE_TYPES:
+            self.inflight.add(request)
+
+    def _on_done(self, request):
+        self.inflight.discard(request)
+
+    def busy(self, page) -> int:
+        """Requests in flight that count (first-party: the page's current site)"""
+        if not self.first_party_only:
+            return len(self.inflight)
+        site = domain_of(page.url)
+        hosts = (domain_of(request.url) for request in self.inflight)
+        return sum(1 for host in hosts if not site or host == site or host.endswith("." + site))
+
+    def arm(self, page):
+        page.on("request", self._on_request)
+        page.on("requestfinished", self._on_done)
+        page.on("requestfailed", self._on_done)
+
+    def poll(self, page) -> bool:
+        now = time.perf_counter()
+        if self.busy(page) > self.max_inflight:
+            self._since = None
+            return False
+        if self._since is None:
+            self._since = now
+        return (now - self._since) * 1000 >= self.quiet_ms
+
+    def disarm(self, page):
+        page.remove_listener("request", self._on_request)
+        page.remove_listener("requestfinished", self._on_done)
+        page.remove_listener("requestfailed", self._on_done)
+
+
+class AnyOf(Condition):
+    """Met as soon as one of its conditions is"""
+
+    def __init__(self, *conditions: Condition, **options):
+        super().__init__(**options)
+        self.conditions = conditions
+        self.name = "any(" + "|".join(c.name for c in conditions) + ")"
+
+    def arm(self, page):
+        for condition in self.conditions:
+            condition.arm(page)
+
+    def poll(self, page) -> bool:
+        return any(condition.poll(page) for condition in self.conditions)
+
+    def disarm(self, page):
+        for condition in self.conditions:
+            condition.disarm(page)
+
+
+class Readiness:
+    """A set of conditions armed together and waited on until all hold"""
+
+    def __init__(self, page, *conditions: Condition):
+        """
+        Arm conditions; create this before the action, wait() after it
+
+        Args:
+            page: Playwright page
+            *conditions: Conditions that must hold at the same time
+        """
+        self.page = page
+        self.conditions = conditions
+        self.report: List[Dict] = []  # Filled by wait(), also on timeout
+        for condition in conditions:
+            condition.arm(page)
+
+    def wait(self, timeout_ms: int, poll_ms: int = 50) -> List[Dict]:
+        """
+        Poll every condition until all of them hold at once (quiet windows
+        can end again, so each one is re-checked on every tick). Optional
+        conditions stop being waited for after their own max_ms.
+
+        Args:
+            timeout_ms: Overall time limit
+            poll_ms: Polling interval (Playwright events are delivered
+                while waiting, so listeners stay current)
+
+        Returns:
+            One {condition, met, required, ms} report per condition, ms
+            being when it (last) became met, or how long it was waited for
+
+        Raises:
+            ReadinessTimeout: A required condition was not met in time
+        """
+        started = time.perf_counter()
+        deadline = started + timeout_ms / 1000
+        met_at: List[Optional[float]] = [None] * len(self.conditions)
+
+        def expired(condition: Condition, now: float) -> bool:
+            return condition.max_ms is not None and (now - started) * 1000 >= condition.max_ms
+
+        try:
+            while True:
+                now = time.perf_counter()
+                for i, condition in enumerate(self.conditions):
+                    if condition.poll(self.page):
+                        met_at[i] = met_at[i] or now
+                    else:
+                        met_at[i] = None
+                pending = [c for i, c in enumerate(self.conditions)
+                           if met_at[i] is None and not expired(c, now)]
+                if not pending or now >= deadline:
+                    break
+                self.page.wait_for_timeout(poll_ms)
+        finally:
+            now = time.perf_counter()
+            for condition, at in zip(self.conditions, met_at):
+                waited = now - started
+                if at is None and condition.max_ms is not None:
+                    waited = min(waited, condition.max_ms / 1000)
+                self.report.append({
+                    "condition": condition.name,
+                    "met": at is not None,
+                    "required": condition.required,
+                    "ms": round(((at or started + waited) - started) * 1000, 1)
+                })
+            for condition in self.conditions:
+                try:
+                    condition.disarm(self.page)
+                except Exception:
+                    pass
+
+        missing = [r["condition"] for r in self.report if r["required"] and not r["met"]]
+        if missing:
+            raise ReadinessTimeout(f"Page not ready within {timeout_ms}ms: {', '.join(missing)}")
+        return self.report
@@ -0,0 +1,667 @@
+"""
+Generated Test Runtime
+Helpers and step implementations shared by every generated test. Generated
+files hold only their step list and call run_test() / run_suite() here, so
+this module is compiled once and fixes apply to already-generated tests
+"""
+
+import json
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from playwright.sync_api import sync_playwright, TimeoutError as PWTimeoutError
+
+from app.executor.auth_state import find_login_sequence, invalidate, is_password_step
+from app.executor.readiness import (
+    AnyOf,
+    DomQuiet,
+    ElementStable,
+    NetworkQuiet,
+    Readiness,
+    ReadinessTimeout,
+    ResponseSeen,
+    UrlChanged,
+)
+from app.executor.screenshots import ScreenshotPipeline
+from app.executor.timeout_model import DEFAULT_TIMEOUTS_MS, TimeoutModel, domain_of
+from app.executor.tracing import FailureTracer
+
+
+# Telemetry side channel (JSON lines) read by the executor
+TELEMETRY_PATH = os.environ.get("TEST_TELEMETRY_PATH", "")
+CURRENT_STEP = 0
+STEP_FLAKY = False  # Current step needed fallback selectors
+TEST_STARTED = time.perf_counter()
+
+# Screenshots go to screenshots/<run id>/, encoded in the background
+RUN_ID = os.environ.get("TEST_RUN_ID") or f"{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+SCREENSHOT_SCOPE = ""  # File name prefix, per branch in suites
+
+# Engine to run on: chromium, firefox or webkit (set per run by the browser matrix)
+BROWSER_NAME = os.environ.get("TEST_BROWSER", "chromium")
+PLAN_DOMAIN = ""  # Domain of the last OPEN_BROWSER step: what wait samples are keyed by
+TIMEOUT_MODEL = None  # Loaded on first use
+
+VIEWPORT = {"width": 1280, "height": 720}
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+
+CONSENT_SELECTORS = [
+    'button:has-text("Accept all")',
+    'button:has-text("Accept")',
+    'button:has-text("I agree")',
+    '[id*="accept"]',
+    '[class*="accept"]'
+]
+
+LOGOUT_SELECTORS = [
+    'a[href*="logout"]',
+    'button:has-text("Sign Out")',
+    'button:has-text("Log Out")',
+    '[data-testid*="user"]',
+    '.user-menu'
+]
+
+# Site-specific search boxes; anything else uses GENERIC_SEARCH_SELECTORS
+GOOGLE_SEARCH_SELECTORS = [
+    'textarea[name="q"]',
+    'input[name="q"]',
+    'input[type="search"]'
+]
+AMAZON_SEARCH_SELECTORS = [
+    '#twotabsearchtextbox',
+    'input[type="text"][name="field-keywords"]'
+]
+GENERIC_SEARCH_SELECTORS = [
+    'input[type="search"]',
+    'input[name*="search"]',
+    'input[placeholder*="Search"]',
+    '[data-testid*="search"]'
+]
+
+
+# ==================== TELEMETRY ====================
+
+def emit(event: str, **fields):
+    """Append one telemetry event"""
+    if not TELEMETRY_PATH:
+        return
+    with open(TELEMETRY_PATH, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"event": event, "t": time.time(), **fields}) + "\n")
+
+
+def classify_failure(error: Exception) -> str:
+    """Coarse failure class for telemetry"""
+    if isinstance(error, (PWTimeoutError, ReadinessTimeout)):
+        return "timeout"
+    if isinstance(error, AssertionError):
+        return "assertion"
+    if "Could not find" in str(error):
+        return "selector_not_found"
+    return "error"
+
+
+def start_test():
+    global TEST_STARTED
+    TEST_STARTED = time.perf_counter()
+    emit("test_start")
+
+
+def end_test(error: Exception = None):
+    emit("test_end", status="failed" if error else "passed",
+         duration=round(time.perf_counter() - TEST_STARTED, 3),
+         failure_class=classify_failure(error) if error else "")
+
+
+def begin_step(step: int, action: str) -> float:
+    global CURRENT_STEP
+    CURRENT_STEP = step
+    emit("step_start", step=step, action=action)
+    return time.perf_counter()
+
+
+def end_step(step: int, action: str, started: float, error: Exception = None):
+    emit("step_end", step=step, action=action,
+         status="failed" if error else "passed",
+         duration=round(time.perf_counter() - started, 3),
+         failure_class=classify_failure(error) if error else "",
+         error=str(error)[:500] if error else "")
+
+
+SCREENSHOTS = ScreenshotPipeline(RUN_ID, on_saved=lambda record: emit("screenshot", **record))
+
+
+# Per-step trace chunks, kept only for failed/flaky steps (TEST_TRACE=failure)
+TRACER = FailureTracer(RUN_ID, on_event=lambda record: emit("trace", **record))
+
+
+def take_screenshot(page, label: str, kind: str = "error", **options) -> str:
+    """Queue a screenshot of the current step; returns its final path"""
+    return SCREENSHOTS.capture(page, CURRENT_STEP, label, kind=kind,
+                               scope=SCREENSHOT_SCOPE, **options)
+
+
+def timeout_model() -> TimeoutModel:
+    """Learned wait latencies (TEST_TIMING_HISTORY_PATH, set by the executor)"""
+    global TIMEOUT_MODEL
+    if TIMEOUT_MODEL is None:
+        TIMEOUT_MODEL = TimeoutModel()
+    return TIMEOUT_MODEL
+
+
+def learned_timeouts(steps: List[Dict], domain: str = "") -> List[Dict]:
+    """Per-step timeouts for this engine, looked up now rather than generated
+    into the test, so a test file does not change as timings are learned"""
+    return timeout_model().plan_timeouts(steps, [BROWSER_NAME], domain)
+
+
+def record_timing(page, action: str, kind: str, seconds: float, selector: str = "", timed_out: bool = False):
+    """Wait latency sample, also learned from by the timeout model. Keyed like
+    TimeoutModel.plan_timeouts: the planned domain (last OPEN_BROWSER step,
+    not wherever redirects led) and the engine"""
+    emit("wait", step=CURRENT_STEP, action=action, kind=kind, url=page.url,
+         domain=PLAN_DOMAIN, engine=BROWSER_NAME, selector=selector,
+         seconds=round(seconds, 4), timed_out=timed_out)
+
+
+@contextmanager
+def timed_wait(page, action: str, kind: str, timeout_ms: int, selector: str = ""):
+    """Record the latency of the wait in the block; a wait that times out
+    is recorded at its timeout, so slow domains raise their learned timeouts"""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        if classify_failure(e) in ("timeout", "selector_not_found"):
+            record_timing(page, action, kind, timeout_ms / 1000, selector, timed_out=True)
+        raise
+    record_timing(page, action, kind, time.perf_counter() - started, selector)
+
+
+def record_navigation(page):
+    """Navigation Timing of the current document (ms from navigation start)"""
+    try:
+        timing = page.evaluate(
+            "() => { const n = performance.getEntriesByType('navigation')[0];"
+            " return n ? n.toJSON() : null; }"
+        )
+    except Exception:
+        timing = None
+    if timing:
+        emit("navigation", step=CURRENT_STEP, url=page.url,
+             ttfb=round(timing.get("responseStart", 0), 1),
+             dom_content_loaded=round(timing.get("domContentLoadedEventEnd", 0), 1),
+             load=round(timing.get("loadEventEnd", 0), 1),
+             transfer_size=timing.get("transferSize", 0))
+
+
+def settled() -> List:
+    """Conditions for "the page stopped changing", bounded so that pages
+    that never fully settle (ads, tickers) only cost a few seconds"""
+    return [DomQuiet(required=False, max_ms=5000), NetworkQuiet()]
+
+
+def wait_ready(ready: Readiness, action: str, timeout_ms: int) -> List[Dict]:
+    """Wait for a step's readiness conditions and report each one's time"""
+    started = time.perf_counter()
+    with timed_wait(ready.page, action, "ready", timeout_ms):
+        try:
+            ready.wait(timeout_ms)
+        finally:
+            emit("readiness", step=CURRENT_STEP, action=action, conditions=ready.report)
+    print("   Ready in {:.0f} ms ({})".format(
+        (time.perf_counter() - started) * 1000,
+        ", ".join(f"{c['condition']} {c['ms']:.0f}" + ("" if c["met"] else " unmet")
+                  for c in ready.report)
+    ))
+    return ready.report
+
+
+# ==================== PAGE HELPERS ====================
+
+def find_element_adaptive(page, selectors: List[str], element_name: str = "element",
+                          timeout: int = 5000):
+    """Try multiple selectors until one works"""
+    global STEP_FLAKY
+    for attempt, selector in enumerate(selectors, 1):
+        try:
+            elem = page.locator(selector).first
+            elem.wait_for(state="visible", timeout=timeout)
+            print(f"   Found {element_name} using: {selector}")
+            emit("selector", step=CURRENT_STEP, name=element_name,
+                 selector=selector, attempts=attempt)
+            STEP_FLAKY = STEP_FLAKY or attempt > 1
+            return elem
+        except Exception:
+            continue
+    raise Exception(f"Could not find {element_name} with any selector")
+
+
+def handle_cookie_consent(page) -> bool:
+    """Handle common cookie consent popups"""
+    for selector in CONSENT_SELECTORS:
+        try:
+            page.locator(selector).click(timeout=3000)
+            print("   Accepted cookies")
+            return True
+        except Exception:
+            continue
+    return False
+
+
+def detect_logged_in(page, password_selector: Optional[str] = None) -> bool:
+    """CHECK_LOGIN logic: look for logout/user indicators"""
+    for selector in LOGOUT_SELECTORS:
+        try:
+            page.locator(selector).wait_for(state="visible", timeout=3000)
+            print(f"   Login detected via: {selector}")
+            return True
+        except Exception:
+            continue
+    # Login form gone after submitting it also counts as logged in, but only
+    # once a page has loaded: mid-navigation every selector counts zero
+    if password_selector:
+        try:
+            page.wait_for_load_state("load", timeout=DEFAULT_TIMEOUTS_MS["navigation"])
+        except Exception:
+            return False
+        if page.url != "about:blank" and page.locator(password_selector).count() == 0:
+            print("   Login detected: login form no longer present")
+            return True
+    return False
+
+
+def launch_browser(p, **options):
+    """Launch the configured engine (headless builds on every engine)"""
+    return getattr(p, BROWSER_NAME).launch(headless=True, **options)
+
+
+def new_context(browser, storage_state=None, **options):
+    """Browser context with the viewport and user agent every test uses"""
+    if BROWSER_NAME == "chromium":
+        # A Chrome user agent on Firefox/WebKit would get Chrome-only markup
+        options.setdefault("user_agent", USER_AGENT)
+    context = browser.new_context(
+        viewport=VIEWPORT,
+        storage_state=storage_state,
+        **options
+    )
+    TRACER.attach(context)
+    return context
+
+
+# ==================== STEP ACTIONS ====================
+
+def open_browser(page, step: Dict, timeouts: Dict):
+    global PLAN_DOMAIN
+    url = step.get("url", "")
+    if not url.startswith(("http://", "https://")):
+        url = f"https://{url}"
+    PLAN_DOMAIN = domain_of(url)
+
+    print(f"   Opening {url}...")
+    ready = Readiness(page, *settled())
+    with timed_wait(page, "OPEN_BROWSER", "navigation", timeouts["navigation"]):
+        page.goto(url, wait_until="domcontentloaded", timeout=timeouts["navigation"])
+    record_navigation(page)
+    wait_ready(ready, "OPEN_BROWSER", timeouts["ready"])
+
+    handle_cookie_consent(page)
+    print("   Page loaded")
+
+
+def search(page, step: Dict, timeouts: Dict):
+    query = step.get("query", "")
+    print(f"   Searching for: {query}")
+
+    # Click somewhere to activate page
+    page.mouse.click(300, 300)
+
+    # Detect site and use appropriate search
+    current_url = page.url.lower()
+
+    if "google." in current_url:
+        print("   Google search detected")
+        with timed_wait(page, "SEARCH", "selector", timeouts["selector"]):
+            search_box = find_element_adaptive(page, GOOGLE_SEARCH_SELECTORS,
+                                               "Google search box", timeouts["selector"])
+        search_box.fill(query)
+
+    elif "youtube.com" in current_url:
+        print("   YouTube search detected")
+        with timed_wait(page, "SEARCH", "navigation", timeouts["navigation"]):
+            page.wait_for_selector('input[name="search_query"]', timeout=timeouts["navigation"])
+        page.click('input[name="search_query"]')
+        page.fill('input[name="search_query"]', query)
+
+    elif "amazon." in current_url:
+        print("   Amazon search detected")
+        with timed_wait(page, "SEARCH", "selector", timeouts["selector"]):
+            search_box = find_element_adaptive(page, AMAZON_SEARCH_SELECTORS,
+                                               "Amazon search", timeouts["selector"])
+        search_box.fill(query)
+
+    else:
+        print("    Generic search - trying common selectors")
+        with timed_wait(page, "SEARCH", "selector", timeouts["selector"]):
+            search_box = find_element_adaptive(page, GENERIC_SEARCH_SELECTORS,
+                                               "search box", timeouts["selector"])
+        search_box.fill(query)
+
+    # Results page: a navigation (or the step's expected response), then a
+    # settled DOM; third-party traffic on ad-heavy sites is not waited for
+    results = [UrlChanged(grace_ms=1000)]
+    if step.get("wait_for_response"):
+        results.append(ResponseSeen(step["wait_for_response"]))
+    ready = Readiness(page, AnyOf(*results), *settled())
+    page.keyboard.press("Enter")
+    wait_ready(ready, "SEARCH", timeouts["ready"])
+    print("   Search completed")
+
+
+def _visible_timeout(step: Dict, timeouts: Dict) -> int:
+    # Waits folded in by the plan optimizer extend the visibility wait
+    return step.get("timeout", timeouts["visible"] + int(step.get("wait_budget", 0)))
+
+
+def click(page, step: Dict, timeouts: Dict):
+    selector = step.get("selector", "")
+    print(f"   Clicking: {step.get('description', 'element')}")
+    visible_timeout = _visible_timeout(step, timeouts)
+    with timed_wait(page, "CLICK", "visible", visible_timeout, selector):
+        Readiness(page, ElementStable(selector)).wait(visible_timeout)
+
+    # Clicks may or may not navigate: wait for the navigation only if one starts
+    ready = Readiness(page, UrlChanged(grace_ms=300), *settled())
+    page.locator(selector).click()
+    wait_ready(ready, "CLICK", timeouts["ready"])
+    print("   Clicked")
+
+
+def type_text(page, step: Dict, timeouts: Dict):
+    selector = step.get("selector", "")
+    print("  ⌨  Typing...")
+    visible_timeout = _visible_timeout(step, timeouts)
+    with timed_wait(page, "TYPE", "visible", visible_timeout, selector):
+        page.locator(selector).wait_for(state="visible", timeout=visible_timeout)
+    page.locator(selector).click()
+    page.locator(selector).fill(step.get("value", ""))
+    time.sleep(1)
+    print("   Typed")
+
+
+def check_login(page, step: Dict, timeouts: Dict):
+    expected = step.get("expected", False)
+    print(f"   Checking login status (expected: {expected})")
+    is_logged_in = detect_logged_in(page)
+    if expected:
+        assert is_logged_in, "Expected to be logged in"
+    else:
+        assert not is_logged_in, "Expected to be logged out"
+    print("   Login check passed")
+
+
+def wait(page, step: Dict, timeouts: Dict):
+    duration = step.get("duration", 3000)
+    print(f"    Waiting {duration}ms")
+    page.wait_for_timeout(duration)
+
+
+def screenshot(page, step: Dict, timeouts: Dict):
+    filename = step.get("filename", "screenshot.png")
+    print(f"   Taking screenshot: {filename}")
+    path = take_screenshot(page, filename, kind="step",
+                           full_page=bool(step.get("full_page")), mask=step.get("mask"))
+    print(f"   Screenshot queued: {path}")
+
+
+STEP_ACTIONS = {
+    "OPEN_BROWSER": open_browser,
+    "SEARCH": search,
+    "CLICK": click,
+    "TYPE": type_text,
+    "CHECK_LOGIN": check_login,
+    "WAIT": wait,
+    "SCREENSHOT": screenshot,
+}
+
+
+def run_step(page, i: int, step: Dict, timeouts: Dict = None):
+    """
+    Run one step: progress print, telemetry, trace chunk, and a
+    screenshot plus re-raise on error
+
+    Args:
+        page: Playwright page
+        i: 1-based step number
+        step: Parsed step
+        timeouts: Timeouts (ms) by kind; missing kinds use the defaults
+    """
+    global STEP_FLAKY
+    action = step.get("action", "")
+    timeouts = {**DEFAULT_TIMEOUTS_MS, **(timeouts or {})}
+
+    print(f"\n  Step {i}: {action}")
+    step_started = begin_step(i, action)
+    STEP_FLAKY = False
+    TRACER.begin_step(page, i)
+    try:
+        step_action = STEP_ACTIONS.get(action)
+        if step_action:
+            step_action(page, step, timeouts)
+        end_step(i, action, step_started)
+        TRACER.end_step(page, i, action, flaky=STEP_FLAKY, scope=SCREENSHOT_SCOPE)
+    except Exception as step_error:
+        end_step(i, action, step_started, step_error)
+        print(f"    Step {i} error: {step_error}")
+        take_screenshot(page, "error")
+        TRACER.end_step(page, i, action, failed=True, scope=SCREENSHOT_SCOPE)
+        raise
+
+
+# ==================== SINGLE TEST ====================
+
+def run_test(steps: List[Dict], step_timeouts: List[Dict] = None) -> int:
+    """
+    Execute a test with error handling
+
+    Args:
+        steps: Parsed test steps
+        step_timeouts: Per-step timeouts (ms) by kind (learned ones when None)
+
+    Returns:
+        Process exit code (0 = passed)
+    """
+    print(" Starting test execution in VISIBLE MODE...")
+    step_timeouts = step_timeouts or learned_timeouts(steps)
+    start_test()
+
+    # Network mode set by the executor: live, record or replay (HAR)
+    network_mode = os.environ.get("TEST_NETWORK_MODE", "live")
+    har_path = os.environ.get("TEST_HAR_PATH", "")
+    replaying = network_mode == "replay" and bool(har_path)
+    hold_seconds = 0 if replaying else 20
+
+    # Saved login session for this origin, validated by the executor
+    auth_state_path = os.environ.get("TEST_AUTH_STATE_PATH", "")
+    session_reused = os.environ.get("TEST_AUTH_STATE_VALID") == "1"
+
+    # Login prefix that a restored session can skip
+    login = find_login_sequence(steps)
+    password_selector = ""
+    if login:
+        password_selector = next(
+            (s.get("selector", "") for s in steps[login[0]:login[1]]
+             if s.get("action") == "TYPE" and is_password_step(s)),
+            ""
+        )
+
+    with sync_playwright() as p:
+        # Launch browser with slow motion (full speed on replay)
+        browser = launch_browser(p, slow_mo=0 if replaying else 900)
+        print(f"   Browser: {BROWSER_NAME}")
+        context_options = {}
+        if network_mode == "record" and har_path:
+            context_options["record_har_path"] = har_path
+            context_options["record_har_content"] = "attach"
+            print(f"   Recording network to {har_path}")
+        context = new_context(browser, auth_state_path if session_reused else None,
+                              **context_options)
+        if replaying:
+            # Serve every request from the archive, never the live site
+            context.route_from_har(har_path, not_found="abort")
+            print(f"   Replaying network from {har_path}")
+        page = context.new_page()
+
+        try:
+            for i, step in enumerate(steps, 1):
+                index = i - 1
+
+                if login and index == login[0] and session_reused:
+                    session_reused = detect_logged_in(page, password_selector)
+                    if session_reused:
+                        print("   Restored authenticated session - skipping login")
+                    else:
+                        print("   Saved session no longer valid - logging in")
+                        # Never restored again, even if this login fails
+                        invalidate(login[2], os.path.dirname(auth_state_path))
+
+                # Login steps only run when no valid session was restored
+                if login and login[0] <= index <= login[1] and session_reused:
+                    print(f"\n  Step {i}: {step.get('action', '')} skipped (session restored)")
+                else:
+                    run_step(page, i, step, step_timeouts[index])
+
+                if login and index == login[1] and auth_state_path and not session_reused:
+                    if detect_logged_in(page, password_selector):
+                        context.storage_state(path=auth_state_path)
+                        print(f"   Saved authenticated session: {auth_state_path}")
+
+            end_test()
+            print("\n All steps PASSED!")
+            print(f" Browser stays open for {hold_seconds} seconds for inspection")
+            exit_code = 0
+
+        except AssertionError as e:
+            end_test(e)
+            print(f"\n Assertion failed: {e}")
+            take_screenshot(page, "assertion_failed")
+            exit_code = 1
+
+        except PWTimeoutError as e:
+            end_test(e)
+            print(f"\n  Timeout: {e}")
+            take_screenshot(page, "timeout_error")
+            exit_code = 1
+
+        except Exception as e:
+            end_test(e)
+            print(f"\n Test FAILED: {e}")
+            take_screenshot(page, "test_error")
+            exit_code = 1
+
+        time.sleep(hold_seconds)
+        TRACER.detach(context)
+        context.close()  # Flushes HAR recording
+        browser.close()
+        SCREENSHOTS.close()  # Finish encoding before the process exits
+        return exit_code
+
+
+# ==================== SHARED-PREFIX SUITE ====================
+
+def run_branch(browser, node: Dict, storage_state, url: str, results: Dict,
+               segment_seconds: Dict, fork_seconds: Dict, failures: List[Exception]):
+    """
+    Run one prefix-tree segment in a context forked from its parent's
+    storage state (cookies + localStorage) at the parent's URL, then fork
+    it for every child segment
+
+    Args:
+        browser: Shared browser
+        node: Segment with id, start, domain, steps, tests, subtree and
+            children
+        storage_state: Parent branch's storage state (None at the root)
+        url: Parent branch's final URL ("" at the root)
+        results: Per-test outcomes, filled in place
+        segment_seconds: Measured seconds per segment id (its steps only),
+            filled in place
+        fork_seconds: Measured seconds of the navigation back to the
+            parent's URL per segment id, filled in place
+        failures: Errors of failed branches, appended in place
+    """
+    global SCREENSHOT_SCOPE, PLAN_DOMAIN
+    SCREENSHOT_SCOPE = f"branch{node['id']}_"
+    domain = node.get("domain", "")  # From the ancestors' OPEN_BROWSER steps
+    PLAN_DOMAIN = domain
+    context = new_context(browser, storage_state)
+    page = context.new_page()
+    try:
+        if url:
+            started = time.time()
+            page.goto(url, wait_until="domcontentloaded",
+                      timeout=timeout_model().timeout_ms(domain, "OPEN_BROWSER", "navigation", BROWSER_NAME))
+            fork_seconds[node["id"]] = round(time.time() - started, 3)
+        started = time.time()
+        step_timeouts = learned_timeouts(node["steps"], domain)
+        # Numbered as in the test the segment belongs to
+        for i, (step, timeouts) in enumerate(zip(node["steps"], step_timeouts), node.get("start", 1)):
+            run_step(page, i, step, timeouts)
+        segment_seconds[node["id"]] = round(time.time() - started, 3)
+        for test_index in node["tests"]:
+            results[test_index] = {"status": "passed", "errors": ""}
+        state = context.storage_state()
+        here = page.url
+    except Exception as e:
+        print(f"\n Branch {node['id']} FAILED: {e}")
+        failures.append(e)
+        for test_index in node["subtree"]:
+            results[test_index] = {"status": "failed", "errors": str(e)}
+        return
+    finally:
+        TRACER.detach(context)
+        context.close()
+
+    if node["children"]:
+        print(f"\n  Forking {len(node['children'])} branches at {here}")
+    for child in node["children"]:
+        run_branch(browser, child, state, here, results, segment_seconds, fork_seconds, failures)
+
+
+def run_suite(tree: Dict, test_count: int) -> int:
+    """
+    Run a prefix tree from the root, writing per-test results to
+    TEST_SUITE_RESULTS_PATH
+
+    Args:
+        tree: Root segment (no steps), as serialized by the suite planner
+        test_count: Number of tests in the suite
+
+    Returns:
+        Process exit code (0 = every test passed)
+    """
+    print(" Starting shared-prefix suite execution...")
+    results = {}
+    segment_seconds = {}
+    fork_seconds = {}
+    failures = []
+    start_test()
+    with sync_playwright() as p:
+        browser = launch_browser(p)
+        for test_index in tree["tests"]:
+            results[test_index] = {"status": "passed", "errors": ""}
+        for child in tree["children"]:
+            run_branch(browser, child, None, "", results, segment_seconds, fork_seconds, failures)
+        browser.close()
+    end_test(failures[0] if failures else None)  # Suite-level outcome: first failure's class
+    SCREENSHOTS.close()
+
+    results_path = os.environ.get("TEST_SUITE_RESULTS_PATH")
+    if results_path:
+        with open(results_path, "w", encoding="utf-8") as f:
+            json.dump({"results": results, "segment_seconds": segment_seconds,
+                       "fork_seconds": fork_seconds}, f)
+    passed = sum(1 for r in results.values() if r["status"] == "passed")
+    print(f"\n Suite finished: {passed}/{test_count} tests passed")
+    return 0 if passed == test_count else 1
@@ -0,0 +1,283 @@
+"""
+Screenshot Pipeline
+Takes raw frames from the test and encodes them off the critical path on a
+background thread: JPEG/WebP at a set quality, one directory per run,
+identical frames stored once (by hash), and retention limits on disk use
+"""
+
+import atexit
+import hashlib
+import io
+import os
+import queue
+import re
+import shutil
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+try:
+    from PIL import Image, features
+    PILLOW_AVAILABLE = True
+except ImportError:
+    PILLOW_AVAILABLE = False  # Frames are kept as the PNG the browser produced
+
+
+SCREENSHOTS_DIR = "screenshots"
+OBJECTS_DIR = "objects"  # Content-addressed frames; run files link here
+
+SCREENSHOT_FORMAT = os.getenv("TEST_SCREENSHOT_FORMAT", "webp")   # webp, jpeg or png
+SCREENSHOT_QUALITY = int(os.getenv("TEST_SCREENSHOT_QUALITY", "80"))
+
+# Retention: newest runs kept, and a cap on the whole directory
+MAX_RUNS = int(os.getenv("TEST_SCREENSHOT_MAX_RUNS", "50"))
+MAX_TOTAL_MB = int(os.getenv("TEST_SCREENSHOT_MAX_MB", "500"))
+# Unlinked frames younger than this may be between os.replace and their link
+OBJECT_GRACE_SECONDS = 300
+
+EXTENSIONS = {"webp": "webp", "jpeg": "jpg", "png": "png"}
+
+
+def resolve_format(image_format: str) -> str:
+    """Requested format, downgraded to what this install can encode"""
+    image_format = image_format.lower().replace("jpg", "jpeg")
+    if image_format not in EXTENSIONS or not PILLOW_AVAILABLE:
+        return "png"
+    if image_format == "webp" and not features.check("webp"):
+        return "jpeg"
+    return image_format
+
+
+def _slug(label: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", os.path.splitext(label)[0]) or "frame"
+
+
+def _link_or_copy(source: str, target: str):
+    """Hard link so identical frames share storage; copy where links fail"""
+    if os.path.exists(target):
+        os.remove(target)
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+
+
+class ScreenshotPipeline:
+    """Background encoder/writer for one test run's screenshots"""
+
+    def __init__(self,
+                 run_id: str,
+                 image_format: str = SCREENSHOT_FORMAT,
+                 quality: int = SCREENSHOT_QUALITY,
+                 screenshots_dir: str = SCREENSHOTS_DIR,
+                 on_saved: Optional[Callable[[Dict], None]] = None):
+        """
+        Initialize pipeline
+
+        Args:
+            run_id: Directory name for this run's screenshots
+            image_format: webp, jpeg or png
+            quality: Lossy encoder quality (1-100)
+            screenshots_dir: Root screenshots directory
+            on_saved: Callback(record) after each frame is written
+        """
+        self.format = resolve_format(image_format)
+        self.quality = quality
+        self.run_dir = os.path.join(screenshots_dir, run_id)
+        self.objects_dir = os.path.join(screenshots_dir, OBJECTS_DIR)
+        self.on_saved = on_saved
+        self.records: List[Dict] = []
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def capture(self, page, step: int, label: str,
+                kind: str = "step",
+                scope: str = "",
+                full_page: bool = False,
+                mask: List[str] = None) -> str:
+        """
+        Grab a frame (the only part on the test's critical path) and queue
+        it for encoding
+
+        Args:
+            page: Playwright page
+            step: Step number (0 for test-level captures)
+            label: Name for the file, e.g. the SCREENSHOT step's filename
+            kind: "step" for SCREENSHOT steps, "error" for failure captures
+            scope: File name prefix (suite branch)
+            full_page: Capture the whole scrollable page
+            mask: CSS selectors painted over before capture (dynamic content)
+
+        Returns:
+            Path the frame will be written to
+        """
+        started = time.perf_counter()
+        options = {"full_page": full_page}
+        if mask:
+            options["mask"] = [page.locator(selector) for selector in mask]
+        raw = page.screenshot(**options)
+        capture_ms = (time.perf_counter() - started) * 1000
+
+        name = f"{scope}step{step:02d}_{_slug(label)}.{EXTENSIONS[self.format]}"
+        path = os.path.join(self.run_dir, name)
+        meta = {"step": step, "label": label, "kind": kind, "url": page.url}
+        self._ensure_worker()
+        self._queue.put((raw, path, meta, capture_ms))
+        return path
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None:
+                os.makedirs(self.run_dir, exist_ok=True)
+                os.makedirs(self.objects_dir, exist_ok=True)
+                self._worker = threading.Thread(target=self._run, daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            try:
+                self._write(*item)
+            except Exception as e:
+                print(f"   ⚠️  Screenshot not saved: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _write(self, raw: bytes, path: str, meta: Dict, capture_ms: float):
+        started = time.perf_counter()
+        # Same pixels + same encoding = same file, stored once across runs
+        digest = hashlib.sha256(raw).hexdigest()[:20]
+        settings = f"{self.format}q{self.quality}"
+        object_path = os.path.join(self.objects_dir, f"{digest}_{settings}.{EXTENSIONS[self.format]}")
+
+        deduped = os.path.exists(object_path)
+        if deduped:
+            try:
+                os.utime(object_path)  # Reused: retention's grace period starts again
+            except FileNotFoundError:
+                deduped = False  # Removed by retention meanwhile
+        if not deduped:
+            data = self._encode(raw)
+            tmp_path = f"{object_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, object_path)
+        _link_or_copy(object_path, path)
+
+        record = {
+            **meta,
+            "path": path,
+            "hash": digest,
+            "format": self.format,
+            "raw_bytes": len(raw),
+            "bytes": os.path.getsize(object_path),
+            "deduped": deduped,
+            "capture_ms": round(capture_ms, 1),
+            "encode_ms": round((time.perf_counter() - started) * 1000, 1)
+        }
+        self.records.append(record)
+        if self.on_saved:
+            self.on_saved(record)
+
+    def _encode(self, raw: bytes) -> bytes:
+        if self.format == "png":
+            return raw
+        image = Image.open(io.BytesIO(raw))
+        out = io.BytesIO()
+        if self.format == "webp":
+            image.save(out, format="WEBP", quality=self.quality, method=4)
+        else:
+            image.convert("RGB").save(out, format="JPEG", quality=self.quality, optimize=True)
+        return out.getvalue()
+
+    def close(self, timeout: float = 30.0):
+        """Wait for queued frames to be written and stop the worker"""
+        with self._lock:
+            worker, self._worker = self._worker, None
+        if worker is None:
+            return
+        self._queue.put(None)
+        worker.join(timeout)
+
+    def cost(self) -> Dict:
+        """Capture cost of this run so far"""
+        return summarize_cost(self.records)
+
+
+def summarize_cost(records: List[Dict]) -> Dict:
+    """
+    Totals for a run's screenshot records
+
+    Returns:
+        Dictionary with count, deduped, capture_ms (on the test's critical
+        path), encode_ms (background), raw_bytes and bytes written
+    """
+    return {
+        "count": len(records),
+        "deduped": sum(1 for r in records if r.get("deduped")),
+        "capture_ms": round(sum(r.get("capture_ms", 0) for r in records), 1),
+        "encode_ms": round(sum(r.get("encode_ms", 0) for r in records), 1),
+        "raw_bytes": sum(r.get("raw_bytes", 0) for r in records),
+        "bytes": sum(r.get("bytes", 0) for r in records if not r.get("deduped"))
+    }
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def enforce_retention(max_runs: int = MAX_RUNS,
+                      max_total_mb: int = MAX_TOTAL_MB,
+                      screenshots_dir: str = SCREENSHOTS_DIR) -> Dict:
+    """
+    Delete the oldest run directories beyond max_runs or while the
+    directory exceeds max_total_mb, then frames no run links to anymore
+
+    Returns:
+        Dictionary with runs_removed and objects_removed
+    """
+    stats = {"runs_removed": 0, "objects_removed": 0}
+    if not os.path.isdir(screenshots_dir):
+        return stats
+
+    runs = sorted(
+        (entry for entry in os.scandir(screenshots_dir)
+         if entry.is_dir() and entry.name != OBJECTS_DIR),
+        key=lambda entry: entry.stat().st_mtime
+    )
+    objects_dir = os.path.join(screenshots_dir, OBJECTS_DIR)
+    total = _dir_size(objects_dir) + sum(_dir_size(run.path) for run in runs)
+
+    # Hard-linked files are counted twice above; this errs towards deleting more
+    while runs and (len(runs) > max_runs or total > max_total_mb * 1024 * 1024):
+        run = runs.pop(0)
+        total -= _dir_size(run.path)
+        shutil.rmtree(run.path, ignore_errors=True)
+        stats["runs_removed"] += 1
+
+    # A frame no run links to is only a dedup cache entry (always the case
+    # where runs hold copies), so it can go, unless it is recent: a run may
+    # be about to link it (written or reused, not linked yet)
+    if os.path.isdir(objects_dir):
+        cutoff = time.time() - OBJECT_GRACE_SECONDS
+        for entry in os.scandir(objects_dir):
+            try:
+                info = entry.stat()
+                if entry.is_file() and info.st_nlink == 1 and info.st_mtime < cutoff:
+                    os.remove(entry.path)
+                    stats["objects_removed"] += 1
+            except FileNotFoundError:
+                pass  # Removed by another process
+
+    return stats
@@ -0,0 +1,329 @@
+"""
+Suite Planner - Shared-Prefix Execution Tree
+Merges the parsed_steps of many tests into a prefix tree so every shared
+prefix runs once; its browser state is then forked for each divergent suffix
+"""
+
+import json
+import os
+import tempfile
+from pprint import pformat
+from typing import Dict, List, Optional
+
+from app.executor.artifact_store import store_test
+from app.executor.python_executor_enhanced import (
+    execute_python_test,
+    generate_runtime_bootstrap,
+)
+from app.executor.timeout_model import TimeoutModel, domain_of
+
+
+# Rough per-action cost (seconds) used when a step's duration is unknown
+STEP_COST_SECONDS = {
+    "OPEN_BROWSER": 5.0,
+    "SEARCH": 8.0,
+    "CLICK": 3.0,
+    "TYPE": 2.0,
+    "CHECK_LOGIN": 3.0,
+    "SCREENSHOT": 1.0,
+    "ASSERT_TEXT": 1.0,
+}
+
+# Launching a browser is what every unshared test pays on top of its steps
+BROWSER_LAUNCH_SECONDS = 2.0
+
+# A forked branch re-opens its parent's URL, which unshared tests never do
+FORK_NAVIGATION_SECONDS = STEP_COST_SECONDS["OPEN_BROWSER"]
+
+
+class PrefixNode:
+    """A run of steps shared by every test in this subtree"""
+
+    def __init__(self, steps: Optional[List[Dict]] = None):
+        self.steps = steps or []
+        self.children: List["PrefixNode"] = []
+        self.tests: List[int] = []      # Tests that end exactly here
+        self.test_count = 0             # Tests passing through this node
+        self.node_id = 0
+
+    def subtree_tests(self) -> List[int]:
+        """All tests ending at or below this node"""
+        tests = list(self.tests)
+        for child in self.children:
+            tests.extend(child.subtree_tests())
+        return tests
+
+
+def step_key(step: Dict) -> str:
+    """Canonical form used to decide two steps are the same step"""
+    return json.dumps(step, sort_keys=True)
+
+
+def estimate_step_seconds(step: Dict) -> float:
+    """Estimated cost of executing one step"""
+    if step.get("action") == "WAIT":
+        return float(step.get("duration", 3000)) / 1000
+    return STEP_COST_SECONDS.get(step.get("action", ""), 1.0)
+
+
+def build_prefix_tree(step_lists: List[List[Dict]]) -> PrefixNode:
+    """
+    Merge step lists into a prefix tree, then compress single-child chains
+    so every node is a segment that runs without forking
+
+    Args:
+        step_lists: parsed_steps of each test in the suite
+
+    Returns:
+        Root node (with no steps of its own)
+    """
+    # Trie with one step per node
+    root = {"children": {}, "tests": [], "step": None}
+    for test_index, steps in enumerate(step_lists):
+        node = root
+        for step in steps:
+            key = step_key(step)
+            if key not in node["children"]:
+                node["children"][key] = {"children": {}, "tests": [], "step": step}
+            node = node["children"][key]
+        node["tests"].append(test_index)
+
+    def compress(trie_node: Dict, segment: List[Dict]) -> PrefixNode:
+        # Extend the segment while the path neither forks nor ends a test
+        while len(trie_node["children"]) == 1 and not trie_node["tests"]:
+            trie_node = next(iter(trie_node["children"].values()))
+            segment = segment + [trie_node["step"]]
+        node = PrefixNode(segment)
+        node.tests = list(trie_node["tests"])
+        node.children = [compress(child, [child["step"]])
+                         for child in trie_node["children"].values()]
+        node.test_count = len(node.subtree_tests())
+        return node
+
+    tree = PrefixNode()
+    tree.children = [compress(child, [child["step"]])
+                     for child in root["children"].values()]
+    tree.tests = list(root["tests"])
+    tree.test_count = len(step_lists)
+
+    # Stable ids for generated function names and timing reports
+    counter = 0
+    pending = [tree]
+    while pending:
+        node = pending.pop(0)
+        node.node_id = counter
+        counter += 1
+        pending.extend(node.children)
+
+    return tree
+
+
+def _walk(node: PrefixNode):
+    yield node
+    for child in node.children:
+        yield from _walk(child)
+
+
+def plan_suite(step_lists: List[List[Dict]],
+               segment_seconds: Optional[Dict[int, float]] = None,
+               fork_seconds: Optional[Dict[int, float]] = None) -> Dict:
+    """
+    Plan a suite and report the work sharing saves
+
+    Args:
+        step_lists: parsed_steps of each test in the suite
+        segment_seconds: Measured seconds of each node's steps per node id
+            (from a suite run); estimates are used for nodes without a
+            measurement
+        fork_seconds: Measured seconds of each forked node's navigation
+            back to its parent's URL, which is subtracted from the savings
+
+    Returns:
+        Dictionary with the tree and avoided steps/seconds
+    """
+    tree = build_prefix_tree(step_lists)
+    segment_seconds = segment_seconds or {}
+    fork_seconds = fork_seconds or {}
+
+    total_steps = sum(len(steps) for steps in step_lists)
+    executed_steps = 0
+    avoided_seconds = 0.0
+
+    for node in _walk(tree):
+        if not node.steps:
+            continue
+        executed_steps += len(node.steps)
+        cost = segment_seconds.get(
+            node.node_id,
+            sum(estimate_step_seconds(step) for step in node.steps)
+        )
+        avoided_seconds += cost * (node.test_count - 1)
+        # Children of a segment start with a navigation to where it ended
+        for child in node.children:
+            avoided_seconds -= fork_seconds.get(child.node_id, FORK_NAVIGATION_SECONDS)
+
+    # Forks reuse one browser instead of launching one per test
+    avoided_seconds += BROWSER_LAUNCH_SECONDS * max(len(step_lists) - 1, 0)
+
+    return {
+        "tree": tree,
+        "tests": len(step_lists),
+        "total_steps": total_steps,
+        "executed_steps": executed_steps,
+        "avoided_steps": total_steps - executed_steps,
+        "avoided_seconds": round(avoided_seconds, 2),
+        "forks": sum(len(node.children) for node in _walk(tree) if len(node.children) > 1)
+    }
+
+
+def serialize_tree(node: PrefixNode, prefix: Optional[List[Dict]] = None) -> Dict:
+    """
+    Plain-data form of a prefix tree, as embedded in suite tests (the
+    runtime looks learned timeouts up by domain when the suite runs)
+
+    Args:
+        node: Segment to serialize (with its subtree)
+        prefix: Steps of every ancestor segment, so steps are numbered and
+            timed as in the test they belong to
+
+    Returns:
+        Dictionary with id, start (1-based number of the first step),
+        domain (of the ancestors' last OPEN_BROWSER), steps, tests,
+        subtree and children
+    """
+    prefix = prefix or []
+    path = prefix + node.steps
+    domain = next((domain_of(step.get("url", "")) for step in reversed(prefix)
+                   if step.get("action") == "OPEN_BROWSER"), "")
+    return {
+        "id": node.node_id,
+        "start": len(prefix) + 1,
+        "domain": domain,
+        "steps": node.steps,
+        "tests": node.tests,
+        "subtree": node.subtree_tests(),
+        "children": [serialize_tree(child, path) for child in node.children]
+    }
+
+
+def generate_suite_python_test(plan: Dict) -> str:
+    """
+    Generate one script that runs the whole prefix tree
+
+    The script only holds the serialized tree; app.executor.runtime runs
+    each node as a branch: a fresh context from its parent's storage state
+    (cookies + localStorage) at the parent's URL, its segment once, then a
+    state snapshot handed to every child branch.
+
+    Args:
+        plan: Result of plan_suite()
+
+    Returns:
+        Python source of the suite test
+    """
+    lines = []
+    lines.append('"""\n')
+    lines.append('Auto-generated Playwright suite with shared-prefix execution\n')
+    lines.append(f'Tests: {plan["tests"]} | Steps executed: {plan["executed_steps"]}/{plan["total_steps"]}\n')
+    lines.append('"""\n\n')
+    lines.extend(generate_runtime_bootstrap())
+    lines.append('from app.executor.runtime import run_suite\n\n')
+    lines.append(f'TREE = {pformat(serialize_tree(plan["tree"]), sort_dicts=False)}\n\n\n')
+    lines.append('if __name__ == "__main__":\n')
+    lines.append(f'    exit_code = run_suite(TREE, {plan["tests"]})\n')
+    lines.append('    sys.exit(exit_code)\n')
+
+    return "".join(lines)
+
+
+def plan_suite_deadline(plan: Dict, model: Optional[TimeoutModel] = None) -> int:
+    """
+    Suite deadline: every executed step's worst case plus the navigation
+    each fork makes back to its parent's URL
+
+    Args:
+        plan: Result of plan_suite()
+        model: Timing history to take timeouts from
+
+    Returns:
+        Deadline in whole seconds
+    """
+    model = model or TimeoutModel()
+    steps, step_timeouts = [], []
+    pending = [serialize_tree(plan["tree"])]
+    while pending:
+        node = pending.pop(0)
+        steps.extend(node["steps"])
+        step_timeouts.extend(model.plan_timeouts(node["steps"], domain=node["domain"]))
+        for child in node["children"]:
+            if node["steps"]:
+                steps.append({"action": "FORK"})
+                navigation = model.timeout_ms(child["domain"], "OPEN_BROWSER", "navigation")
+                step_timeouts.append({"navigation": navigation})
+            pending.append(child)
+    return model.plan_deadline(steps, step_timeouts)
+
+
+def execute_suite(step_lists: List[List[Dict]], timeout: Optional[int] = None) -> Dict:
+    """
+    Plan, generate and run a suite with shared-prefix execution
+
+    Args:
+        step_lists: parsed_steps of each test in the suite
+        timeout: Maximum execution time for the whole suite (the plan's
+            deadline when None)
+
+    Returns:
+        Dictionary with per-test results and the work saved
+    """
+    plan = plan_suite(step_lists)
+    print(f"\n🌳 Suite plan: {plan['executed_steps']}/{plan['total_steps']} steps executed, "
+          f"{plan['avoided_steps']} avoided (~{plan['avoided_seconds']}s)")
+
+    timeout = timeout or plan_suite_deadline(plan)
+    code = generate_suite_python_test(plan)
+    filepath = store_test(code, kind="suite")["path"]
+
+    fd, results_path = tempfile.mkstemp(suffix=".json", prefix="suite_results_")
+    os.close(fd)
+    try:
+        result = execute_python_test(
+            filepath,
+            timeout=timeout,
+            extra_env={"TEST_SUITE_RESULTS_PATH": results_path}
+        )
+        try:
+            with open(results_path, "r", encoding="utf-8") as f:
+                suite_output = json.load(f)
+        except ValueError:
+            suite_output = {"results": {}, "segment_seconds": {}, "fork_seconds": {}}
+    finally:
+        os.remove(results_path)
+
+    # Re-plan with measured segment timings for a real savings figure
+    measured = {int(k): v for k, v in suite_output["segment_seconds"].items()}
+    forks = {int(k): v for k, v in suite_output.get("fork_seconds", {}).items()}
+    if measured:
+        plan = plan_suite(step_lists, measured, forks)
+
+    results = []
+    for test_index in range(len(step_lists)):
+        outcome = suite_output["results"].get(str(test_index))
+        if outcome is None:
+            # The suite died (timeout/crash) before reaching this test
+            status = result["status"] if result["status"] in ("timeout", "error") else "failed"
+            outcome = {"status": status,
+                       "errors": result.get("errors", "") or "Test did not run"}
+        results.append(outcome)
+
+    return {
+        "code_file_path": filepath,
+        "return_code": result["return_code"],
+        "results": results,
+        "total_steps": plan["total_steps"],
+        "executed_steps": plan["executed_steps"],
+        "avoided_steps": plan["avoided_steps"],
+        "avoided_seconds": plan["avoided_seconds"],
+        "visual_checks": result.get("visual_checks", []),
+        "traces": result.get("traces", []),
+    }
@@ -0,0 +1,148 @@
+"""
+Test Telemetry
+Machine-readable events emitted by generated tests as JSON lines on a side
+channel (TEST_TELEMETRY_PATH), and the per-step summary built from them
+
+Event types:
+    test_start  - run began
+    step_start  - step {step, action}
+    step_end    - step {step, action, status, duration, failure_class, error}
+    wait        - wait latency {step, action, kind, seconds, url, domain,
+                  engine, selector, timed_out}
+    selector    - selector that matched {step, name, selector, attempts}
+    navigation  - Navigation Timing {step, url, ttfb, dom_content_loaded, load}
+    readiness   - readiness wait {step, action, conditions: [{condition, met,
+                  required, ms}]}
+    screenshot  - frame written {step, label, kind, url, path, bytes, deduped,
+                  capture_ms, encode_ms}
+    trace       - step trace chunk closed {step, action, kept, reason, path,
+                  bytes, ms}
+    test_end    - run finished {status, duration, failure_class}
+"""
+
+import json
+import os
+from typing import Dict, List, Optional
+
+from app.executor.screenshots import summarize_cost
+from app.executor.tracing import summarize_traces
+
+
+# Failure classes assigned by generated tests
+FAILURE_CLASSES = ("timeout", "assertion", "selector_not_found", "error")
+
+
+def read_events(path: Optional[str]) -> List[Dict]:
+    """
+    Read the telemetry events a test wrote
+
+    Args:
+        path: JSON-lines side channel path
+
+    Returns:
+        Events in emission order
+    """
+    if not path or not os.path.exists(path):
+        return []
+    events = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                continue  # Partial last line from a killed test
+    return events
+
+
+def wait_samples(events: List[Dict]) -> List[Dict]:
+    """Wait latency samples, as consumed by the timeout model"""
+    return [e for e in events if e.get("event") == "wait"]
+
+
+def summarize(events: List[Dict]) -> Dict:
+    """
+    Build per-step and per-test durations from telemetry events
+
+    Args:
+        events: Result of read_events()
+
+    Returns:
+        Dictionary with duration_seconds, steps, failure_class,
+        navigation timings, screenshots and their capture cost, kept
+        traces and the tracing cost
+    """
+    steps = {}
+    navigation = []
+    screenshots = []
+    trace_events = []
+    summary = {"duration_seconds": None, "failure_class": "", "steps": [],
+               "navigation": navigation, "screenshots": screenshots}
+    started_at = None
+    last_at = None
+
+    for event in events:
+        kind = event.get("event")
+        last_at = event.get("t", last_at)
+
+        if kind == "test_start":
+            started_at = event.get("t")
+
+        elif kind == "step_start":
+            steps[event["step"]] = {
+                "step": event["step"],
+                "action": event.get("action", ""),
+                "status": "running",
+                "duration": None,
+                "wait_seconds": 0.0,
+                "selector": "",
+                "readiness": [],
+                "failure_class": "",
+                "error": ""
+            }
+
+        elif kind == "step_end" and event.get("step") in steps:
+            steps[event["step"]].update({
+                "status": event.get("status", ""),
+                "duration": event.get("duration"),
+                "failure_class": event.get("failure_class", ""),
+                "error": event.get("error", "")
+            })
+
+        elif kind == "wait" and event.get("step") in steps:
+            step = steps[event["step"]]
+            step["wait_seconds"] = round(step["wait_seconds"] + event.get("seconds", 0.0), 4)
+            if event.get("selector"):
+                step["selector"] = event["selector"]
+
+        elif kind == "selector" and event.get("step") in steps:
+            steps[event["step"]]["selector"] = event.get("selector", "")
+
+        elif kind == "readiness" and event.get("step") in steps:
+            steps[event["step"]]["readiness"].extend(event.get("conditions", []))
+
+        elif kind == "navigation":
+            navigation.append({k: v for k, v in event.items() if k not in ("event", "t")})
+
+        elif kind == "screenshot":
+            screenshots.append({k: v for k, v in event.items() if k not in ("event", "t")})
+
+        elif kind == "trace":
+            trace_events.append({k: v for k, v in event.items() if k not in ("event", "t")})
+
+        elif kind == "test_end":
+            summary["duration_seconds"] = event.get("duration")
+            summary["failure_class"] = event.get("failure_class", "")
+
+    # Killed before test_end: fall back to the span of what was observed
+    if summary["duration_seconds"] is None and started_at is not None and last_at is not None:
+        summary["duration_seconds"] = round(last_at - started_at, 3)
+
+    summary["steps"] = [steps[k] for k in sorted(steps)]
+    summary["screenshot_cost"] = summarize_cost(screenshots)
+    summary["traces"] = [event for event in trace_events if event.get("kept")]
+    summary["trace_cost"] = summarize_traces(trace_events)
+    if not summary["failure_class"]:
+        failed = [s for s in summary["steps"] if s["status"] == "failed"]
+        summary["failure_class"] = failed[-1]["failure_class"] if failed else ""
+
+    return summary
@@ -0,0 +1,200 @@
+"""
+Adaptive Timeout Model
+Learns per-domain, per-engine, per-action wait latencies from past runs and
+derives step timeouts (p99 x margin, within sane bounds) and the test deadline.
+Samples are keyed by the domain of the plan's last OPEN_BROWSER step (what
+plan_timeouts looks up, whatever the page redirected to); waits that timed
+out count as the full timeout.
+"""
+
+import json
+import math
+import os
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+
+# The executor passes its path on to tests, which look their timeouts up at run time
+TIMING_HISTORY_PATH = os.getenv("TEST_TIMING_HISTORY_PATH", "timing_history.json")
+
+# What the generator used to hard-code; still used until enough history exists
+DEFAULT_TIMEOUTS_MS = {
+    "navigation": 30000,
+    "visible": 10000,
+    "selector": 5000,
+    "ready": 10000,  # All of a step's readiness conditions together
+}
+
+# Learned timeouts never leave these bounds (ms)
+TIMEOUT_BOUNDS_MS = {
+    "navigation": (5000, 60000),
+    "visible": (2000, 30000),
+    "selector": (1000, 15000),
+    "ready": (2000, 30000),
+}
+
+# Which waits each action performs
+ACTION_TIMEOUT_KINDS = {
+    "OPEN_BROWSER": ["navigation", "ready"],
+    "SEARCH": ["navigation", "selector", "ready"],
+    "CLICK": ["visible", "ready"],
+    "TYPE": ["visible"],
+}
+
+MARGIN = 3.0
+QUANTILE = 0.99
+MIN_SAMPLES = 5
+MAX_SAMPLES = 200
+
+# Samples without an engine predate the browser matrix: all were chromium
+DEFAULT_ENGINE = "chromium"
+
+# Worst-case time a step spends outside its learned waits: fixed sleeps,
+# cookie-consent probing (5 selectors x 3s), login probing, slow motion
+FIXED_STEP_SECONDS = {
+    "OPEN_BROWSER": 17.0,
+    "SEARCH": 2.0,
+    "CLICK": 2.0,
+    "TYPE": 4.0,
+    "CHECK_LOGIN": 17.0,
+    "SCREENSHOT": 2.0,
+}
+LAUNCH_SECONDS = 10.0
+HOLD_SECONDS = 20.0
+DEADLINE_BOUNDS = (30, 600)
+
+
+def domain_of(url: str) -> str:
+    """Host without a leading www., so redirects share one history"""
+    if url and not url.startswith(("http://", "https://")):
+        url = f"https://{url}"
+    host = urlparse(url).hostname or ""
+    return host[4:] if host.startswith("www.") else host
+
+
+def quantile(samples: List[float], q: float) -> float:
+    """Nearest-rank quantile of a non-empty sample list"""
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(q * len(ordered)))
+    return ordered[rank - 1]
+
+
+class TimeoutModel:
+    """Per-domain latency history and the timeouts derived from it"""
+
+    def __init__(self, history_path: str = TIMING_HISTORY_PATH):
+        """
+        Initialize timeout model
+
+        Args:
+            history_path: JSON file holding latency samples
+        """
+        self.history_path = history_path
+        self.history = self._load()
+
+    def _load(self) -> Dict:
+        if not os.path.exists(self.history_path):
+            return {}
+        try:
+            with open(self.history_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        """Persist the sample history"""
+        tmp_path = self.history_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.history, f)
+        os.replace(tmp_path, self.history_path)
+
+    @staticmethod
+    def _key(action: str, kind: str, engine: str) -> str:
+        # Chromium keeps the pre-matrix key, so existing history stays in use
+        return f"{action}:{kind}" if engine == DEFAULT_ENGINE else f"{action}:{kind}@{engine}"
+
+    def record(self, domain: str, action: str, kind: str, seconds: float, engine: str = DEFAULT_ENGINE):
+        """Add one latency sample, keeping the most recent MAX_SAMPLES"""
+        samples = self.history.setdefault(domain, {}).setdefault(self._key(action, kind, engine), [])
+        samples.append(round(seconds, 4))
+        del samples[:-MAX_SAMPLES]
+
+    def record_run(self, timings: List[Dict]):
+        """
+        Add the timing samples one test run produced and save
+
+        Args:
+            timings: Samples with domain (or url), engine, action, kind and seconds
+        """
+        for sample in timings:
+            domain = sample["domain"] if "domain" in sample else domain_of(sample.get("url", ""))
+            self.record(domain, sample["action"], sample["kind"], sample["seconds"],
+                        sample.get("engine") or DEFAULT_ENGINE)
+        if timings:
+            self.save()
+
+    def timeout_ms(self, domain: str, action: str, kind: str, engine: str = DEFAULT_ENGINE) -> int:
+        """
+        Timeout for one wait: p99 of history x margin, clamped to bounds
+
+        Falls back to the old fixed default until MIN_SAMPLES exist.
+        """
+        samples = self.history.get(domain, {}).get(self._key(action, kind, engine), [])
+        if len(samples) < MIN_SAMPLES:
+            return DEFAULT_TIMEOUTS_MS[kind]
+        low, high = TIMEOUT_BOUNDS_MS[kind]
+        learned = quantile(samples, QUANTILE) * MARGIN * 1000
+        return int(min(high, max(low, learned)))
+
+    def plan_timeouts(self,
+                      steps: List[Dict],
+                      engines: Optional[List[str]] = None,
+                      domain: str = "") -> List[Dict]:
+        """
+        Timeouts for every step of a plan
+
+        Args:
+            steps: Parsed test steps
+            engines: Engines the plan runs on (each wait gets the largest
+                of their timeouts)
+            domain: Domain before the first step (suite segments continue
+                on their ancestors' domain)
+
+        Returns:
+            One {kind: ms} dictionary per step
+        """
+        engines = engines or [DEFAULT_ENGINE]
+        plan = []
+        for step in steps:
+            action = step.get("action", "")
+            if action == "OPEN_BROWSER":
+                domain = domain_of(step.get("url", ""))
+            plan.append({
+                kind: max(self.timeout_ms(domain, action, kind, engine) for engine in engines)
+                for kind in ACTION_TIMEOUT_KINDS.get(action, [])
+            })
+        return plan
+
+    def plan_deadline(self, steps: List[Dict], step_timeouts: List[Dict]) -> int:
+        """
+        Overall test deadline: launch + hold + every step's worst case
+
+        Args:
+            steps: Parsed test steps
+            step_timeouts: Result of plan_timeouts()
+
+        Returns:
+            Deadline in whole seconds
+        """
+        total = LAUNCH_SECONDS + HOLD_SECONDS
+        for step, timeouts in zip(steps, step_timeouts):
+            action = step.get("action", "")
+            if action == "WAIT":
+                total += float(step.get("duration", 3000)) / 1000
+            else:
+                total += FIXED_STEP_SECONDS.get(action, 2.0)
+            total += float(step.get("wait_budget", 0)) / 1000
+            total += sum(timeouts.values()) / 1000
+        low, high = DEADLINE_BOUNDS
+        return int(min(high, max(low, total)))
+
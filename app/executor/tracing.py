@@ -0,0 +1,154 @@
+"""
+Failure Tracing
+Optional Playwright tracing (DOM snapshots, network, console) recorded in
+one chunk per step. A passing step's chunk is discarded when the step ends,
+so only a single step is ever buffered; the chunk is written as a trace
+archive only when the step fails or was flaky (needed fallback selectors).
+"""
+
+import os
+import time
+from typing import Callable, Dict, List, Optional
+
+
+TRACES_DIR = "traces"
+
+# off, or failure: keep traces of failed and flaky steps
+TRACE_MODE = os.getenv("TEST_TRACE", "off")
+# Filmstrip screenshots make traces much larger and slower to record
+TRACE_SCREENSHOTS = os.getenv("TEST_TRACE_SCREENSHOTS", "0") == "1"
+# Flaky steps kept per run; failures are always kept
+TRACE_MAX_FLAKY = int(os.getenv("TEST_TRACE_MAX_FLAKY", "3"))
+# Retention: newest runs with traces kept, and a cap on the directory
+TRACE_MAX_RUNS = int(os.getenv("TEST_TRACE_MAX_RUNS", "20"))
+TRACE_MAX_MB = int(os.getenv("TEST_TRACE_MAX_MB", "300"))
+
+
+class FailureTracer:
+    """Per-step trace chunks for every browser context of one test run"""
+
+    def __init__(self,
+                 run_id: str,
+                 mode: str = TRACE_MODE,
+                 screenshots: bool = TRACE_SCREENSHOTS,
+                 max_flaky: int = TRACE_MAX_FLAKY,
+                 traces_dir: str = TRACES_DIR,
+                 on_event: Optional[Callable[[Dict], None]] = None):
+        """
+        Initialize tracer
+
+        Args:
+            run_id: Directory name for this run's traces
+            mode: "off" or "failure"
+            screenshots: Include filmstrip screenshots in traces
+            max_flaky: Flaky-step traces kept per run
+            traces_dir: Root traces directory
+            on_event: Callback(record) after each chunk is kept or discarded
+        """
+        self.enabled = mode == "failure"
+        self.screenshots = screenshots
+        self.max_flaky = max_flaky
+        self.run_dir = os.path.join(traces_dir, run_id)
+        self.on_event = on_event
+        self.kept: List[Dict] = []
+        self.overhead_ms = 0.0
+        self._reported_ms = 0.0  # overhead_ms already attributed to a chunk
+        self._traced = set()  # ids of contexts being traced
+
+    def _timed(self, call: Callable, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            call(*args, **kwargs)
+        finally:
+            self.overhead_ms += (time.perf_counter() - started) * 1000
+
+    def attach(self, context):
+        """Start tracing a new browser context (no-op when disabled)"""
+        if not self.enabled:
+            return
+        try:
+            self._timed(context.tracing.start, screenshots=self.screenshots,
+                        snapshots=True, sources=False)
+            self._traced.add(id(context))
+        except Exception as e:
+            print(f"   ⚠️  Tracing unavailable: {e}")
+
+    def begin_step(self, page, step: int):
+        """Open the chunk for a step"""
+        if id(page.context) in self._traced:
+            self._timed(page.context.tracing.start_chunk, title=f"step {step}")
+
+    def end_step(self, page, step: int, action: str,
+                 failed: bool = False, flaky: bool = False,
+                 scope: str = "") -> str:
+        """
+        Close a step's chunk: written to disk when the step failed or was
+        flaky, dropped otherwise
+
+        Args:
+            page: Playwright page
+            step: Step number
+            action: Step action, used in the file name
+            failed: The step raised
+            flaky: The step passed, but only after retries/fallbacks
+            scope: File name prefix (suite branch)
+
+        Returns:
+            Trace archive path, or "" when the chunk was dropped
+        """
+        context = page.context
+        if id(context) not in self._traced:
+            return ""
+
+        flaky_kept = sum(1 for record in self.kept if record["reason"] == "flaky")
+        keep = failed or (flaky and flaky_kept < self.max_flaky)
+        reason = "failed" if failed else "flaky" if flaky else ""
+        path = ""
+        try:
+            if keep:
+                os.makedirs(self.run_dir, exist_ok=True)
+                path = os.path.join(self.run_dir, f"{scope}step{step:02d}_{action.lower()}_{reason}.zip")
+                self._timed(context.tracing.stop_chunk, path=path)
+            else:
+                self._timed(context.tracing.stop_chunk)
+        except Exception as e:
+            print(f"   ⚠️  Trace chunk not saved: {e}")
+            return ""
+
+        # Everything spent in tracing calls since the last chunk (start included)
+        elapsed, self._reported_ms = self.overhead_ms - self._reported_ms, self.overhead_ms
+        record = {"step": step, "action": action, "kept": keep, "reason": reason,
+                  "path": path, "bytes": os.path.getsize(path) if path else 0,
+                  "ms": round(elapsed, 1)}
+        if keep:
+            self.kept.append(record)
+            print(f"   🧵 Trace saved: {path} (open with: playwright show-trace {path})")
+        if self.on_event:
+            self.on_event(record)
+        return path
+
+    def detach(self, context):
+        """Stop tracing a context before it closes; open chunks are dropped"""
+        if id(context) not in self._traced:
+            return
+        self._traced.discard(id(context))
+        try:
+            self._timed(context.tracing.stop)
+        except Exception:
+            pass
+
+
+def summarize_traces(records: List[Dict]) -> Dict:
+    """
+    Totals for a run's trace events
+
+    Returns:
+        Dictionary with chunks (recorded), kept, overhead_ms spent in
+        tracing calls on the test's critical path, and kept bytes
+    """
+    return {
+        "chunks": len(records),
+        "kept": sum(1 for r in records if r.get("kept")),
+        "overhead_ms": round(sum(r.get("ms", 0) for r in records), 1),
+        "bytes": sum(r.get("bytes", 0) for r in records)
+    }
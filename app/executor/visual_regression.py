@@ -0,0 +1,344 @@
+"""
+Visual Regression
+Compares SCREENSHOT step captures against stored baselines with a
+vectorized per-pixel diff (tolerance + masked regions), a perceptual-hash
+prefilter, and a heatmap of what changed. Batches run on a process pool.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+from PIL import Image
+
+from app.data.storage import file_lock
+from app.executor.timeout_model import domain_of
+
+
+BASELINE_DIR = "visual_baselines"
+DIFF_DIR = "visual_diffs"
+BASELINE_INDEX = "index.json"
+
+# A pixel counts as changed when any channel differs by more than this
+PIXEL_TOLERANCE = 16
+# A screenshot passes while at most this fraction of unmasked pixels changed
+MAX_DIFF_RATIO = 0.0001
+# dHash distance (of 64 bits) above which the layout clearly changed and the
+# full-resolution diff is skipped
+HASH_FAIL_DISTANCE = 16
+
+# Below this many comparisons a process pool costs more than it saves
+POOL_MIN_ITEMS = 4
+
+# Matrix engines check their screenshots on concurrent threads; the index is
+# also locked across processes (accepting from the command line)
+_INDEX_LOCK = threading.Lock()
+
+
+def baseline_key(url: str, label: str) -> str:
+    """Baseline identity: the page's domain plus the screenshot name"""
+    name = re.sub(r"[^A-Za-z0-9._-]+", "_", os.path.splitext(label)[0])
+    return f"{domain_of(url) or 'local'}__{name}"
+
+
+def _file_hash(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def load_index(baseline_dir: str = BASELINE_DIR) -> Dict:
+    """Baselines by key: path, masks, tolerance overrides"""
+    try:
+        with open(os.path.join(baseline_dir, BASELINE_INDEX), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_index(index: Dict, baseline_dir: str):
+    os.makedirs(baseline_dir, exist_ok=True)
+    path = os.path.join(baseline_dir, BASELINE_INDEX)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def accept_baseline(key: str, screenshot_path: str,
+                    masks: Optional[List[Dict]] = None,
+                    baseline_dir: str = BASELINE_DIR) -> str:
+    """
+    Make a screenshot the baseline for a key (new or updated)
+
+    Args:
+        key: Result of baseline_key()
+        screenshot_path: Screenshot to accept
+        masks: Regions ({x, y, width, height} in pixels) ignored when
+            comparing; existing masks are kept if omitted
+        baseline_dir: Baseline directory
+
+    Returns:
+        Baseline path
+    """
+    os.makedirs(baseline_dir, exist_ok=True)
+    # Read-modify-write: other keys accepted meanwhile must survive
+    with _INDEX_LOCK, file_lock(os.path.join(baseline_dir, BASELINE_INDEX)):
+        index = load_index(baseline_dir)
+        entry = index.get(key, {})
+        extension = os.path.splitext(screenshot_path)[1]
+        path = os.path.join(baseline_dir, f"{key}{extension}")
+        for old_path in (entry.get("path"), _array_cache_path(entry.get("path") or path)):
+            if old_path and os.path.exists(old_path):
+                os.remove(old_path)
+        shutil.copyfile(screenshot_path, path)
+
+        index[key] = {
+            **entry,
+            "path": path,
+            "masks": masks if masks is not None else entry.get("masks", []),
+            "accepted": time.strftime("%Y-%m-%d %H:%M:%S")
+        }
+        _save_index(index, baseline_dir)
+    return path
+
+
+def load_rgb(path: str) -> np.ndarray:
+    """Decode an image into an HxWx3 uint8 array"""
+    with Image.open(path) as image:
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        return np.asarray(image)
+
+
+def _array_cache_path(path: str) -> str:
+    return os.path.splitext(path)[0] + ".npy"
+
+
+def load_baseline(path: str) -> np.ndarray:
+    """
+    Baseline pixels, decoded once and then memory-mapped from an .npy
+    cache: comparisons only page in the rows they touch
+    """
+    cache_path = _array_cache_path(path)
+    if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(path):
+        return np.load(cache_path, mmap_mode="r")
+    pixels = load_rgb(path)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp.npy"
+    np.save(tmp_path, pixels)
+    os.replace(tmp_path, cache_path)
+    return pixels
+
+
+def dhash(pixels: np.ndarray, size: int = 8) -> int:
+    """
+    Difference hash: sign of horizontal gradients of a (size+1) x size
+    grayscale thumbnail, built from every 8th pixel so it costs far less
+    than a full pass over the image
+    """
+    sample = np.ascontiguousarray(pixels[::8, ::8])
+    thumb = np.asarray(Image.fromarray(sample).convert("L").resize((size + 1, size), Image.BOX),
+                       dtype=np.int16)
+    bits = (thumb[:, 1:] > thumb[:, :-1]).flatten()
+    return int(np.packbits(bits).tobytes().hex(), 16)
+
+
+def changed_rows(current: np.ndarray, baseline: np.ndarray) -> np.ndarray:
+    """
+    Rows with any differing byte, found by comparing 8 bytes at a time
+    (1 byte at a time when the row length is not a multiple of 8)
+    """
+    height = current.shape[0]
+    row_bytes = current.shape[1] * current.shape[2]
+    word = np.uint64 if row_bytes % 8 == 0 else np.uint8
+    a = np.ascontiguousarray(current).reshape(height, row_bytes).view(word)
+    b = np.ascontiguousarray(baseline).reshape(height, row_bytes).view(word)
+    return (a != b).any(axis=1)
+
+
+def mask_array(shape, masks: List[Dict]) -> np.ndarray:
+    """Boolean HxW array, True where pixels are compared"""
+    keep = np.ones(shape[:2], dtype=bool)
+    for rect in masks or []:
+        x, y = int(rect.get("x", 0)), int(rect.get("y", 0))
+        keep[y:y + int(rect.get("height", 0)), x:x + int(rect.get("width", 0))] = False
+    return keep
+
+
+def pixel_diff(current: np.ndarray, baseline: np.ndarray) -> np.ndarray:
+    """Per-pixel max channel difference (HxW uint8), without upcasting"""
+    delta = np.maximum(current, baseline) - np.minimum(current, baseline)
+    # Channel slices: much faster than a reduction over the 3-wide last axis
+    return np.maximum(np.maximum(delta[..., 0], delta[..., 1]), delta[..., 2])
+
+
+def write_heatmap(baseline: np.ndarray, diff: np.ndarray, keep: np.ndarray, path: str):
+    """
+    Dimmed grayscale baseline with changed pixels in red (brighter = larger
+    change) and masked regions tinted blue
+    """
+    gray = (baseline.mean(axis=2) * 0.35).astype(np.uint8)
+    heat = np.stack([gray, gray, gray], axis=2)
+    changed = diff > 0
+    heat[..., 0] = np.where(changed, np.maximum(diff, 96), heat[..., 0])
+    heat[..., 1] = np.where(changed, 0, heat[..., 1])
+    heat[..., 2] = np.where(changed, 0, heat[..., 2])
+    heat[~keep, 2] = 160
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    Image.fromarray(heat).save(path, compress_level=1)
+
+
+def compare(screenshot_path: str,
+            baseline_path: str,
+            masks: List[Dict] = None,
+            pixel_tolerance: int = PIXEL_TOLERANCE,
+            max_diff_ratio: float = MAX_DIFF_RATIO,
+            heatmap_path: Optional[str] = None) -> Dict:
+    """
+    Compare one screenshot with its baseline
+
+    Order of checks: identical files, size, perceptual hash (fail fast on
+    layout changes when nothing is masked), rows with any changed byte,
+    then the per-pixel diff of only those rows.
+
+    Args:
+        screenshot_path: New screenshot
+        baseline_path: Baseline image
+        masks: Regions ignored by the comparison
+        pixel_tolerance: Channel difference below which pixels count as equal
+        max_diff_ratio: Changed-pixel fraction allowed to still pass
+        heatmap_path: Where to write the diff heatmap (only when changed)
+
+    Returns:
+        Dictionary with passed, reason, diff_ratio, changed_pixels,
+        hash_distance, heatmap and elapsed_ms
+    """
+    started = time.perf_counter()
+    result = {"passed": True, "reason": "identical", "diff_ratio": 0.0,
+              "changed_pixels": 0, "hash_distance": 0, "heatmap": ""}
+
+    def done(**fields):
+        result.update(fields)
+        result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return result
+
+    if _file_hash(screenshot_path) == _file_hash(baseline_path):
+        return done()
+
+    current = load_rgb(screenshot_path)
+    baseline = load_baseline(baseline_path)
+    if current.shape != baseline.shape:
+        return done(passed=False, reason="size_changed", diff_ratio=1.0)
+
+    distance = bin(dhash(current) ^ dhash(baseline)).count("1")
+    result["hash_distance"] = distance
+    if distance > HASH_FAIL_DISTANCE and not masks:
+        return done(passed=False, reason="layout_changed", diff_ratio=1.0)
+
+    keep = mask_array(current.shape, masks)
+    rows = changed_rows(current, baseline)
+    band = pixel_diff(current[rows], baseline[rows])
+    band[band <= pixel_tolerance] = 0
+    band[~keep[rows]] = 0
+
+    changed = int(np.count_nonzero(band))
+    compared = int(np.count_nonzero(keep)) or 1
+    ratio = changed / compared
+    passed = ratio <= max_diff_ratio
+
+    heatmap = ""
+    if changed and heatmap_path:
+        diff = np.zeros(current.shape[:2], dtype=np.uint8)
+        diff[rows] = band
+        write_heatmap(np.asarray(baseline), diff, keep, heatmap_path)
+        heatmap = heatmap_path
+
+    return done(passed=passed, reason="within_tolerance" if passed else "pixels_changed",
+                diff_ratio=round(ratio, 6), changed_pixels=changed, heatmap=heatmap)
+
+
+def _check_one(item: Dict) -> Dict:
+    """Compare one item of a batch (runs in a worker process)"""
+    try:
+        return {**item, **compare(item["path"], item["baseline"], item.get("masks"),
+                                  heatmap_path=item.get("heatmap_path"))}
+    except Exception as e:
+        return {**item, "passed": False, "reason": f"error: {e}"}
+
+
+def check_screenshots(screenshots: List[Dict],
+                      run_id: str = "",
+                      baseline_dir: str = BASELINE_DIR,
+                      diff_dir: str = DIFF_DIR,
+                      workers: Optional[int] = None,
+                      variant: str = "") -> List[Dict]:
+    """
+    Check a run's (or a suite's) SCREENSHOT step captures against their
+    baselines. Screenshots without a baseline become the baseline.
+
+    Args:
+        screenshots: Screenshot records (path, label, url, kind)
+        run_id: Subdirectory for heatmaps
+        baseline_dir: Baseline directory
+        diff_dir: Heatmap directory
+        workers: Process pool size (default: CPU count)
+        variant: Suffix for baseline keys, e.g. the browser engine
+
+    Returns:
+        One result per screenshot: key, path, baseline, passed, reason,
+        diff_ratio, heatmap, elapsed_ms
+    """
+    index = load_index(baseline_dir)
+    results, pending = [], []
+
+    for shot in screenshots:
+        if shot.get("kind") != "step" or not os.path.exists(shot.get("path", "")):
+            continue
+        key = baseline_key(shot.get("url", ""), shot.get("label", ""))
+        if variant:
+            key = f"{key}__{variant}"
+        entry = index.get(key)
+        if not entry or not os.path.exists(entry["path"]):
+            baseline = accept_baseline(key, shot["path"], baseline_dir=baseline_dir)
+            index = load_index(baseline_dir)
+            results.append({"key": key, "path": shot["path"], "baseline": baseline,
+                            "passed": True, "reason": "new_baseline"})
+            continue
+        pending.append({
+            "key": key,
+            "path": shot["path"],
+            "baseline": entry["path"],
+            "masks": entry.get("masks", []),
+            "heatmap_path": os.path.join(diff_dir, run_id, f"{key}_diff.png")
+        })
+
+    if len(pending) >= POOL_MIN_ITEMS:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results.extend(pool.map(_check_one, pending))
+    else:
+        results.extend(_check_one(item) for item in pending)
+
+    for result in results:
+        result.pop("heatmap_path", None)
+    return results
+
+
+if __name__ == "__main__":
+    # python -m app.executor.visual_regression accept <key> <screenshot> [masks.json]
+    if len(sys.argv) >= 4 and sys.argv[1] == "accept":
+        masks = None
+        if len(sys.argv) > 4:
+            with open(sys.argv[4], "r", encoding="utf-8") as f:
+                masks = json.load(f)
+        print(f"✅ Baseline updated: {accept_baseline(sys.argv[2], sys.argv[3], masks)}")
+    else:
+        print("📚 Baselines:")
+        for key, entry in sorted(load_index().items()):
+            print(f"   {key}: {entry['path']} (masks: {len(entry.get('masks', []))})")
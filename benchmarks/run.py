@@ -0,0 +1,334 @@
+"""
+Benchmarks
+Measurements only; correctness is covered by tests/. Run one by name from
+the project root:
+
+    python -m benchmarks.run tracing     # per-step trace overhead (Playwright)
+    python -m benchmarks.run matrix <test file> [browser ...]
+                                         # parallel engines vs their sum
+    python -m benchmarks.run sqlite      # insert/query cost over a year of history
+    python -m benchmarks.run storage [processes] [threads] [rows per thread] [backend]
+                                         # concurrent write throughput
+    python -m benchmarks.run write_queue # queued vs synchronous save latency
+    python -m benchmarks.run sketches    # quantile sketch accuracy and cost
+    python -m benchmarks.run log_archive # disk usage and lookup latency of logs
+    python -m benchmarks.run export [runs]
+                                         # peak memory of streamed exports
+"""
+
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from multiprocessing import Pool
+from typing import Callable, Dict, List, Tuple
+
+
+def tracing(args: List[str]):
+    """Overhead of per-step trace chunks: the same steps with and without"""
+    from playwright.sync_api import sync_playwright
+
+    from app.executor.tracing import FailureTracer
+
+    page_html = "data:text/html,<input id=q><button id=b onclick=\"this.textContent='ok'\">go</button>"
+    rounds = 20
+
+    def run(traced: bool) -> float:
+        with sync_playwright() as p:
+            browser = p.chromium.launch(headless=True)
+            context = browser.new_context()
+            tracer = FailureTracer("benchmark", mode="failure" if traced else "off")
+            tracer.attach(context)
+            page = context.new_page()
+            started = time.perf_counter()
+            for step in range(1, rounds + 1):
+                tracer.begin_step(page, step)
+                page.goto(page_html)
+                page.fill("#q", f"query {step}")
+                page.click("#b")
+                tracer.end_step(page, step, "BENCH")
+            elapsed = time.perf_counter() - started
+            tracer.detach(context)
+            browser.close()
+            return elapsed
+
+    baseline = run(False)
+    traced = run(True)
+    print(f"⏱️  {rounds} steps: {baseline * 1000:.0f} ms untraced, {traced * 1000:.0f} ms traced "
+          f"(+{(traced - baseline) / rounds * 1000:.1f} ms per step)")
+
+
+def matrix(args: List[str]):
+    """Wall time of a test run on every engine in parallel vs the sum of the runs"""
+    from app.executor.browser_matrix import execute_browser_matrix
+
+    if not args or not os.path.exists(args[0]):
+        print("Usage: python -m benchmarks.run matrix <test file> [browser ...]")
+        sys.exit(1)
+    result = execute_browser_matrix(args[0], args[1:] or None)
+    for browser, engine in result["browsers"].items():
+        print(f"   {browser}: {engine['status']} ({engine['wall_seconds']}s)")
+    print(f"   Wall {result['matrix']['wall_seconds']}s vs {result['matrix']['sum_seconds']}s "
+          f"sequential (x{result['matrix']['speedup']})")
+
+
+def sqlite(args: List[str]):
+    """Insert and dashboard-query cost stay flat as a year of history grows"""
+    from app.data.sqlite_store import SQLiteDataManager
+    from app.data.storage import HISTORY_COLUMNS
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteDataManager(os.path.join(tmp, "history.db"), logs_dir=os.path.join(tmp, "logs"),
+                                  screenshots_dir=os.path.join(tmp, "shots"))
+        row = {column: "" for column in HISTORY_COLUMNS}
+        start = datetime.now() - timedelta(days=365)
+        domains = ["https://google.com", "https://amazon.in", "https://github.com", "https://youtube.com"]
+
+        def history_row(test_id: str, when: datetime) -> Dict:
+            passed = random.random() < 0.8
+            return {**row, "test_id": test_id, "timestamp": when.strftime("%Y-%m-%d %H:%M:%S"),
+                    "status": "passed" if passed else "failed", "passed": passed,
+                    "url_visited": random.choice(domains), "steps_count": 4,
+                    "duration_seconds": random.lognormvariate(2.5, 0.5)}
+
+        for batch in range(5):
+            store.insert_rows([history_row(f"bulk_{batch}_{i}", start + timedelta(minutes=random.randrange(525600)))
+                               for i in range(20000)])
+            started = time.perf_counter()
+            for i in range(100):
+                store.insert_rows([history_row(f"single_{batch}_{i}", datetime.now())])
+            per_insert = (time.perf_counter() - started) / 100 * 1000
+            started = time.perf_counter()
+            stats = store.get_statistics()
+            stats_ms = (time.perf_counter() - started) * 1000
+            started = time.perf_counter()
+            daily = store.get_rollups("day", since=start.strftime("%Y-%m-%d"))
+            rollup_ms = (time.perf_counter() - started) * 1000
+            print(f"⏱️  {stats['total_tests']:>6} rows: {per_insert:.2f} ms per insert, "
+                  f"statistics {stats_ms:.1f} ms, {len(daily)} daily rollups {rollup_ms:.1f} ms")
+        print(f"📊 pass rate {stats['pass_rate']:.1f}%, p50 {stats['p50_duration']:.1f}s, "
+              f"p99 {stats['p99_duration']:.1f}s")
+        print(store.get_rollups("all", by=("domain", "status")).round(2).to_string(index=False))
+
+
+def _stress_writer(args: Tuple) -> List[str]:
+    """One writer process: threads saving rows through a shared store"""
+    from app.data.storage import create_data_manager
+
+    backend, options, threads, rows_per_thread = args
+    store = create_data_manager(backend, **options)
+
+    def write(thread: int) -> List[str]:
+        ids = []
+        for i in range(rows_per_thread):
+            test_id = store.new_test_id()
+            row, _ = store.build_record(test_id, f"stress {os.getpid()}/{thread}/{i}", {}, {"return_code": 0})
+            store.insert_rows([row])
+            ids.append(test_id)
+        return ids
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        ids = [test_id for batch in pool.map(write, range(threads)) for test_id in batch]
+    print(f"   pid {os.getpid()}: {len(ids)} rows in {store.committer.commits} commits")
+    return ids
+
+
+def storage(args: List[str]):
+    """Write throughput of N writer processes x threads on one store"""
+    from app.data.storage import STORAGE_BACKEND, create_data_manager
+
+    processes, threads, rows_per_thread = (int(a) for a in (args[:3] + ["4", "8", "25"][len(args[:3]):]))
+    backend = args[3] if len(args) > 3 else STORAGE_BACKEND
+
+    with tempfile.TemporaryDirectory() as tmp:
+        options = {"logs_dir": os.path.join(tmp, "logs"), "screenshots_dir": os.path.join(tmp, "shots")}
+        options["excel_path" if backend == "excel" else "db_path"] = \
+            os.path.join(tmp, "history.xlsx" if backend == "excel" else "history.db")
+        store = create_data_manager(backend, **options)
+
+        print(f"🧪 {processes} processes x {threads} threads x {rows_per_thread} rows ({backend})")
+        started = time.perf_counter()
+        with Pool(processes) as pool:
+            written = [i for ids in pool.map(_stress_writer, [(backend, options, threads, rows_per_thread)] * processes)
+                       for i in ids]
+        elapsed = time.perf_counter() - started
+
+        stored = store.get_all_tests()['test_id'].tolist()
+        expected = processes * threads * rows_per_thread
+        lost = set(written) - set(stored)
+        print(f"📊 {len(stored)}/{expected} rows stored, {len(lost)} lost, {expected / elapsed:.0f} rows/s")
+
+
+def write_queue(args: List[str]):
+    """Enqueue latency of save_test_result vs synchronous saves"""
+    from app.data.storage import create_data_manager
+    from app.data.write_queue import PersistenceQueue
+
+    with tempfile.TemporaryDirectory() as tmp:
+        options = {"db_path": os.path.join(tmp, "history.db"), "logs_dir": os.path.join(tmp, "logs"),
+                   "screenshots_dir": os.path.join(tmp, "shots")}
+        state = {"parsed_steps": [{"action": "OPEN_BROWSER"}] * 10, "generated_code": "x = 1\n" * 2000}
+        result = {"return_code": 0, "output": "ok\n" * 5000, "telemetry": [{"event": "step"}] * 200}
+        runs = 200
+
+        store = create_data_manager("sqlite", **options)
+        started = time.perf_counter()
+        for i in range(runs):
+            store.save_test_result(f"sync {i}", state, result)
+        sync_ms = (time.perf_counter() - started) / runs * 1000
+
+        writer = PersistenceQueue(store, journal_dir=os.path.join(tmp, "journal"))
+        started = time.perf_counter()
+        for i in range(runs):
+            writer.save_test_result(f"queued {i}", state, result)
+        queued_ms = (time.perf_counter() - started) / runs * 1000
+        started = time.perf_counter()
+        writer.flush()
+        drain_s = time.perf_counter() - started
+        writer.close()
+
+        print(f"⏱️  save_test_result: {sync_ms:.1f} ms synchronous, {queued_ms:.2f} ms queued "
+              f"({drain_s:.1f}s to drain, {writer.batches} batches)")
+
+
+def sketches(args: List[str]):
+    """Sketch accuracy against exact quantiles, and merged vs single sketch"""
+    from app.data.sketches import DDSketch
+
+    values = [random.lognormvariate(1.5, 0.8) for _ in range(200000)]
+    started = time.perf_counter()
+    whole = DDSketch()
+    for value in values:
+        whole.add(value)
+    add_us = (time.perf_counter() - started) / len(values) * 1e6
+
+    parts = [DDSketch() for _ in range(24)]
+    for i, value in enumerate(values):
+        parts[i % 24].add(value)
+    merged = DDSketch()
+    for part in parts:
+        merged = DDSketch.from_json(merged.merge(part).to_json())
+
+    ordered = sorted(values)
+    print(f"📏 {len(values)} values, {len(whole.bins)} buckets, "
+          f"{len(whole.to_json())} bytes, {add_us:.2f} µs per add")
+    for q in (0.5, 0.9, 0.95, 0.99):
+        exact = ordered[int(q * (len(ordered) - 1))]
+        estimate, from_parts = whole.quantile(q), merged.quantile(q)
+        print(f"   p{int(q * 100):<2} exact {exact:7.3f}  sketch {estimate:7.3f} "
+              f"({abs(estimate - exact) / exact * 100:.2f}%)  merged {from_parts:7.3f}")
+
+
+def log_archive(args: List[str]):
+    """Disk usage and lookup latency, legacy JSON logs vs the archive"""
+    from app.data.ids import new_ulid
+    from app.data.log_archive import CODEC, LogArchive
+
+    runs = 500
+    code = "from app.executor.runtime import run_test\n\nSTEPS = [\n" + \
+           "".join(f"    {{'action': 'CLICK', 'selector': '#item-{i}'}},\n" for i in range(60)) + "]\n"
+
+    def sample_log(test_id: str) -> Dict:
+        steps = [{"action": "SEARCH", "query": random.choice(["laptop", "phone", "python"])}]
+        return {
+            "test_id": test_id, "instruction": "open amazon.in and search laptop", "parsed_steps": steps,
+            "generated_code": code + f"# run {random.randrange(3)}\n",  # Three distinct variants
+            "execution": {
+                "status": "passed", "output": "".join(f"  ✅ Step {i} ok ({random.random():.3f}s)\n"
+                                                      for i in range(200)),
+                "telemetry": [{"event": "step", "step": i, "ms": random.randrange(2000)} for i in range(100)]
+            },
+            "metadata": {"steps_count": len(steps)}
+        }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_dir, archive = os.path.join(tmp, "legacy"), LogArchive(os.path.join(tmp, "archive"))
+        os.makedirs(legacy_dir)
+        ids = [new_ulid() for _ in range(runs)]
+        for test_id in ids:
+            log_data = sample_log(test_id)
+            with open(os.path.join(legacy_dir, f"{test_id}.json"), "w", encoding="utf-8") as f:
+                json.dump(log_data, f, indent=2, ensure_ascii=False)
+            archive.write(test_id, log_data)
+
+        legacy_bytes = LogArchive(legacy_dir).disk_bytes()
+        archive_bytes = archive.disk_bytes()
+        started = time.perf_counter()
+        for test_id in random.sample(ids, 200):
+            archive.read(test_id)
+        full_ms = (time.perf_counter() - started) / 200 * 1000
+        started = time.perf_counter()
+        for test_id in random.sample(ids, 200):
+            archive.read(test_id, fields=["parsed_steps"])
+        field_ms = (time.perf_counter() - started) / 200 * 1000
+
+        print(f"💾 {runs} logs: {legacy_bytes / 1024:.0f} KB as JSON, {archive_bytes / 1024:.0f} KB archived "
+              f"({CODEC}, x{legacy_bytes / archive_bytes:.1f} smaller)")
+        print(f"⏱️  get_test_by_id: {full_ms:.2f} ms whole log, {field_ms:.2f} ms one field")
+
+
+def export(args: List[str]):
+    """Peak memory of a full export vs streamed exports of the same history"""
+    from app.data.export import arrow_stream, csv_stream, pa, parquet_stream, write_stream
+    from app.data.storage import create_data_manager
+
+    runs = int(args[0]) if args else 100000
+    with tempfile.TemporaryDirectory() as tmp:
+        store = create_data_manager("sqlite", db_path=os.path.join(tmp, "history.db"),
+                                    logs_dir=os.path.join(tmp, "logs"), screenshots_dir=os.path.join(tmp, "shots"))
+        rows = []
+        for i in range(runs):
+            row, _ = store.build_record(store.new_test_id(), f"open site{i % 40}.com and search item {i}",
+                                        {"parsed_steps": [{"action": "OPEN_BROWSER"}] * 5},
+                                        {"return_code": i % 4, "status": "passed" if i % 4 == 0 else "failed",
+                                         "duration_seconds": 2.5, "errors": "" if i % 4 == 0 else "Timeout 30000ms"})
+            rows.append(row)
+        for start in range(0, runs, 5000):
+            store.write_rows(rows[start:start + 5000])
+        del rows
+
+        def measure(label: str, write):
+            started = time.perf_counter()
+            size = write()
+            seconds = time.perf_counter() - started
+            tracemalloc.start()  # Second run: tracing slows allocation down
+            write()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"   {label:<22} {size / 1024:8.0f} KB in {seconds:5.2f}s, peak {peak / 1e6:6.1f} MB")
+
+        print(f"📤 Exporting {runs} runs")
+        measure("CSV, whole DataFrame", lambda: store.load_all_tests().to_csv(os.path.join(tmp, "a.csv"), index=False)
+                or os.path.getsize(os.path.join(tmp, "a.csv")))
+        measure("CSV, streamed", lambda: write_stream(csv_stream(store), os.path.join(tmp, "b.csv")))
+        if pa is not None:
+            measure("Parquet, streamed", lambda: write_stream(parquet_stream(store), os.path.join(tmp, "c.parquet")))
+            measure("Parquet, 3 columns", lambda: write_stream(
+                parquet_stream(store, ["timestamp", "status", "duration_seconds"]), os.path.join(tmp, "d.parquet")))
+            measure("Arrow IPC, streamed", lambda: write_stream(arrow_stream(store), os.path.join(tmp, "e.arrows")))
+        else:
+            print("   (pip install pyarrow for Parquet and Arrow)")
+
+
+BENCHMARKS: Dict[str, Callable[[List[str]], None]] = {
+    "tracing": tracing,
+    "matrix": matrix,
+    "sqlite": sqlite,
+    "storage": storage,
+    "write_queue": write_queue,
+    "sketches": sketches,
+    "log_archive": log_archive,
+    "export": export,
+}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in BENCHMARKS:
+        print(f"Usage: python -m benchmarks.run <{'|'.join(BENCHMARKS)}> [args ...]")
+        sys.exit(1)
+    BENCHMARKS[sys.argv[1]](sys.argv[2:])
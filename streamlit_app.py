@@ -16,7 +16,10 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 # Import modules
 from app.agents.test_agent_enhanced import agent
-from app.data.excel_data_manager import ExcelDataManager
+from app.data.export import FORMATS, write_stream
+from app.data.storage import HISTORY_COLUMNS, create_data_manager
+from app.data.write_queue import WRITE_BEHIND, PersistenceQueue
+from app.executor.output_capture import read_output_file
 
 
 # ==================== PAGE CONFIGURATION ====================
@@ -31,12 +34,37 @@ st.set_page_config(
 # ==================== INITIALIZE DATA MANAGER ====================
 @st.cache_resource
 def get_data_manager():
-    return ExcelDataManager()
+    # Backend from TEST_STORAGE_BACKEND (sqlite by default); results are
+    # written behind the run unless TEST_STORAGE_WRITE_BEHIND=0
+    store = create_data_manager()
+    return PersistenceQueue(store) if WRITE_BEHIND else store
 
 
 data_manager = get_data_manager()
 
 
+# Query results are cached per store version: reruns of a page (every widget
+# interaction) reuse them until a write or a clear changes the version
+@st.cache_data(max_entries=32)
+def cached_statistics(version):
+    return data_manager.get_statistics()
+
+
+@st.cache_data(max_entries=32)
+def cached_rollups(version, granularity, since=None, by=("bucket",)):
+    return data_manager.get_rollups(granularity, since=since, by=by)
+
+
+@st.cache_data(max_entries=64)
+def cached_search(version, query, limit):
+    return data_manager.search_tests(query, limit=limit)
+
+
+@st.cache_data(max_entries=64)
+def cached_page(version, limit, cursor, status, domain, since, until):
+    return data_manager.get_tests_page(limit, cursor, status=status, domain=domain, since=since, until=until)
+
+
 # ==================== PROFESSIONAL DARK THEME CSS ====================
 st.markdown("""
 <style>
@@ -307,6 +335,22 @@ if page == "Execute Tests":
         help="Describe your test scenario using natural language"
     )
     
+    network_mode = st.selectbox(
+        "Network Mode",
+        ["live", "record", "replay"],
+        index=0,
+        help="Record captures the site's traffic into a HAR archive; "
+             "replay reruns the test offline against that archive"
+    )
+    
+    browsers = st.multiselect(
+        "Browsers",
+        ["chromium", "firefox", "webkit"],
+        default=["chromium"],
+        help="Several engines run in parallel as a browser matrix; "
+             "the test passes only if it passes on every engine"
+    )
+    
     # Execute Button
     col1, col2, col3 = st.columns([1, 2, 1])
     with col2:
@@ -322,15 +366,38 @@ if page == "Execute Tests":
                     "parsed_steps": [],
                     "parsing_status": "",
                     "parsing_errors": "",
+                    "original_steps": [],
+                    "plan_diff": [],
+                    "estimated_time_saved": 0.0,
                     "browser_open": False,
                     "current_url": "",
                     "logged_in": False,
+                    "step_timeouts": [],
+                    "execution_deadline": 0,
                     "generated_code": "",
                     "code_file_path": "",
+                    "code_hash": "",
+                    "network_mode": network_mode,
+                    "browsers": browsers,
                     "execution_status": "",
                     "execution_output": "",
+                    "execution_output_path": "",
                     "execution_errors": "",
                     "retry_count": 0,
+                    "execution_telemetry": [],
+                    "step_durations": [],
+                    "execution_duration": 0.0,
+                    "failure_class": "",
+                    "peak_rss_mb": None,
+                    "max_process_rss_mb": None,
+                    "cpu_seconds": None,
+                    "screenshots": [],
+                    "screenshot_cost": {},
+                    "visual_checks": [],
+                    "traces": [],
+                    "trace_cost": {},
+                    "browser_results": {},
+                    "matrix": {},
                     "test_passed": False
                 })
                 
@@ -341,8 +408,23 @@ if page == "Execute Tests":
                     execution_result={
                         "status": result.get("execution_status", "unknown"),
                         "output": result.get("execution_output", ""),
+                        "output_path": result.get("execution_output_path", ""),
                         "errors": result.get("execution_errors", ""),
-                        "return_code": 0 if result.get("test_passed") else 1
+                        "return_code": 0 if result.get("test_passed") else 1,
+                        "duration_seconds": result.get("execution_duration"),
+                        "failure_class": result.get("failure_class", ""),
+                        "step_durations": result.get("step_durations", []),
+                        "telemetry": result.get("execution_telemetry", []),
+                        "peak_rss_mb": result.get("peak_rss_mb"),
+                        "max_process_rss_mb": result.get("max_process_rss_mb"),
+                        "cpu_seconds": result.get("cpu_seconds"),
+                        "screenshots": result.get("screenshots", []),
+                        "screenshot_cost": result.get("screenshot_cost", {}),
+                        "visual_checks": result.get("visual_checks", []),
+                        "traces": result.get("traces", []),
+                        "trace_cost": result.get("trace_cost", {}),
+                        "browsers": result.get("browser_results", {}),
+                        "matrix": result.get("matrix", {})
                     }
                 )
                 
@@ -393,14 +475,111 @@ if page == "Execute Tests":
                 
                 with tab1:
                     st.json(result.get("parsed_steps", []))
+                    
+                    if result.get("plan_diff"):
+                        st.caption(
+                            f"Plan optimizer: {len(result.get('original_steps', []))} → "
+                            f"{len(result.get('parsed_steps', []))} steps, "
+                            f"~{result.get('estimated_time_saved', 0.0):.1f}s saved"
+                        )
+                        with st.expander("Plan diff"):
+                            st.json(result.get("plan_diff"))
                 
                 with tab2:
                     st.code(result.get("generated_code", ""), language="python")
                     st.caption(f"Saved to: {result.get('code_file_path', 'N/A')}")
                 
                 with tab3:
+                    matrix = result.get("matrix") or {}
+                    if matrix:
+                        st.caption(
+                            f"Browser matrix: {matrix['wall_seconds']:.1f}s wall vs "
+                            f"{matrix['sum_seconds']:.1f}s sequential (x{matrix['speedup']})"
+                        )
+                        st.dataframe(
+                            pd.DataFrame([
+                                {"browser": browser, "status": engine["status"],
+                                 "wall_seconds": engine["wall_seconds"],
+                                 "duration_seconds": engine["duration_seconds"],
+                                 "failure_class": engine["failure_class"],
+                                 "peak_rss_mb": engine["peak_rss_mb"],
+                                 "max_process_rss_mb": engine.get("max_process_rss_mb")}
+                                for browser, engine in result.get("browser_results", {}).items()
+                            ]),
+                            use_container_width=True
+                        )
+                    if result.get("peak_rss_mb") is not None:
+                        st.caption(
+                            f"Peak memory: {result.get('peak_rss_mb')} MB | "
+                            f"CPU time: {result.get('cpu_seconds')}s"
+                        )
+                    elif result.get("max_process_rss_mb") is not None:
+                        # No cgroup: wait4 only knows the largest reaped process
+                        st.caption(
+                            f"Largest process: {result.get('max_process_rss_mb')} MB | "
+                            f"CPU time (reaped processes): {result.get('cpu_seconds')}s"
+                        )
+                    if result.get("step_durations"):
+                        st.caption(f"Test duration: {result.get('execution_duration', 0.0):.2f}s")
+                        st.dataframe(
+                            pd.DataFrame(result.get("step_durations")),
+                            use_container_width=True
+                        )
+                    
                     st.text_area("Output", result.get("execution_output", "No output"), height=250)
                     
+                    cost = result.get("screenshot_cost") or {}
+                    if cost.get("count"):
+                        st.caption(
+                            f"Screenshots: {cost['count']} ({cost['deduped']} deduplicated) | "
+                            f"capture {cost['capture_ms']:.0f} ms in test, "
+                            f"encode {cost['encode_ms']:.0f} ms in background | "
+                            f"{cost['raw_bytes'] / 1024:.0f} KB raw → {cost['bytes'] / 1024:.0f} KB stored"
+                        )
+                        shots = [s["path"] for s in result.get("screenshots", []) if os.path.exists(s["path"])]
+                        if shots:
+                            st.image(shots, caption=[os.path.basename(p) for p in shots], width=240)
+                    
+                    for check in result.get("visual_checks", []):
+                        if check["passed"]:
+                            st.caption(f"🖼️ {check['key']}: {check['reason']}")
+                            continue
+                        st.warning(
+                            f"🖼️ Visual change in **{check['key']}**: {check['reason']} "
+                            f"({check.get('diff_ratio', 0):.2%} of pixels, {check.get('elapsed_ms', 0)} ms)"
+                        )
+                        images = [p for p in (check.get("baseline"), check["path"], check.get("heatmap")) if p]
+                        st.image(images, caption=["Baseline", "Current", "Diff"][:len(images)], width=240)
+                        st.code(
+                            f"python -m app.executor.visual_regression accept {check['key']} {check['path']}",
+                            language="bash"
+                        )
+                    
+                    trace_cost = result.get("trace_cost") or {}
+                    if trace_cost.get("chunks"):
+                        st.caption(
+                            f"Tracing: {trace_cost['chunks']} step chunks, {trace_cost['kept']} kept | "
+                            f"{trace_cost['overhead_ms']:.0f} ms in tracing calls"
+                        )
+                    for trace in result.get("traces", []):
+                        st.caption(
+                            f"🧵 Step {trace['step']} ({trace['reason']}, attempt {trace.get('attempt', 1)}): "
+                            f"`{trace['path']}`"
+                        )
+                        st.code(f"playwright show-trace {trace['path']}", language="bash")
+                    
+                    output_path = result.get("execution_output_path")
+                    if output_path and os.path.exists(output_path):
+                        with open(output_path, "rb") as f:
+                            st.download_button(
+                                "📥 Full Output (.log.gz)",
+                                f.read(),
+                                file_name=os.path.basename(output_path),
+                                mime="application/gzip"
+                            )
+                        if st.checkbox("📄 Show full output", key=f"full_output_{output_path}"):
+                            st.text(read_output_file(output_path))  # Only read when asked
+                    
                     if result.get("execution_errors"):
                         st.error("**Error Details:**")
                         st.text(result.get("execution_errors"))
@@ -433,7 +612,8 @@ elif page == "Analytics Dashboard":
     </div>
     """, unsafe_allow_html=True)
     
-    stats = data_manager.get_statistics()
+    version = data_manager.version()
+    stats = cached_statistics(version)
     
     # Key Metrics
     st.subheader("Key Performance Indicators")
@@ -446,7 +626,9 @@ elif page == "Analytics Dashboard":
         st.metric("Success Rate", f"{stats['pass_rate']:.1f}%")
     
     with col3:
-        st.metric("Avg Duration", f"{stats['avg_duration']:.2f}s")
+        st.metric("Avg Duration", f"{stats['avg_duration']:.2f}s",
+                  help=f"p50 {stats.get('p50_duration', 0.0):.2f}s • p90 {stats.get('p90_duration', 0.0):.2f}s • "
+                       f"p99 {stats.get('p99_duration', 0.0):.2f}s")
     
     with col4:
         st.metric("Total Steps", stats['total_steps'])
@@ -481,21 +663,41 @@ elif page == "Analytics Dashboard":
             st.metric("Passed", stats['passed'])
             st.metric("Failed", stats['failed'])
         
-        # Timeline
-        df = data_manager.get_all_tests()
-        if not df.empty and 'timestamp' in df.columns:
-            st.subheader("Execution Timeline")
+        # Timeline (from the hourly/daily rollups, not the raw history)
+        st.subheader("Execution Timeline")
+        col1, col2 = st.columns(2)
+        with col1:
+            granularity = st.selectbox("Bucket", ["day", "hour"], key="rollup_granularity")
+        with col2:
+            days = st.selectbox("Range (days)", [7, 30, 90, 365], index=1, key="rollup_days")
+        since = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")  # Whole days: stable cache key
+        timeline = cached_rollups(version, granularity, since=since)
+        
+        if not timeline.empty:
+            timeline['bucket'] = pd.to_datetime(timeline['bucket'])
             
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
-            df_sorted = df.sort_values('timestamp')
+            fig = px.line(
+                timeline,
+                x='bucket',
+                y=['p50_duration', 'p90_duration', 'p99_duration'],
+                markers=True,
+                title="Duration Trend Analysis (percentiles)"
+            )
+            fig.update_layout(
+                paper_bgcolor='rgba(0,0,0,0)',
+                plot_bgcolor='rgba(30,41,59,0.6)',
+                font=dict(color='#e2e8f0')
+            )
+            st.plotly_chart(fig, use_container_width=True)
             
-            fig = px.scatter(
-                df_sorted,
-                x='timestamp',
-                y='duration_seconds',
-                color='passed',
-                color_discrete_map={True: '#059669', False: '#dc2626'},
-                title="Duration Trend Analysis"
+            fig = px.bar(
+                timeline,
+                x='bucket',
+                y='count',
+                color='pass_rate',
+                color_continuous_scale=['#dc2626', '#059669'],
+                range_color=[0, 100],
+                title="Executions and Pass Rate"
             )
             fig.update_layout(
                 paper_bgcolor='rgba(0,0,0,0)',
@@ -503,6 +705,12 @@ elif page == "Analytics Dashboard":
                 font=dict(color='#e2e8f0')
             )
             st.plotly_chart(fig, use_container_width=True)
+        else:
+            st.info("No executions in this range")
+        
+        st.subheader("By Domain and Status")
+        breakdown = cached_rollups(version, "all", by=("domain", "status"))
+        st.dataframe(breakdown.round(2), use_container_width=True, hide_index=True)
     
     else:
         st.info("No test data available. Execute your first test to see analytics.")
@@ -522,18 +730,56 @@ elif page == "Test History":
     with col1:
         search_query = st.text_input(
             "Search Tests",
-            placeholder="Enter keywords to filter results..."
+            placeholder='e.g. login errors:timeout url:amazon "add to cart" pyth* status:failed',
+            help="Searches instructions, errors, steps and URLs, best matches first. "
+                 "Field filters: instruction:, errors:, steps:, url: (or domain:), status:. "
+                 "Quotes for phrases, * for prefixes."
         )
     
     with col2:
         limit = st.selectbox("Display Count", [10, 20, 50, 100], index=0)
     
     # Fetch data
+    version = data_manager.version()
     if search_query:
-        df = data_manager.search_tests(search_query)
-        st.info(f"Found {len(df)} matching records")
+        df = cached_search(version, search_query, limit)
+        st.info(f"Showing the {len(df)} best matching records")
     else:
-        df = data_manager.get_recent_tests(limit)
+        # Newest first, one page at a time (keyset cursors: pages cost the same at any depth)
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            status_filter = st.selectbox("Status", ["All", "passed", "failed", "timeout", "error"])
+        with col2:
+            domain_filter = st.text_input("Domain", placeholder="e.g. amazon.in")
+        with col3:
+            since_date = st.date_input("From", value=None)
+        with col4:
+            until_date = st.date_input("To", value=None)
+        filters = (
+            None if status_filter == "All" else status_filter,
+            domain_filter.strip().lower() or None,
+            since_date.isoformat() if since_date else None,
+            until_date.isoformat() if until_date else None
+        )
+        
+        # Cursors of the pages visited so far; new filters start over
+        if st.session_state.get("history_filters") != (limit, filters):
+            st.session_state.history_filters = (limit, filters)
+            st.session_state.history_cursors = [None]
+        cursors = st.session_state.history_cursors
+        df, next_cursor = cached_page(version, limit, cursors[-1], *filters)
+        
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col1:
+            if st.button("← Newer", disabled=len(cursors) == 1, use_container_width=True):
+                cursors.pop()
+                st.rerun()
+        with col2:
+            st.caption(f"Page {len(cursors)}")
+        with col3:
+            if st.button("Older →", disabled=next_cursor is None, use_container_width=True):
+                cursors.append(next_cursor)
+                st.rerun()
     
     if not df.empty:
         st.dataframe(
@@ -549,7 +795,10 @@ elif page == "Test History":
         selected_id = st.selectbox("Select Test", test_ids)
         
         if st.button("Load Details"):
-            test_data = data_manager.get_test_by_id(selected_id)
+            # Only the fields shown (the archive decompresses per field)
+            test_data = data_manager.get_test_by_id(
+                selected_id, fields=['execution', 'metadata', 'parsed_steps', 'generated_code']
+            )
             
             if test_data:
                 col1, col2, col3 = st.columns(3)
@@ -572,6 +821,11 @@ elif page == "Test History":
                     st.code(test_data['generated_code'], language="python")
                 
                 with tab3:
+                    if test_data['execution'].get('step_durations'):
+                        st.dataframe(
+                            pd.DataFrame(test_data['execution']['step_durations']),
+                            use_container_width=True
+                        )
                     st.text_area("Output", test_data['execution']['output'], height=200)
                     if test_data['execution']['errors']:
                         st.error("Errors:")
@@ -597,8 +851,10 @@ elif page == "Data Management":
         st.markdown("### Excel Export")
         st.info("Complete test history in Excel format")
         
-        if os.path.exists(data_manager.excel_path):
-            with open(data_manager.excel_path, 'rb') as f:
+        # Built on demand; the history itself lives in the storage backend
+        if st.button("Generate Excel", use_container_width=True):
+            excel_path = data_manager.export_to_excel()
+            with open(excel_path, 'rb') as f:
                 st.download_button(
                     label="Download Excel File",
                     data=f,
@@ -606,29 +862,45 @@ elif page == "Data Management":
                     mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
                     use_container_width=True
                 )
-        else:
-            st.warning("No data available")
     
     with col2:
-        st.markdown("### CSV Export")
-        st.info("Spreadsheet-compatible format")
+        st.markdown("### Streaming Export")
+        st.info("CSV, Parquet or Arrow, written chunk by chunk")
         
-        if st.button("Generate CSV", use_container_width=True):
-            csv_path = data_manager.export_to_csv()
-            with open(csv_path, 'r') as f:
-                st.download_button(
-                    label="Download CSV File",
-                    data=f,
-                    file_name="test_history.csv",
-                    mime="text/csv",
-                    use_container_width=True
-                )
+        export_format = st.selectbox("Format", list(FORMATS), format_func=str.upper)
+        export_columns = st.multiselect("Columns", HISTORY_COLUMNS, default=HISTORY_COLUMNS)
+        col_from, col_to = st.columns(2)
+        with col_from:
+            export_since = st.date_input("From", value=None, key="export_since")
+        with col_to:
+            export_until = st.date_input("To", value=None, key="export_until")
+        
+        if st.button("Generate Export", use_container_width=True, disabled=not export_columns):
+            stream, mime, extension = FORMATS[export_format]
+            export_path = f"test_history.{extension}"
+            try:
+                # Memory bounded by the chunk size; the download serves the file
+                size = write_stream(stream(data_manager, export_columns,
+                                           export_since.isoformat() if export_since else None,
+                                           export_until.isoformat() if export_until else None),
+                                    export_path)
+            except RuntimeError as e:  # pyarrow missing
+                st.error(str(e))
+            else:
+                with open(export_path, 'rb') as f:
+                    st.download_button(
+                        label=f"Download {export_format.upper()} ({size / 1024:.0f} KB)",
+                        data=f,
+                        file_name=export_path,
+                        mime=mime,
+                        use_container_width=True
+                    )
     
     st.markdown("---")
     
     # Data Preview
     st.subheader("Data Preview")
-    df = data_manager.get_all_tests()
+    df = data_manager.get_all_tests()  # In-process cache, reloaded when the store changes
     
     if not df.empty:
         st.dataframe(df.head(10), use_container_width=True)
@@ -641,11 +913,17 @@ elif page == "Data Management":
             st.metric("Total Records", len(df))
         
         with col2:
-            st.metric("File Size", f"{os.path.getsize(data_manager.excel_path) / 1024:.1f} KB")
+            st.metric(f"{data_manager.name} Size", f"{os.path.getsize(data_manager.storage_path) / 1024:.1f} KB")
         
         with col3:
-            json_files = len([f for f in os.listdir(data_manager.logs_dir) if f.endswith('.json')])
-            st.metric("JSON Logs", json_files)
+            st.metric("Archived Logs", data_manager.archive.count(),
+                      help=f"{data_manager.archive.disk_bytes() / 1024:.1f} KB compressed")
+        
+        if isinstance(data_manager, PersistenceQueue):
+            queue_stats = data_manager.stats()
+            st.caption(f"Write-behind queue: {queue_stats['pending']} pending, "
+                       f"{queue_stats['written']} written in {queue_stats['batches']} batches "
+                       f"(fsync: {queue_stats['fsync']})")
     else:
         st.info("No data available for export")
     
@@ -800,7 +1078,11 @@ elif page == "Documentation":
         st.markdown("""
         ## Data Model
         
-        ### Excel Schema
+        ### History Schema
+        
+        One row per run in an SQLite database (WAL mode, indexed on
+        test_id, timestamp, status and url). Set TEST_STORAGE_BACKEND=excel
+        for the legacy workbook; Excel is otherwise an on-demand export.
         
         - test_id: Unique identifier
         - timestamp: Execution time
@@ -816,10 +1098,10 @@ elif page == "Documentation":
         
         ```
         project/
-        ├── test_history.xlsx
-        ├── test_logs/*.json
+        ├── test_history.db
+        ├── test_logs/YYYY/MM/DD.logs + .idx, test_logs/code/
         ├── screenshots/*.png
-        └── app/generated_tests/*.py
+        └── app/generated_tests/test_<hash>.py + manifest.json
         ```
         """)
     
@@ -827,10 +1109,12 @@ elif page == "Documentation":
         st.markdown("""
         ## API Reference
         
-        ### ExcelDataManager
+        ### Storage Backends
         
         ```python
-        from app.data.excel_data_manager import data_manager
+        from app.data.storage import create_data_manager
+        
+        data_manager = create_data_manager()  # "sqlite" (default) or "excel"
         
         # Save result
         test_id = data_manager.save_test_result(
@@ -842,9 +1126,12 @@ elif page == "Documentation":
         # Retrieve data
         df = data_manager.get_all_tests()
         stats = data_manager.get_statistics()
+        page, cursor = data_manager.get_tests_page(20, status="failed")  # Newest first
         
         # Export
         data_manager.export_to_csv("output.csv")
+        data_manager.export_to_parquet("output.parquet", columns=["timestamp", "status"], since="2024-06-01")
+        data_manager.export_to_excel("output.xlsx")
         ```
         
         ### Test Agent
@@ -0,0 +1,28 @@
+"""Shared fixtures: history stores in a temporary directory"""
+
+import os
+from typing import Dict
+
+import pytest
+
+from app.data.storage import HISTORY_COLUMNS
+
+
+@pytest.fixture
+def store(tmp_path):
+    """Empty SQLite history store"""
+    from app.data.sqlite_store import SQLiteDataManager
+    return SQLiteDataManager(str(tmp_path / "history.db"), logs_dir=str(tmp_path / "logs"),
+                             screenshots_dir=str(tmp_path / "shots"))
+
+
+def history_row(test_id: str, timestamp: str, status: str = "passed", url: str = "https://shop.example.com",
+                duration: float = 2.0, **values) -> Dict:
+    """One history row with the given fields, the rest empty"""
+    row = {column: "" for column in HISTORY_COLUMNS}
+    row.update({"test_id": test_id, "timestamp": timestamp, "status": status, "passed": status == "passed",
+                "url_visited": url, "duration_seconds": duration, "steps_count": 3,
+                "browser_opened": True, "login_checked": False, "screenshots_taken": 0,
+                "log_file_path": os.path.join("logs", test_id)})
+    row.update(values)
+    return row
@@ -0,0 +1,45 @@
+"""Tests for content-addressed generated tests and their garbage collection"""
+
+import os
+import time
+
+from app.executor import artifact_store
+from app.executor.artifact_store import collect_garbage, load_manifest, store_test
+
+
+def test_identical_code_is_stored_once(tmp_path):
+    first = store_test("STEPS = []\n", test_dir=str(tmp_path))
+    second = store_test("STEPS = []\n", test_dir=str(tmp_path))
+    assert first["path"] == second["path"]
+    assert not first["reused"] and second["reused"]
+    assert first["run_id"] != second["run_id"]
+
+    manifest = load_manifest(str(tmp_path))
+    assert manifest["artifacts"][first["hash"]]["runs"] == 2
+    assert os.path.exists(tmp_path / "__init__.py")
+
+
+def test_different_code_gets_its_own_artifact(tmp_path):
+    first = store_test("STEPS = [1]\n", test_dir=str(tmp_path))
+    second = store_test("STEPS = [2]\n", kind="suite", test_dir=str(tmp_path))
+    assert first["hash"] != second["hash"]
+    assert os.path.basename(second["path"]).startswith("suite_")
+
+
+def test_garbage_collection_keeps_referenced_artifacts(tmp_path, monkeypatch):
+    monkeypatch.setattr(artifact_store, "GC_INTERVAL_SECONDS", float("inf"))  # No automatic GC
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now - 90 * 24 * 3600)
+    old = store_test("OLD = 1\n", run_id="old", test_dir=str(tmp_path))
+    monkeypatch.setattr(time, "time", lambda: now)
+    kept = store_test("NEW = 1\n", run_id="new", test_dir=str(tmp_path))
+
+    preview = collect_garbage(30, str(tmp_path), dry_run=True)
+    assert preview["artifacts_removed"] == 1
+    assert os.path.exists(old["path"])
+
+    stats = collect_garbage(30, str(tmp_path))
+    assert stats == {**preview, "bytes_freed": stats["bytes_freed"]}
+    assert not os.path.exists(old["path"])
+    assert os.path.exists(kept["path"])
+    assert list(load_manifest(str(tmp_path))["runs"]) == ["new"]
@@ -0,0 +1,68 @@
+"""Tests for login-sequence detection and storage-state reuse"""
+
+import json
+import os
+import time
+
+from app.executor.auth_state import (
+    find_login_sequence,
+    invalidate,
+    is_state_valid,
+    resolve_auth_state,
+    state_path,
+)
+
+
+LOGIN_STEPS = [
+    {"action": "OPEN_BROWSER", "url": "example.com/login"},
+    {"action": "TYPE", "selector": "#user", "text": "me"},
+    {"action": "TYPE", "selector": "#password", "text": "secret"},
+    {"action": "CLICK", "selector": "#submit"},
+    {"action": "CHECK_LOGIN", "expected": "logged_in"},
+]
+
+
+def _write_state(path: str, cookies):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"cookies": cookies, "origins": []}, f)
+
+
+def test_finds_login_prefix_and_origin():
+    assert find_login_sequence(LOGIN_STEPS) == (1, 3, "https://example.com")
+
+
+def test_no_login_without_password_field():
+    steps = [step for step in LOGIN_STEPS if step.get("selector") != "#password"]
+    assert find_login_sequence(steps) is None
+
+
+def test_state_with_expired_cookies_is_invalid(tmp_path):
+    path = str(tmp_path / "state.json")
+    _write_state(path, [{"name": "sid", "expires": time.time() - 10}])
+    assert not is_state_valid(path)
+    _write_state(path, [{"name": "sid", "expires": -1}])
+    assert is_state_valid(path)
+
+
+def test_old_state_is_invalid(tmp_path):
+    path = str(tmp_path / "state.json")
+    _write_state(path, [{"name": "sid", "expires": -1}])
+    assert not is_state_valid(path, ttl=-1)
+
+
+def test_resolve_removes_invalid_snapshot(tmp_path):
+    origin = "https://example.com"
+    path = state_path(origin, str(tmp_path))
+    _write_state(path, [])
+    resolved = resolve_auth_state(origin, state_dir=str(tmp_path))
+    assert resolved == {"path": path, "valid": False}
+    assert not os.path.exists(path)
+
+
+def test_invalidate_drops_snapshot(tmp_path):
+    origin = "https://example.com"
+    _write_state(state_path(origin, str(tmp_path)), [{"name": "sid", "expires": -1}])
+    assert resolve_auth_state(origin, state_dir=str(tmp_path))["valid"]
+    assert invalidate(origin, str(tmp_path))
+    assert not invalidate(origin, str(tmp_path))
+    assert not resolve_auth_state(origin, state_dir=str(tmp_path))["valid"]
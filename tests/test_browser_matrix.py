@@ -0,0 +1,73 @@
+"""Tests for browser-matrix fan-out and result merging"""
+
+import os
+
+import pytest
+
+from app.executor import browser_matrix
+from app.executor.browser_matrix import execute_browser_matrix, merge_results
+
+
+@pytest.fixture
+def runs(tmp_path, monkeypatch):
+    """Record the arguments of every engine's run instead of starting browsers"""
+    monkeypatch.chdir(tmp_path)  # Archives go to ./network_archives
+    monkeypatch.setattr(browser_matrix, "ensure_runtime_compiled", lambda: None)
+    calls = {}
+
+    def fake_execute(test_file_path, network_mode, stale_policy, browser, **options):
+        calls[browser] = {"network_mode": network_mode, "stale_policy": stale_policy}
+        return {"status": "passed", "return_code": 0, "output": browser, "errors": ""}
+
+    monkeypatch.setattr(browser_matrix, "execute_python_test", fake_execute)
+    test_file = tmp_path / "test_x.py"
+    test_file.write_text("STEPS = []\n")
+    return str(test_file), calls
+
+
+def test_replay_without_archive_records_on_first_engine_only(runs):
+    test_file, calls = runs
+    result = execute_browser_matrix(test_file, ["chromium", "firefox", "webkit"], network_mode="replay")
+    assert calls["chromium"]["network_mode"] == "record"
+    assert calls["firefox"]["network_mode"] == "live"
+    assert calls["webkit"]["network_mode"] == "live"
+    assert result["status"] == "passed"
+
+
+def test_fresh_replay_never_rerecords(runs, tmp_path):
+    test_file, calls = runs
+    execute_browser_matrix(test_file, ["chromium"], network_mode="record")
+    har_path = browser_matrix.resolve_network_mode(test_file, "record")["har_path"]
+    os.makedirs(os.path.dirname(har_path), exist_ok=True)
+    open(har_path, "wb").close()
+
+    execute_browser_matrix(test_file, ["chromium", "firefox"], network_mode="replay")
+    assert all(call == {"network_mode": "replay", "stale_policy": "serve"} for call in calls.values())
+
+
+def test_fail_policy_stops_the_matrix(runs):
+    test_file, calls = runs
+    result = execute_browser_matrix(test_file, ["chromium", "firefox"], network_mode="replay",
+                                    stale_policy="fail")
+    assert result["status"] == "error"
+    assert calls == {}
+
+
+def test_merge_keeps_every_engines_data():
+    merged = merge_results({
+        "chromium": {"return_code": 0, "status": "passed", "output": "ok", "wall_seconds": 1.0,
+                     "screenshots": [{"path": "a.png"}], "screenshot_cost": {"count": 1, "bytes": 10}},
+        "firefox": {"return_code": 1, "status": "failed", "output": "", "wall_seconds": 2.0,
+                    "errors": "boom", "failure_class": "timeout", "killed_processes": 2,
+                    "screenshots": [{"path": "b.png"}], "screenshot_cost": {"count": 2, "bytes": 5},
+                    "telemetry": [{"event": "test_end"}]},
+    }, 2.0)
+    assert merged["status"] == "failed"
+    assert merged["return_code"] == 1
+    assert "boom" in merged["errors"]
+    assert merged["failure_class"] == "timeout"
+    assert [shot["browser"] for shot in merged["screenshots"]] == ["chromium", "firefox"]
+    assert merged["screenshot_cost"] == {"count": 3, "bytes": 15}
+    assert merged["telemetry"] == [{"event": "test_end", "browser": "firefox"}]
+    assert merged["killed_processes"] == 2
+    assert merged["browsers"]["firefox"]["status"] == "failed"
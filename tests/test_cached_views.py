@@ -0,0 +1,81 @@
+"""Tests for the cached, version-checked history frame"""
+
+import pandas as pd
+
+from app.data.sqlite_store import SQLiteDataManager
+from app.data.storage import append_compact, compact_frame
+from conftest import history_row
+
+
+def count_loads(store, monkeypatch):
+    """Record the (after, until) range of every load from storage"""
+    loads = []
+    load_all_tests = store.load_all_tests
+
+    def counted(after=None, until=None):
+        loads.append((after, until))
+        return load_all_tests(after=after, until=until)
+
+    monkeypatch.setattr(store, "load_all_tests", counted)
+    return loads
+
+
+def test_history_frame_has_compact_dtypes(store):
+    store.insert_rows([history_row("01A", "2024-06-01 10:00:00")])
+    df = store.get_all_tests()
+    assert df['status'].dtype == "category"
+    assert df['passed'].dtype == bool
+    assert df['steps_count'].dtype == "int32"
+    assert df['duration_seconds'].dtype == "float32"
+    assert pd.api.types.is_datetime64_any_dtype(df['timestamp'])
+
+
+def test_unchanged_store_is_served_from_cache(store, monkeypatch):
+    store.insert_rows([history_row("01A", "2024-06-01 10:00:00")])
+    loads = count_loads(store, monkeypatch)
+    store.get_all_tests()
+    df = store.get_all_tests()
+    df['extra'] = 1  # Callers may add columns to their copy
+    assert len(loads) == 1
+    assert 'extra' not in store.get_all_tests()
+
+
+def test_appended_rows_are_loaded_alone(store, monkeypatch):
+    store.insert_rows([history_row("01A", "2024-06-01 10:00:00")])
+    loads = count_loads(store, monkeypatch)
+    store.get_all_tests()
+    position = store.version()[1]
+    store.insert_rows([history_row("01B", "2024-06-01 11:00:00", status="timeout", url="https://new.example.org")])
+    df = store.get_all_tests()
+
+    assert loads[-1] == (position, store.version()[1])
+    assert df['test_id'].tolist() == ["01A", "01B"]
+    assert set(df['status'].cat.categories) == {"passed", "timeout"}
+
+
+def test_writes_from_other_processes_are_seen(store):
+    store.insert_rows([history_row("01A", "2024-06-01 10:00:00")])
+    assert len(store.get_all_tests()) == 1
+    other = SQLiteDataManager(store.db_path, logs_dir=store.logs_dir, screenshots_dir=store.screenshots_dir)
+    other.insert_rows([history_row("01B", "2024-06-01 11:00:00")])
+    assert len(store.get_all_tests()) == 2
+
+
+def test_clearing_reloads_the_whole_table(store, monkeypatch):
+    store.insert_rows([history_row("01A", "2024-06-01 10:00:00"), history_row("01B", "2024-06-01 11:00:00")])
+    store.get_all_tests()
+    other = SQLiteDataManager(store.db_path, logs_dir=store.logs_dir, screenshots_dir=store.screenshots_dir)
+    other.clear_history()
+    other.insert_rows([history_row("01C", "2024-06-02 10:00:00")])  # Row ids restart
+
+    loads = count_loads(store, monkeypatch)
+    assert store.get_all_tests()['test_id'].tolist() == ["01C"]
+    assert loads[-1][0] is None
+
+
+def test_append_compact_unions_categories():
+    old = compact_frame(pd.DataFrame({"status": ["passed"], "url_visited": ["a"]}))
+    new = compact_frame(pd.DataFrame({"status": ["failed"], "url_visited": ["b"]}))
+    merged = append_compact(old, new)
+    assert merged['status'].tolist() == ["passed", "failed"]
+    assert merged['status'].dtype == "category"
@@ -0,0 +1,81 @@
+"""Tests for streamed CSV, Parquet and Arrow exports"""
+
+import io
+import os
+
+import pandas as pd
+import pytest
+
+from app.data.export import csv_stream, write_stream
+from app.data.storage import HISTORY_COLUMNS
+from conftest import history_row
+
+
+@pytest.fixture
+def history(store):
+    store.insert_rows([history_row(f"01{i:03d}", f"2024-06-{1 + i // 10:02d} 10:{i % 60:02d}:00",
+                                   status="failed" if i % 4 == 0 else "passed", duration=i / 2)
+                       for i in range(25)])
+    return store
+
+
+def test_csv_streams_one_piece_per_chunk(history):
+    pieces = list(csv_stream(history, chunk_size=10))
+    assert len(pieces) == 3
+    assert sum(piece.startswith(b"test_id,") for piece in pieces) == 1
+    df = pd.read_csv(io.BytesIO(b"".join(pieces)), dtype={"test_id": str})
+    assert df.columns.tolist() == HISTORY_COLUMNS
+    assert df['test_id'].tolist() == [f"01{i:03d}" for i in range(25)]
+    assert df['duration_seconds'].iloc[3] == 1.5
+
+
+def test_csv_columns_and_time_range(history):
+    data = b"".join(csv_stream(history, columns=["test_id", "status"], since="2024-06-02", until="2024-06-02"))
+    df = pd.read_csv(io.BytesIO(data), dtype={"test_id": str})
+    assert df.columns.tolist() == ["test_id", "status"]
+    assert df['test_id'].tolist() == [f"01{i:03d}" for i in range(10, 20)]
+
+
+def test_unknown_columns_are_rejected(history):
+    with pytest.raises(ValueError, match="password"):
+        list(csv_stream(history, columns=["test_id", "password"]))
+
+
+def test_empty_history_exports_a_header(store):
+    assert b"".join(csv_stream(store, columns=["test_id", "status"])) == b"test_id,status\n"
+
+
+def test_failed_export_leaves_no_file(tmp_path):
+    def broken():
+        yield b"test_id\n"
+        raise OSError("store went away")
+
+    output = tmp_path / "out.csv"
+    with pytest.raises(OSError):
+        write_stream(broken(), str(output))
+    assert os.listdir(tmp_path) == []
+
+
+def test_parquet_row_groups_and_pruned_columns(history, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    from app.data.export import parquet_stream
+
+    path = str(tmp_path / "h.parquet")
+    write_stream(parquet_stream(history, chunk_size=10), path)
+    parquet = pq.ParquetFile(path)
+    assert parquet.metadata.num_row_groups == 3
+    assert parquet.metadata.num_rows == 25
+    assert str(parquet.schema_arrow.field("duration_seconds").type) == "float"
+
+    write_stream(parquet_stream(history, ["timestamp", "status"]), path)
+    assert pq.read_table(path).column_names == ["timestamp", "status"]
+
+
+def test_arrow_stream_has_one_batch_per_chunk(history):
+    pa = pytest.importorskip("pyarrow")
+    from app.data.export import arrow_stream
+
+    reader = pa.ipc.open_stream(b"".join(arrow_stream(history, chunk_size=10)))
+    batches = list(reader)
+    assert [batch.num_rows for batch in batches] == [10, 10, 5]
+    assert batches[0].schema.field("passed").type == pa.bool_()
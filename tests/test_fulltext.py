@@ -0,0 +1,77 @@
+"""Tests for full-text search and the migrations that backfill it"""
+
+from app.data.fulltext import compile_query, like_pattern, parse_query
+from app.data.sqlite_store import MIGRATIONS, SQLiteDataManager
+from conftest import history_row
+
+
+def reopen(store):
+    return SQLiteDataManager(store.db_path, logs_dir=store.logs_dir, screenshots_dir=store.screenshots_dir)
+
+
+def searched(store, query):
+    return store.search_tests(query)['test_id'].tolist()
+
+
+def test_query_syntax():
+    terms, filters = parse_query('login "add to cart" errors:timeout domain:amazon pyth* status:failed foo:bar')
+    assert terms == [("", "login", False), ("", "add to cart", False), ("errors", "timeout", False),
+                     ("url", "amazon", False), ("", "pyth", True), ("", "foo bar", False)]
+    assert filters == {"status": "failed"}
+    assert compile_query(terms[2:5]) == 'errors : "timeout" AND url : "amazon" AND "pyth"*'
+    assert like_pattern("50%_off") == "%50\\%\\_off%"
+
+
+def test_search_fields_phrases_and_ranking(store):
+    store.insert_rows([
+        history_row("01A", "2024-06-01 10:00:00", instruction="open checkout page", url="https://checkout.shop.com"),
+        history_row("01B", "2024-06-01 11:00:00", instruction="search shoes", url="https://checkout.shop.com"),
+        history_row("01C", "2024-06-01 12:00:00", instruction="add to cart", status="failed",
+                    errors="Timeout 30000ms exceeded", steps_text="CLICK #add-to-cart"),
+    ])
+    assert searched(store, "checkout") == ["01A", "01B"]  # Instruction match ranks first
+    assert searched(store, '"add to cart"') == ["01C"]
+    assert searched(store, "errors:timeout") == ["01C"]
+    assert searched(store, "instruction:timeout") == []
+    assert searched(store, "step:click") == ["01C"]
+    prefixed = searched(store, "sho*")  # "shoes" in an instruction, "shop" in every URL
+    assert prefixed[0] == "01B" and set(prefixed) == {"01A", "01B", "01C"}
+    assert searched(store, "checkout status:failed") == []
+    assert store.search_tests("checkout", limit=1)['test_id'].tolist() == ["01A"]
+
+
+def test_saved_steps_are_indexed(store):
+    test_id = store.save_test_result("log in", {"parsed_steps": [{"action": "TYPE", "selector": "#password"}]},
+                                     {"return_code": 0})
+    assert searched(store, "steps:password") == [test_id]
+
+
+def test_substring_search_without_fts5(store):
+    store.insert_rows([history_row("01A", "2024-06-01 10:00:00", instruction="open checkout page"),
+                       history_row("01B", "2024-06-01 11:00:00", errors="100% done_ok")])
+    store.fts = False
+    assert searched(store, "checkout") == ["01A"]
+    assert searched(store, "errors:done_ok") == ["01B"]
+    assert searched(store, "status:passed") == ["01B", "01A"]
+
+
+def test_new_database_is_marked_migrated(store):
+    markers = {key for (key,) in store.connect().execute("SELECT key FROM meta WHERE key LIKE 'migrated_%'")}
+    assert markers == {f"migrated_{name}" for name in MIGRATIONS}
+
+
+def test_interrupted_migration_runs_again(store):
+    store.insert_rows([history_row("01A", "2024-06-01 10:00:00", instruction="open checkout page")])
+    with store.connect() as conn:
+        # As if the index was created but the backfill never committed
+        conn.execute("DELETE FROM tests_fts")
+        conn.execute("DELETE FROM meta WHERE key = 'migrated_search_index'")
+    assert searched(store, "checkout") == []
+    assert searched(reopen(store), "checkout") == ["01A"]
+
+
+def test_completed_migration_is_not_repeated(store):
+    store.insert_rows([history_row("01A", "2024-06-01 10:00:00", instruction="open checkout page")])
+    with store.connect() as conn:
+        conn.execute("DELETE FROM rollups")
+    assert reopen(store).get_statistics()['total_tests'] == 0  # Marker set: no rebuild on open
@@ -0,0 +1,100 @@
+"""Tests for ULID test ids and group-committed concurrent writes"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Pool
+
+from app.data.ids import is_ulid, new_ulid, ulid_ms
+from app.data.storage import GroupCommit, create_data_manager
+
+
+def test_ulids_are_time_ordered_and_unique():
+    before = int(time.time() * 1000)
+    ids = [new_ulid() for _ in range(5000)]
+    assert ids == sorted(ids)
+    assert len(set(ids)) == len(ids)
+    assert all(is_ulid(test_id) for test_id in ids)
+    assert before <= ulid_ms(ids[0]) <= int(time.time() * 1000)
+    assert not is_ulid("20240601_101500")
+
+
+def test_ulids_from_many_threads_never_collide():
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        ids = [i for batch in pool.map(lambda _: [new_ulid() for _ in range(500)], range(8)) for i in batch]
+    assert len(set(ids)) == 4000
+
+
+def test_lone_writer_commits_without_waiting():
+    batches = []
+    committer = GroupCommit(batches.append, window_ms=1000)
+    started = time.perf_counter()
+    committer.submit([{"test_id": "a"}])
+    assert time.perf_counter() - started < 0.5
+    assert batches == [[{"test_id": "a"}]]
+
+
+def test_concurrent_writers_share_commits():
+    batches = []
+    release = threading.Event()
+
+    def slow_write(rows):
+        release.wait(5)  # Hold the first commit so the others queue up behind it
+        batches.append(list(rows))
+
+    committer = GroupCommit(slow_write, window_ms=20)
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        futures = [pool.submit(committer.submit, [{"test_id": str(i)}]) for i in range(16)]
+        time.sleep(0.1)
+        release.set()
+        for future in futures:
+            future.result()
+
+    assert sorted(row["test_id"] for batch in batches for row in batch) == sorted(str(i) for i in range(16))
+    assert committer.rows == 16
+    assert committer.commits == len(batches) < 16
+
+
+def test_failed_commit_reaches_every_writer_of_the_batch():
+    def failing_write(rows):
+        time.sleep(0.05)
+        raise OSError("disk full")
+
+    committer = GroupCommit(failing_write, window_ms=20)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(committer.submit, [{"test_id": str(i)}]) for i in range(4)]
+        errors = [future.exception() for future in futures]
+    assert all(isinstance(error, OSError) for error in errors)
+    assert committer.commits == 0
+
+    committer.write = lambda rows: None  # The next batch starts clean
+    committer.submit([{"test_id": "after"}])
+    assert committer.commits == 1
+
+
+def write_from_threads(options, threads=4, rows_per_thread=10):
+    """One writer process: threads saving rows through a shared store"""
+    store = create_data_manager("sqlite", **options)
+
+    def write(thread):
+        ids = []
+        for i in range(rows_per_thread):
+            test_id = store.new_test_id()
+            row, _ = store.build_record(test_id, f"writer {thread}/{i}", {}, {"return_code": 0})
+            store.insert_rows([row])
+            ids.append(test_id)
+        return ids
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        return [test_id for batch in pool.map(write, range(threads)) for test_id in batch]
+
+
+def test_no_row_lost_across_processes(tmp_path):
+    options = {"db_path": str(tmp_path / "history.db"), "logs_dir": str(tmp_path / "logs"),
+               "screenshots_dir": str(tmp_path / "shots")}
+    with Pool(3) as pool:
+        written = [i for ids in pool.map(write_from_threads, [options] * 3) for i in ids]
+
+    stored = create_data_manager("sqlite", **options).get_all_tests()['test_id'].tolist()
+    assert len(set(written)) == 120
+    assert sorted(stored) == sorted(written)
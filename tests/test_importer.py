@@ -0,0 +1,110 @@
+"""Tests for the legacy history importer"""
+
+import json
+from collections import Counter
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from app.data import importer
+from app.data.importer import import_history, normalize_row
+
+
+@pytest.fixture
+def legacy(tmp_path):
+    """Legacy test_logs/ with three JSON logs (one broken) and a CSV history"""
+    logs = tmp_path / "test_logs"
+    logs.mkdir()
+    for i in range(3):
+        test_id = f"20240601_10000{i}"
+        (logs / f"{test_id}.json").write_text(json.dumps({
+            "test_id": test_id, "timestamp": f"2024-06-01T10:00:0{i}", "instruction": f"open site {i}",
+            "parsed_steps": [{"action": "OPEN_BROWSER"}, {"action": "SEARCH", "query": "shoes"}],
+            "browser_state": {"browser_open": True, "current_url": "https://shop.example.com"},
+            "generated_code": "print('legacy')\n",
+            "execution": {"status": "passed", "passed": True, "duration_seconds": 2.5, "errors": ""},
+            "metadata": {"steps_count": 2, "login_checked": False, "screenshots_taken": 1}
+        }))
+    (logs / "20240601_110000.json").write_text("{not json")
+    pd.DataFrame({
+        "test_id": ["20240601_100000", "20240602_090000"],
+        "timestamp": ["", "2024-06-02 09:00:00"],
+        "instruction": ["ignored: the log comes first", "csv only"],
+        "status": ["", "FAILED"],
+        "passed": ["True", "False"],
+        "duration_seconds": ["", "7"],
+        "code_file_path": ["app\\generated_tests\\test_a.py", ""],
+    }).to_csv(tmp_path / "test_history.csv", index=False)
+    return [str(logs), str(tmp_path / "test_history.csv")]
+
+
+def test_normalize_legacy_values():
+    fixes = Counter()
+    row = normalize_row({"test_id": "20240315_101500", "timestamp": None, "passed": "yes",
+                         "duration_seconds": "", "status": " Passed ", "steps_count": "4.0",
+                         "code_file_path": "app\\generated_tests\\test_x.py"}, fixes)
+    assert row['timestamp'] == "2024-03-15 10:15:00"
+    assert row['passed'] is True
+    assert row['duration_seconds'] is None
+    assert row['status'] == "passed"
+    assert row['steps_count'] == 4
+    assert row['code_file_path'] == "app/generated_tests/test_x.py"
+    assert fixes == {"timestamp from test_id": 1, "text booleans": 1, "empty durations": 1, "windows paths": 1}
+
+    assert normalize_row({"test_id": 20240101.0, "timestamp": datetime(2024, 1, 1, 12)}, Counter())['test_id'] == \
+        "20240101"
+    assert normalize_row({"test_id": "  "}, fixes) is None
+
+
+def test_import_merges_sources_and_archives_logs(store, legacy):
+    report = import_history(store, legacy, workers=1)
+    assert report["inserted"] == report["planned"] == 4
+    assert len(report["errors"]) == 1 and "20240601_110000.json" in report["errors"][0]
+
+    df = store.get_all_tests().set_index('test_id')
+    first = df.loc["20240601_100000"]
+    assert first['instruction'] == "open site 0"  # Logs win over the table
+    assert first['code_file_path'] == "app/generated_tests/test_a.py"  # Filled in from the table
+    assert first['screenshots_taken'] == 1
+    csv_only = df.loc["20240602_090000"]
+    assert (csv_only['status'], bool(csv_only['passed']), csv_only['duration_seconds']) == ("failed", False, 7.0)
+    assert store.get_test_by_id("20240601_100002")["generated_code"] == "print('legacy')\n"
+    assert store.search_tests("steps:shoes")['test_id'].nunique() == 3
+
+
+def test_rerunning_the_import_changes_nothing(store, legacy):
+    import_history(store, legacy, workers=1)
+    before = store.get_all_tests()
+    report = import_history(store, legacy, workers=1)
+    assert report["planned"] == report["inserted"] == 0
+    assert report["skipped"] == 4
+    assert store.get_all_tests().equals(before)
+    assert store.archive.count() == 3
+
+
+def test_dry_run_plans_without_writing(store, legacy):
+    report = import_history(store, legacy, workers=1, dry_run=True)
+    assert report["planned"] == 4 and report["inserted"] == 0
+    assert store.get_all_tests().empty
+    assert store.archive.count() == 0
+
+
+def test_parallel_scan_matches_serial_scan(store, legacy, tmp_path, monkeypatch):
+    monkeypatch.setattr(importer, "LOGS_PER_TASK", 1)
+    from app.data.sqlite_store import SQLiteDataManager
+    serial = SQLiteDataManager(str(tmp_path / "serial.db"), logs_dir=str(tmp_path / "serial_logs"),
+                               screenshots_dir=str(tmp_path / "shots"))
+    assert import_history(store, legacy, workers=2)["sources"] == 5
+    import_history(serial, legacy, workers=1)
+    columns = ['test_id', 'timestamp', 'instruction', 'status', 'code_file_path']
+    assert store.get_all_tests()[columns].equals(serial.get_all_tests()[columns])
+
+
+def test_excel_history_is_imported(store, tmp_path):
+    pytest.importorskip("openpyxl")
+    path = str(tmp_path / "test_history.xlsx")
+    pd.DataFrame({"test_id": ["20240601_100000"], "timestamp": [datetime(2024, 6, 1, 10)],
+                  "status": ["passed"], "passed": [True]}).to_excel(path, index=False)
+    assert import_history(store, [path], workers=1)["inserted"] == 1
+    assert str(store.get_all_tests()['timestamp'].iloc[0]) == "2024-06-01 10:00:00"
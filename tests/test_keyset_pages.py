@@ -0,0 +1,81 @@
+"""Tests for keyset-paginated history pages (SQLite and the cached-frame fallback)"""
+
+import pytest
+
+from app.data.storage import StorageBackend
+from conftest import history_row
+
+
+@pytest.fixture
+def history(store):
+    """45 runs over three days, many sharing a timestamp, two domains and statuses"""
+    rows = []
+    for i in range(45):
+        rows.append(history_row(f"01{i:03d}", f"2024-06-0{1 + i // 15} 10:00:{(i % 15) // 4:02d}",
+                                status="failed" if i % 3 == 0 else "passed",
+                                url="https://github.com/x" if i % 5 == 0 else "https://shop.example.com/"))
+    store.insert_rows(rows)
+    return store
+
+
+def all_pages(page_of, limit, **filters):
+    """Walk every page; returns the test_ids of each"""
+    pages, cursor = [], None
+    while True:
+        page, cursor = page_of(limit=limit, cursor=cursor, **filters)
+        pages.append(page['test_id'].tolist())
+        if cursor is None:
+            return pages
+
+
+def fallback(store):
+    """The cached-frame implementation used by backends without SQL"""
+    return lambda **options: StorageBackend.get_tests_page(store, **options)
+
+
+@pytest.mark.parametrize("filters", [{}, {"status": "failed"}, {"domain": "github.com"},
+                                     {"since": "2024-06-02", "until": "2024-06-02"},
+                                     {"status": "passed", "since": "2024-06-01 10:00:02"}])
+def test_pages_cover_every_row_once_newest_first(history, filters):
+    pages = all_pages(history.get_tests_page, 4, **filters)
+    ids = [test_id for page in pages for test_id in page]
+    expected = history.get_all_tests()
+    if filters.get("status"):
+        expected = expected[expected['status'] == filters["status"]]
+    if filters.get("domain"):
+        expected = expected[expected['url_visited'].str.contains(filters["domain"])]
+    if filters.get("since"):
+        expected = expected[expected['timestamp'] >= filters["since"]]
+    if filters.get("until"):
+        expected = expected[expected['timestamp'] < "2024-06-03"]
+    assert ids == expected.sort_values(['timestamp', 'test_id'], ascending=False)['test_id'].tolist()
+    assert all(len(page) == 4 for page in pages[:-1]) and 0 < len(pages[-1]) <= 4
+
+
+@pytest.mark.parametrize("filters", [{}, {"status": "failed", "domain": "shop.example.com"},
+                                     {"until": "2024-06-01 10:00:01"}])
+def test_sqlite_and_fallback_pages_agree(history, filters):
+    assert all_pages(history.get_tests_page, 7, **filters) == all_pages(fallback(history), 7, **filters)
+
+
+def test_new_rows_do_not_shift_the_next_page(history):
+    first, cursor = history.get_tests_page(limit=5)
+    history.insert_rows([history_row("09NEW", "2024-06-09 12:00:00")])
+    second, _ = history.get_tests_page(limit=5, cursor=cursor)
+    assert set(first['test_id']).isdisjoint(second['test_id'])
+    assert second['timestamp'].max() <= first['timestamp'].min()
+    assert "09NEW" not in second['test_id'].tolist()
+
+
+def test_empty_history_has_one_empty_page(store):
+    page, cursor = store.get_tests_page()
+    assert page.empty and cursor is None
+    page, cursor = StorageBackend.get_tests_page(store)
+    assert page.empty and cursor is None
+
+
+def test_filtered_pages_use_an_index(history):
+    plan = " ".join(str(row) for row in history.connect().execute(
+        "EXPLAIN QUERY PLAN SELECT id FROM tests WHERE status = ? AND timestamp <= ? "
+        "ORDER BY timestamp DESC, id DESC LIMIT 21", ("failed", "2024-06-02")))
+    assert "idx_tests_status_timestamp" in plan
@@ -0,0 +1,100 @@
+"""Tests for the compressed, date-sharded log archive"""
+
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+from app.data import log_archive
+from app.data.ids import encode
+from app.data.log_archive import LogArchive, shard_of
+
+
+def ulid_at(when: datetime, random_part: int = 12345) -> str:
+    return encode((int(when.timestamp() * 1000) << 80) | random_part)
+
+
+@pytest.fixture
+def tz(monkeypatch):
+    """Switch the process time zone for one test"""
+    def switch(name):
+        monkeypatch.setenv("TZ", name)
+        time.tzset()
+    yield switch
+    monkeypatch.undo()
+    time.tzset()
+
+
+@pytest.fixture
+def archive(tmp_path):
+    return LogArchive(str(tmp_path / "logs"))
+
+
+def sample_log(test_id, code="print('hi')\n"):
+    return {"test_id": test_id, "instruction": "open shop", "parsed_steps": [{"action": "OPEN_BROWSER"}],
+            "generated_code": code, "execution": {"status": "passed", "output": "ok\n" * 100}}
+
+
+def test_round_trip_and_single_fields(archive, monkeypatch):
+    test_id = ulid_at(datetime(2024, 6, 1, 10, tzinfo=timezone.utc))
+    location = archive.write(test_id, sample_log(test_id))
+    assert location.endswith(os.path.join("2024", "06", "01.logs") + "#" + test_id)
+    assert archive.read(test_id) == sample_log(test_id)
+
+    decompressed = []
+    read_field = archive.read_field
+    monkeypatch.setattr(archive, "read_field", lambda *args: decompressed.append(args[2]) or read_field(*args))
+    assert archive.read(test_id, fields=["parsed_steps", "missing"]) == {"parsed_steps": [{"action": "OPEN_BROWSER"}]}
+    assert decompressed == ["parsed_steps"]
+
+
+def test_shards_follow_the_id():
+    assert shard_of(ulid_at(datetime(2024, 6, 1, 23, 30, tzinfo=timezone.utc))) == ("2024", "06", "01")
+    assert shard_of("20240315_101500") == ("2024", "03", "15")
+    assert shard_of("custom-id") == ("undated", "00", "00")
+
+
+def test_shards_are_utc_days_whatever_the_time_zone(tz):
+    test_id = ulid_at(datetime(2024, 6, 1, 23, 30, tzinfo=timezone.utc))
+    for name in ("UTC", "Pacific/Kiritimati", "America/Los_Angeles"):
+        tz(name)
+        assert shard_of(test_id) == ("2024", "06", "01")
+
+
+def test_logs_in_local_day_shards_are_still_found(archive, tz):
+    tz("Pacific/Kiritimati")  # UTC+14: 23:30 UTC on June 1 is June 2 here
+    test_id = ulid_at(datetime(2024, 6, 1, 23, 30, tzinfo=timezone.utc))
+    archive.write(test_id, sample_log(test_id))
+    utc_shard = os.path.join(archive.root, "2024", "06", "01")
+    local_shard = os.path.join(archive.root, "2024", "06", "02")
+    for extension in (".logs", ".idx"):  # Layout of archives written before shards were UTC
+        os.replace(utc_shard + extension, local_shard + extension)
+    assert LogArchive(archive.root).read(test_id, fields=["instruction"]) == {"instruction": "open shop"}
+
+
+def test_runs_already_archived_are_skipped(archive):
+    test_id = ulid_at(datetime(2024, 6, 1, 10, tzinfo=timezone.utc))
+    archive.write(test_id, sample_log(test_id))
+    archive.write(test_id, sample_log(test_id, code="changed\n"))
+    LogArchive(archive.root).write(test_id, sample_log(test_id))  # Another process
+    assert archive.count() == 1
+    assert archive.read(test_id)["generated_code"] == "print('hi')\n"
+
+
+def test_generated_code_is_stored_once(archive):
+    ids = [ulid_at(datetime(2024, 6, 1, 10, tzinfo=timezone.utc), i) for i in range(3)]
+    for test_id in ids:
+        archive.write(test_id, sample_log(test_id, code="x = 1\n" * 500))
+    code_files = [name for _, _, files in os.walk(os.path.join(archive.root, log_archive.CODE_DIR)) for name in files]
+    assert len(code_files) == 1
+    assert archive.read(ids[2], fields=["generated_code"])["generated_code"] == "x = 1\n" * 500
+
+
+def test_legacy_json_logs_are_readable(archive):
+    with open(os.path.join(archive.root, "20240101_120000.json"), "w", encoding="utf-8") as f:
+        json.dump({"test_id": "20240101_120000", "instruction": "old run"}, f)
+    assert archive.read("20240101_120000", fields=["instruction"]) == {"instruction": "old run"}
+    assert archive.read("20240101_130000") is None
+    assert archive.count() == 1
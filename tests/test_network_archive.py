@@ -0,0 +1,84 @@
+"""Tests for HAR archive keys, staleness policies and retention"""
+
+import os
+import time
+
+import pytest
+
+from app.executor.network_archive import (
+    NetworkArchiveError,
+    archive_path,
+    commit_recording,
+    purge_stale_archives,
+    recording_path,
+    resolve_network_mode,
+)
+
+
+@pytest.fixture
+def test_file(tmp_path):
+    path = tmp_path / "test_example.py"
+    path.write_text("STEPS = []\n")
+    return str(path)
+
+
+def _age(path: str, seconds: float):
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+def test_live_mode_needs_no_archive(test_file, tmp_path):
+    resolved = resolve_network_mode(test_file, "live", har_dir=str(tmp_path / "har"))
+    assert resolved["mode"] == "live"
+    assert resolved["har_path"] == ""
+
+
+def test_replay_of_missing_archive_records(test_file, tmp_path):
+    resolved = resolve_network_mode(test_file, "replay", har_dir=str(tmp_path))
+    assert resolved["mode"] == "record"
+    assert resolved["archive_status"] == "missing"
+
+
+@pytest.mark.parametrize("policy, mode", [("rerecord", "record"), ("serve", "replay")])
+def test_replay_of_stale_archive_follows_policy(test_file, tmp_path, policy, mode):
+    path = resolve_network_mode(test_file, "record", har_dir=str(tmp_path))["har_path"]
+    open(path, "wb").close()
+    _age(path, 3600)
+    resolved = resolve_network_mode(test_file, "replay", policy, max_age=60, har_dir=str(tmp_path))
+    assert resolved["mode"] == mode
+    assert resolved["archive_status"] == "stale"
+
+
+def test_fail_policy_refuses_stale_archive(test_file, tmp_path):
+    with pytest.raises(NetworkArchiveError):
+        resolve_network_mode(test_file, "replay", "fail", har_dir=str(tmp_path))
+
+
+def test_identical_code_shares_one_archive(test_file, tmp_path):
+    copy = tmp_path / "copy.py"
+    copy.write_text(open(test_file).read())
+    first = resolve_network_mode(test_file, "record", har_dir=str(tmp_path))
+    second = resolve_network_mode(str(copy), "record", har_dir=str(tmp_path))
+    assert first["har_path"] == second["har_path"]
+
+
+def test_only_passing_recordings_are_committed(tmp_path):
+    har_path = archive_path("abc", str(tmp_path))
+    open(recording_path(har_path), "wb").close()
+    assert commit_recording(har_path, succeeded=False) is None
+    assert not os.path.exists(har_path)
+    assert not os.path.exists(recording_path(har_path))
+
+    open(recording_path(har_path), "wb").close()
+    assert commit_recording(har_path, succeeded=True) == har_path
+    assert os.path.exists(har_path)
+
+
+def test_purge_removes_only_old_archives(tmp_path):
+    old, fresh = archive_path("old", str(tmp_path)), archive_path("fresh", str(tmp_path))
+    for path in (old, fresh):
+        open(path, "wb").close()
+    _age(old, 3600)
+    assert purge_stale_archives(60, str(tmp_path)) == 1
+    assert not os.path.exists(old)
+    assert os.path.exists(fresh)
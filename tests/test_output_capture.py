@@ -0,0 +1,80 @@
+"""Tests for bounded, streamed output capture"""
+
+import os
+import subprocess
+import sys
+
+from app.executor.output_capture import (
+    BoundedOutputBuffer,
+    MAX_LINE_BYTES,
+    OutputCapture,
+    purge_old_outputs,
+    read_output_file,
+)
+
+
+def _run(tmp_path, code: str, **options):
+    process = subprocess.Popen([sys.executable, "-c", code],
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    capture = OutputCapture("test_capture", output_dir=str(tmp_path), tee=False, **options)
+    capture.start(process)
+    process.wait()
+    return capture, capture.finish()
+
+
+def test_buffer_keeps_head_and_tail():
+    buffer = BoundedOutputBuffer(head_bytes=20, tail_bytes=20)
+    for i in range(100):
+        buffer.append(f"line {i:03d}\n")
+    text = buffer.text()
+    assert text.startswith("line 000\nline 001\n")
+    assert text.endswith("line 098\nline 099\n")
+    assert "truncated" in text
+    assert buffer.truncated
+
+
+def test_incremental_reads():
+    buffer = BoundedOutputBuffer()
+    buffer.append("a\n")
+    text, cursor = buffer.read_since(0)
+    buffer.append("b\n")
+    assert text == "a\n"
+    assert buffer.read_since(cursor) == ("b\n", 2)
+
+
+def test_long_line_is_cut_in_memory_but_kept_in_sidecar(tmp_path):
+    capture, result = _run(tmp_path, "print('x' * 100000); print('done')")
+    lines = result["output"].splitlines()
+    assert len(lines[0]) < MAX_LINE_BYTES
+    assert "line cut" in lines[0]
+    assert lines[1] == "done"
+    assert read_output_file(result["output_path"]) == "x" * 100000 + "\ndone\n"
+
+
+def test_stderr_and_byte_counts(tmp_path):
+    capture, result = _run(tmp_path, "import sys; print('é' * 10); sys.stderr.write('oops\\n')")
+    assert result["errors"] == "oops\n"
+    assert "[stderr] oops" in read_output_file(result["output_path"])
+    assert capture.sidecar_bytes == len(("é" * 10 + "\n[stderr] oops\n").encode("utf-8"))
+
+
+def test_sidecar_names_are_unique(tmp_path):
+    first = OutputCapture("same", output_dir=str(tmp_path), tee=False)
+    second = OutputCapture("same", output_dir=str(tmp_path), tee=False)
+    assert first.sidecar_path != second.sidecar_path
+    first.finish()
+    second.finish()
+
+
+def test_late_lines_after_finish_are_dropped(tmp_path):
+    capture = OutputCapture("late", output_dir=str(tmp_path), tee=False)
+    capture.finish()
+    capture._write_sidecar("stdout", "too late\n")  # A reader that outlived the join timeout
+    assert read_output_file(capture.sidecar_path) == ""
+
+
+def test_purge_old_outputs(tmp_path):
+    capture, result = _run(tmp_path, "print('hi')")
+    os.utime(result["output_path"], (0, 0))
+    assert purge_old_outputs(3600, str(tmp_path)) == 1
+    assert not os.path.exists(result["output_path"])
@@ -0,0 +1,92 @@
+"""Tests for the step plan optimizer rewrites"""
+
+import pytest
+
+from app.agents.plan_optimizer import optimize_steps
+
+
+def _rules(diff):
+    return [(entry["rule"], entry["index"]) for entry in diff]
+
+
+def test_back_to_back_waits_merge():
+    steps = [{"action": "WAIT", "duration": 1000}, {"action": "WAIT", "duration": "2s"}]
+    optimized, diff, _ = optimize_steps(steps)
+    assert optimized == [{"action": "WAIT", "duration": 3000}]
+    assert _rules(diff) == [("merge_waits", 1)]
+
+
+def test_unparseable_wait_is_left_alone():
+    steps = [{"action": "WAIT", "duration": "a while"}, {"action": "WAIT", "duration": 500}]
+    optimized, diff, _ = optimize_steps(steps)
+    assert optimized == steps
+    assert diff == []
+
+
+@pytest.mark.parametrize("duration, ms", [(250, 250), ("1500", 1500), ("500ms", 500), ("1.5 s", 1500)])
+def test_wait_durations_are_parsed(duration, ms):
+    steps = [{"action": "WAIT", "duration": duration}, {"action": "CLICK", "selector": "#go"}]
+    optimized, _, saved = optimize_steps(steps)
+    assert optimized == [{"action": "CLICK", "selector": "#go", "wait_budget": ms}]
+    assert saved == ms / 1000
+
+
+def test_noop_navigation_reports_original_index():
+    steps = [
+        {"action": "OPEN_BROWSER", "url": "example.com"},
+        {"action": "WAIT", "duration": 1000},
+        {"action": "WAIT", "duration": 1000},
+        {"action": "OPEN_BROWSER", "url": "https://example.com/"},
+    ]
+    optimized, diff, _ = optimize_steps(steps)
+    assert len(optimized) == 2
+    assert _rules(diff) == [("merge_waits", 2), ("drop_noop_navigation", 3)]
+
+
+def test_navigation_after_click_is_kept():
+    steps = [
+        {"action": "OPEN_BROWSER", "url": "example.com"},
+        {"action": "CLICK", "selector": "a.next"},
+        {"action": "OPEN_BROWSER", "url": "example.com"},
+    ]
+    assert optimize_steps(steps)[0] == steps
+
+
+@pytest.mark.parametrize("between", [
+    {"action": "TYPE", "selector": "#q", "value": "laptop"},
+    {"action": "CHECK_LOGIN", "expected": False},
+])
+def test_reopening_after_other_steps_is_a_reload(between):
+    steps = [
+        {"action": "OPEN_BROWSER", "url": "example.com"},
+        between,
+        {"action": "OPEN_BROWSER", "url": "example.com"},
+    ]
+    optimized, diff, _ = optimize_steps(steps)
+    assert optimized == steps and diff == []
+
+
+def test_navigation_after_screenshot_is_dropped():
+    steps = [
+        {"action": "OPEN_BROWSER", "url": "example.com"},
+        {"action": "SCREENSHOT", "filename": "home.png"},
+        {"action": "OPEN_BROWSER", "url": "example.com"},
+    ]
+    assert _rules(optimize_steps(steps)[1]) == [("drop_noop_navigation", 2)]
+
+
+def test_repeated_screenshot_dropped():
+    shot = {"action": "SCREENSHOT", "filename": "a.png"}
+    optimized, diff, _ = optimize_steps([shot, dict(shot)])
+    assert optimized == [shot]
+    assert _rules(diff) == [("drop_repeated_screenshot", 1)]
+
+
+def test_wait_before_navigation_is_kept():
+    steps = [{"action": "WAIT", "duration": 1000}, {"action": "OPEN_BROWSER", "url": "example.com"}]
+    assert optimize_steps(steps)[0] == steps
+
+
+def test_wait_before_assert_text_is_kept():
+    steps = [{"action": "WAIT", "duration": 1000}, {"action": "ASSERT_TEXT", "selector": "h1", "text": "Hi"}]
+    assert optimize_steps(steps)[0] == steps
@@ -0,0 +1,89 @@
+"""Tests for process-tree teardown and resource accounting (Linux)"""
+
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from app.executor import process_control
+
+pytestmark = pytest.mark.skipif(not os.path.exists("/proc/self/stat"), reason="needs /proc")
+
+# Parent that starts a long-running grandchild, prints its pid, then sleeps or exits
+SPAWN = ("import subprocess, sys, time; "
+         "child = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)']); "
+         "print(child.pid, flush=True); time.sleep({parent_seconds})")
+
+
+def _spawn(parent_seconds: float):
+    process = subprocess.Popen([sys.executable, "-c", SPAWN.format(parent_seconds=parent_seconds)],
+                               stdout=subprocess.PIPE, text=True, **process_control.popen_kwargs())
+    child = int(process.stdout.readline())
+    return process, child
+
+
+def _alive(pid: int) -> bool:
+    # Zombies count as gone: they are only waiting to be reaped by their parent
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except OSError:
+        return False
+
+
+def _wait_gone(pid: int, seconds: float = 5.0) -> bool:
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        if not _alive(pid):
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_start_time_identifies_a_process():
+    assert process_control.process_start_time(os.getpid()) is not None
+    assert process_control.process_start_time(2 ** 22 + 1) is None
+
+
+def test_kill_process_tree_reaches_grandchildren():
+    process, child = _spawn(60)
+    assert process_control.kill_process_tree(process, grace=1.0) >= 2
+    assert process.poll() is not None
+    assert _wait_gone(child)
+
+
+def test_wait_with_rusage_tracks_descendants():
+    process, child = _spawn(1.5)
+    tracked = {}
+    usage = process_control.wait_with_rusage(process, timeout=10, track=tracked)
+    assert usage["return_code"] == 0
+    assert "max_process_rss_mb" in usage
+    assert child in tracked
+
+    # The grandchild outlived its parent: reaped as a leftover
+    assert process_control.reap_leftovers(process.pid, tracked) >= 1
+    assert _wait_gone(child)
+
+
+def test_wait_with_rusage_times_out():
+    process, child = _spawn(60)
+    try:
+        with pytest.raises(subprocess.TimeoutExpired):
+            process_control.wait_with_rusage(process, timeout=0.2)
+    finally:
+        process_control.kill_process_tree(process, grace=1.0)
+
+
+def test_reused_pid_is_not_killed():
+    unrelated = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+    try:
+        start = process_control.process_start_time(unrelated.pid)
+        # Tracked with another start time: the pid now belongs to someone else
+        process_control.reap_leftovers(2 ** 22 + 1, {unrelated.pid: start - 1})
+        time.sleep(0.2)
+        assert unrelated.poll() is None
+    finally:
+        unrelated.kill()
+        unrelated.wait()
@@ -0,0 +1,96 @@
+"""Tests for the readiness conditions and their waiting loop"""
+
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.executor.readiness import (NetworkQuiet, Readiness, ReadinessTimeout, ResponseSeen,
+                                    UrlChanged)
+
+
+class FakePage:
+    """Page whose events are fired by the test; time advances by sleeping"""
+
+    def __init__(self, url="https://shop.example.com/"):
+        self.url = url
+        self.listeners = {}
+        self.ticks = []  # Callbacks run on every wait_for_timeout
+
+    def on(self, event, callback):
+        self.listeners.setdefault(event, []).append(callback)
+
+    def remove_listener(self, event, callback):
+        self.listeners[event].remove(callback)
+
+    def emit(self, event, payload):
+        for callback in list(self.listeners.get(event, [])):
+            callback(payload)
+
+    def wait_for_timeout(self, ms):
+        time.sleep(ms / 1000)
+        for tick in self.ticks:
+            tick()
+
+
+class FakeRequest:
+    """Hashable like Playwright's Request"""
+
+    def __init__(self, url, resource_type="xhr", navigation=False):
+        self.url = url
+        self.resource_type = resource_type
+        self.navigation = navigation
+        self.frame = SimpleNamespace(parent_frame=None)
+
+    def is_navigation_request(self):
+        return self.navigation
+
+
+def test_response_seen_after_the_action():
+    page = FakePage()
+    readiness = Readiness(page, ResponseSeen(r"/api/search"))
+    page.emit("response", SimpleNamespace(url="https://shop.example.com/api/search?q=x"))
+    report = readiness.wait(1000, poll_ms=5)
+    assert report[0]["condition"] == "response_seen"
+    assert report[0]["met"] is True
+    assert page.listeners["response"] == []
+
+
+def test_network_quiet_ignores_third_parties():
+    page = FakePage()
+    readiness = Readiness(page, NetworkQuiet(quiet_ms=20))
+    page.emit("request", FakeRequest("https://ads.tracker.net/pixel"))
+    page.emit("request", FakeRequest("wss://shop.example.com/live", resource_type="websocket"))
+    assert readiness.wait(1000, poll_ms=5)[0]["met"] is True
+
+
+def test_network_quiet_is_bounded_instead_of_failing():
+    page = FakePage()
+    readiness = Readiness(page, NetworkQuiet(quiet_ms=20, max_ms=60))
+    page.emit("request", FakeRequest("https://api.shop.example.com/poll"))  # Never finishes
+    started = time.perf_counter()
+    report = readiness.wait(2000, poll_ms=5)
+    assert time.perf_counter() - started < 1
+    assert report[0]["met"] is False
+    assert report[0]["required"] is False
+    assert report[0]["ms"] <= 60
+
+
+def test_url_changed_with_grace_accepts_staying_on_the_page():
+    page = FakePage()
+    assert Readiness(page, UrlChanged(grace_ms=20)).wait(1000, poll_ms=5)[0]["met"] is True
+
+    page = FakePage()
+    readiness = Readiness(page, UrlChanged(grace_ms=20))
+    page.emit("request", FakeRequest("https://shop.example.com/cart", navigation=True))
+    page.ticks.append(lambda: setattr(page, "url", "https://shop.example.com/cart"))
+    assert readiness.wait(1000, poll_ms=5)[0]["met"] is True
+
+
+def test_required_condition_times_out_with_a_report():
+    page = FakePage()
+    readiness = Readiness(page, ResponseSeen(r"/never"), NetworkQuiet(quiet_ms=10))
+    with pytest.raises(ReadinessTimeout, match="response_seen"):
+        readiness.wait(50, poll_ms=5)
+    assert [r["met"] for r in readiness.report] == [False, True]
+    assert all(not callbacks for callbacks in page.listeners.values())
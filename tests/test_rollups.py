@@ -0,0 +1,82 @@
+"""Tests for duration sketches and statistics rollups"""
+
+import random
+
+import pytest
+
+from app.data.rollups import bucket_of
+from app.data.sketches import DDSketch
+from conftest import history_row
+
+
+def test_sketch_quantiles_within_relative_error():
+    rng = random.Random(7)
+    values = [rng.lognormvariate(1.5, 0.8) for _ in range(20000)]
+    sketch = DDSketch(alpha=0.01)
+    for value in values:
+        sketch.add(value)
+    ordered = sorted(values)
+    for q in (0.5, 0.9, 0.99):
+        exact = ordered[int(q * (len(ordered) - 1))]
+        assert sketch.quantile(q) == pytest.approx(exact, rel=0.02)
+    assert sketch.count == len(values)
+    assert len(sketch.bins) < 1000
+
+
+def test_merged_sketches_match_one_sketch():
+    rng = random.Random(3)
+    values = [rng.uniform(0, 60) for _ in range(5000)] + [0.0] * 10
+    whole, merged = DDSketch(), DDSketch()
+    parts = [DDSketch() for _ in range(8)]
+    for i, value in enumerate(values):
+        whole.add(value)
+        parts[i % 8].add(value)
+    for part in parts:
+        merged = DDSketch.from_json(merged.merge(part).to_json())
+    assert merged.count == whole.count
+    assert merged.quantiles([0.5, 0.9, 0.99]) == whole.quantiles([0.5, 0.9, 0.99])
+    assert DDSketch().quantile(0.5) is None
+
+
+def test_bucket_labels():
+    assert bucket_of("2024-06-01 13:45:10", "hour") == "2024-06-01 13:00"
+    assert bucket_of("2024-06-01 13:45:10", "day") == "2024-06-01"
+    assert bucket_of("2024-06-01 13:45:10", "all") == ""
+
+
+def test_statistics_match_the_rows(store):
+    store.insert_rows([history_row("01A", "2024-06-01 10:00:00", duration=1.0),
+                       history_row("01B", "2024-06-01 11:30:00", status="failed", duration=3.0)])
+    store.insert_rows([history_row("01C", "2024-06-02 09:00:00", url="https://www.github.com", duration=5.0)])
+    stats = store.get_statistics()
+    assert stats['total_tests'] == 3
+    assert stats['passed'] == 2 and stats['failed'] == 1
+    assert stats['avg_duration'] == pytest.approx(3.0)
+    assert stats['p50_duration'] == pytest.approx(3.0, rel=0.02)
+
+
+def test_rollups_filter_and_break_down(store):
+    store.insert_rows([history_row("01A", "2024-06-01 10:00:00"),
+                       history_row("01B", "2024-06-01 11:30:00", status="failed"),
+                       history_row("01C", "2024-06-02 09:00:00", url="https://www.github.com")])
+    daily = store.get_rollups("day")
+    assert daily['bucket'].tolist() == ["2024-06-01", "2024-06-02"]
+    assert daily['count'].tolist() == [2, 1]
+    assert daily['pass_rate'].tolist() == [50.0, 100.0]
+
+    assert store.get_rollups("hour", since="2024-06-01 11:00:00", until="2024-06-01 23:00:00")['count'].tolist() == [1]
+    by_domain = store.get_rollups("all", by=("domain",))
+    assert dict(zip(by_domain['domain'], by_domain['count'])) == {"github.com": 1, "shop.example.com": 2}
+    assert store.get_rollups("day", domain="github.com", status="failed").empty
+
+
+def test_incremental_rollups_equal_a_rebuild(store):
+    rng = random.Random(11)
+    for batch in range(5):
+        store.insert_rows([history_row(f"{batch:02d}{i:03d}", f"2024-06-0{1 + i % 3} {i % 24:02d}:15:00",
+                                       status=rng.choice(["passed", "failed"]), duration=rng.uniform(1, 30))
+                           for i in range(40)])
+    incremental = store.get_rollups("hour", by=("bucket", "status"))
+    store.rebuild_rollups()
+    rebuilt = store.get_rollups("hour", by=("bucket", "status"))
+    assert incremental.round(9).equals(rebuilt.round(9))
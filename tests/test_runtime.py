@@ -0,0 +1,181 @@
+"""Tests for generated tests and the shared runtime they import"""
+
+import ast
+import json
+import os
+import sys
+import time
+
+import pytest
+
+import app.executor.python_executor_enhanced as executor
+
+
+STEPS = [{"action": "OPEN_BROWSER", "url": "shop.example.com"}, {"action": "CLICK", "selector": "#go"}]
+
+
+def test_generated_test_holds_only_its_steps():
+    code = executor.generate_adaptive_python_test(STEPS)
+    tree = ast.parse(code)
+    constants = {node.targets[0].id: ast.literal_eval(node.value)
+                 for node in tree.body if isinstance(node, ast.Assign)}
+    # No learned timeouts: the file (archive and artifact key) changes only with the steps
+    assert constants == {"STEPS": STEPS}
+    assert not any(isinstance(node, ast.FunctionDef) for node in tree.body)
+    assert "from app.executor.runtime import run_test" in code
+
+
+def test_generated_tests_in_the_package_run_as_modules():
+    path = os.path.join(executor.PROJECT_ROOT, "app", "executor", "runtime.py")
+    assert executor.test_command(path) == [sys.executable, "-m", "app.executor.runtime"]
+
+
+def test_files_outside_the_package_run_as_scripts(tmp_path):
+    path = str(tmp_path / "t.py")
+    assert executor.test_command(path) == [sys.executable, path]
+
+
+def test_timed_out_wait_is_recorded_at_its_timeout(tmp_path, monkeypatch):
+    runtime = pytest.importorskip("app.executor.runtime")
+    telemetry = tmp_path / "telemetry.jsonl"
+    monkeypatch.setattr(runtime, "TELEMETRY_PATH", str(telemetry))
+    monkeypatch.setattr(runtime, "PLAN_DOMAIN", "example.com")
+
+    class Page:
+        url = "https://redirected.example.net/"
+
+    with pytest.raises(runtime.PWTimeoutError):
+        with runtime.timed_wait(Page(), "CLICK", "visible", 7000, "#go"):
+            raise runtime.PWTimeoutError("Timeout 7000ms exceeded")
+    with runtime.timed_wait(Page(), "CLICK", "visible", 7000, "#go"):
+        pass
+
+    timed_out, fast = [json.loads(line) for line in telemetry.read_text().splitlines()]
+    assert timed_out["seconds"] == 7.0 and timed_out["timed_out"]
+    assert timed_out["domain"] == "example.com"
+    assert fast["seconds"] < 1 and not fast["timed_out"]
+
+
+class FakeLocator:
+    def __init__(self, page, selector):
+        self.page = page
+        self.selector = selector
+        self.first = self
+
+    def is_visible(self):
+        return True
+
+    def bounding_box(self, timeout=None):
+        return {"x": 10, "y": 10, "width": 80, "height": 20}
+
+    def click(self, timeout=None):
+        if self.selector != "#go":
+            raise Exception("no such element")  # Cookie banners
+        self.page.clicks.append(self.selector)
+
+
+class FakePage:
+    """Page on which every navigation and click settles at once"""
+
+    url = "about:blank"
+    context = None
+
+    def __init__(self):
+        self.clicks = []
+        self.listeners = {}
+
+    def on(self, event, callback):
+        self.listeners.setdefault(event, []).append(callback)
+
+    def remove_listener(self, event, callback):
+        self.listeners[event].remove(callback)
+
+    def evaluate(self, script, *args):
+        return True if args else None  # DOM quiet; no navigation timing
+
+    def goto(self, url, **options):
+        self.url = url
+
+    def locator(self, selector):
+        return FakeLocator(self, selector)
+
+    def wait_for_timeout(self, ms):
+        time.sleep(ms / 1000)
+
+
+def test_steps_wait_until_the_page_is_ready(tmp_path, monkeypatch):
+    runtime = pytest.importorskip("app.executor.runtime")
+    telemetry = tmp_path / "telemetry.jsonl"
+    monkeypatch.setattr(runtime, "TELEMETRY_PATH", str(telemetry))
+    page = FakePage()
+    timeouts = {"navigation": 5000, "ready": 5000, "visible": 5000}
+
+    runtime.run_step(page, 1, {"action": "OPEN_BROWSER", "url": "shop.example.com"}, timeouts)
+    runtime.run_step(page, 2, {"action": "CLICK", "selector": "#go"}, timeouts)
+
+    events = [json.loads(line) for line in telemetry.read_text().splitlines()]
+    assert [e["status"] for e in events if e["event"] == "step_end"] == ["passed", "passed"]
+    readiness = [e for e in events if e["event"] == "readiness"]
+    assert [e["action"] for e in readiness] == ["OPEN_BROWSER", "CLICK"]
+    assert all(condition["met"] for e in readiness for condition in e["conditions"])
+    assert page.url == "https://shop.example.com" and page.clicks == ["#go"]
+    assert all(not callbacks for callbacks in page.listeners.values())
+
+
+def test_timeouts_are_learned_at_run_time(tmp_path, monkeypatch):
+    runtime = pytest.importorskip("app.executor.runtime")
+    from app.executor.timeout_model import TimeoutModel
+
+    model = TimeoutModel(str(tmp_path / "timing_history.json"))
+    for _ in range(10):
+        model.record("shop.example.com", "CLICK", "visible", 4.0, "firefox")
+    model.save()
+    monkeypatch.setattr(runtime, "TIMEOUT_MODEL", TimeoutModel(model.history_path))
+    monkeypatch.setattr(runtime, "BROWSER_NAME", "firefox")
+
+    assert runtime.learned_timeouts(STEPS)[1]["visible"] == 12000
+    # Suite segments continue on their ancestors' domain
+    assert runtime.learned_timeouts(STEPS[1:], "shop.example.com") == [{"visible": 12000, "ready": 10000}]
+    assert runtime.learned_timeouts(STEPS[1:])[0]["visible"] == 10000
+
+
+class FakeContext:
+    def __init__(self):
+        self.pages = []
+
+    def new_page(self):
+        page = FakePage()
+        page.context = self
+        self.pages.append(page)
+        return page
+
+    def storage_state(self):
+        return {"cookies": [], "origins": []}
+
+    def close(self):
+        pass
+
+
+class FakeBrowser:
+    def new_context(self, **options):
+        return FakeContext()
+
+
+def test_fork_navigation_is_timed_apart_from_the_segment(tmp_path, monkeypatch):
+    runtime = pytest.importorskip("app.executor.runtime")
+    from app.executor.timeout_model import TimeoutModel
+    monkeypatch.setattr(runtime, "TELEMETRY_PATH", str(tmp_path / "telemetry.jsonl"))
+    monkeypatch.setattr(runtime, "TIMEOUT_MODEL", TimeoutModel(str(tmp_path / "timing.json")))
+    click = {"action": "CLICK", "selector": "#go"}
+    child = {"id": 2, "start": 3, "domain": "shop.example.com", "steps": [click],
+             "tests": [0], "subtree": [0], "children": []}
+    node = {"id": 1, "start": 1, "domain": "", "steps": STEPS,
+            "tests": [], "subtree": [0], "children": [child]}
+    results, segment_seconds, fork_seconds, failures = {}, {}, {}, []
+
+    runtime.run_branch(FakeBrowser(), node, None, "", results, segment_seconds, fork_seconds, failures)
+
+    assert not failures and results == {0: {"status": "passed", "errors": ""}}
+    assert set(segment_seconds) == {1, 2}
+    # Only the child re-opened its parent's URL
+    assert set(fork_seconds) == {2}
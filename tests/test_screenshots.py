@@ -0,0 +1,82 @@
+"""Tests for the background screenshot pipeline and its retention"""
+
+import io
+import os
+import time
+
+import pytest
+
+from app.executor import screenshots
+from app.executor.screenshots import OBJECTS_DIR, ScreenshotPipeline, enforce_retention
+
+Image = pytest.importorskip("PIL.Image")
+
+
+class FakePage:
+    url = "https://example.com/"
+
+    def __init__(self, color):
+        out = io.BytesIO()
+        Image.new("RGB", (64, 48), color).save(out, format="PNG")
+        self.png = out.getvalue()
+
+    def screenshot(self, **options):
+        return self.png
+
+
+def _pipeline(tmp_path, run_id, image_format="png"):
+    return ScreenshotPipeline(run_id, image_format=image_format, screenshots_dir=str(tmp_path))
+
+
+def _age(path, seconds):
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+def test_identical_frames_are_stored_once(tmp_path):
+    pipeline = _pipeline(tmp_path, "run1")
+    first = pipeline.capture(FakePage("red"), 1, "home.png")
+    second = pipeline.capture(FakePage("red"), 2, "again.png")
+    pipeline.close()
+
+    assert os.path.exists(first) and os.path.exists(second)
+    assert os.path.basename(first) == "step01_home.png"
+    assert len(os.listdir(tmp_path / OBJECTS_DIR)) == 1
+    cost = pipeline.cost()
+    assert cost["count"] == 2
+    assert cost["deduped"] == 1
+
+
+def test_lossy_formats_are_encoded(tmp_path):
+    pipeline = _pipeline(tmp_path, "run1", image_format="jpeg")
+    path = pipeline.capture(FakePage("blue"), 1, "shot")
+    pipeline.close()
+    assert path.endswith(".jpg")
+    assert Image.open(path).format == "JPEG"
+
+
+def test_retention_drops_oldest_runs(tmp_path):
+    for i, color in enumerate(["red", "green", "blue"]):
+        pipeline = _pipeline(tmp_path, f"run{i}")
+        pipeline.capture(FakePage(color), 1, "shot")
+        pipeline.close()
+        _age(tmp_path / f"run{i}", 300 - i)
+
+    stats = enforce_retention(max_runs=2, screenshots_dir=str(tmp_path))
+    assert stats["runs_removed"] == 1
+    assert not os.path.exists(tmp_path / "run0")
+    assert os.path.exists(tmp_path / "run2")
+
+
+def test_recent_unlinked_frames_survive_retention(tmp_path):
+    objects = tmp_path / OBJECTS_DIR
+    objects.mkdir()
+    recent, old = objects / "recent.png", objects / "old.png"
+    recent.write_bytes(b"x")
+    old.write_bytes(b"x")
+    _age(old, screenshots.OBJECT_GRACE_SECONDS + 60)
+
+    # recent may be between its os.replace and the link into its run
+    stats = enforce_retention(screenshots_dir=str(tmp_path))
+    assert stats["objects_removed"] == 1
+    assert recent.exists() and not old.exists()
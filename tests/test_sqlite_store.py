@@ -0,0 +1,58 @@
+"""Tests for the SQLite result store"""
+
+import sqlite3
+
+from app.data.sqlite_store import SQLiteDataManager
+from app.data.storage import create_data_manager
+from conftest import history_row
+
+
+def test_save_and_read_back(store):
+    test_id = store.save_test_result(
+        "open shop.example.com and search shoes",
+        {"parsed_steps": [{"action": "OPEN_BROWSER"}, {"action": "CHECK_LOGIN"}],
+         "browser_open": True, "current_url": "https://shop.example.com/search"},
+        {"return_code": 0, "status": "passed", "duration_seconds": 4.5, "output": "ok"})
+
+    history = store.get_all_tests()
+    assert history['test_id'].tolist() == [test_id]
+    row = history.iloc[0]
+    assert row['passed'] and row['login_checked']
+    assert row['steps_count'] == 2
+    assert row['duration_seconds'] == 4.5
+    assert store.get_test_by_id(test_id)['execution']['output'] == "ok"
+
+
+def test_wal_mode_and_indexes(store):
+    conn = store.connect()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    indexes = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {"idx_tests_timestamp", "idx_tests_status", "idx_tests_url"} <= indexes
+
+
+def test_known_test_ids_are_not_inserted_twice(store):
+    store.insert_rows([history_row("01A", "2024-06-01 10:00:00")])
+    store.insert_rows([history_row("01A", "2024-06-01 10:00:00"), history_row("01B", "2024-06-01 11:00:00")])
+    assert sorted(store.get_all_tests()['test_id']) == ["01A", "01B"]
+    assert store.get_statistics()['total_tests'] == 2
+
+
+def test_history_survives_reopening(store):
+    store.insert_rows([history_row("01A", "2024-06-01 10:00:00", status="failed")])
+    reopened = SQLiteDataManager(store.db_path, logs_dir=store.logs_dir, screenshots_dir=store.screenshots_dir)
+    assert reopened.get_recent_tests(5)['status'].tolist() == ["failed"]
+
+
+def test_clear_history_starts_a_new_generation(store):
+    store.insert_rows([history_row("01A", "2024-06-01 10:00:00")])
+    generation = store.version()[0]
+    store.clear_history()
+    assert store.get_all_tests().empty
+    assert store.version() == (generation + 1, 0)
+
+
+def test_default_backend_is_sqlite(tmp_path):
+    store = create_data_manager("sqlite", db_path=str(tmp_path / "h.db"), logs_dir=str(tmp_path / "logs"),
+                                screenshots_dir=str(tmp_path / "shots"))
+    assert isinstance(store, SQLiteDataManager)
+    assert sqlite3.connect(str(tmp_path / "h.db")).execute("SELECT COUNT(*) FROM tests").fetchone() == (0,)
@@ -0,0 +1,87 @@
+"""Tests for shared-prefix suite planning and serialization"""
+
+from app.executor.suite_planner import (
+    BROWSER_LAUNCH_SECONDS,
+    FORK_NAVIGATION_SECONDS,
+    build_prefix_tree,
+    generate_suite_python_test,
+    plan_suite,
+    plan_suite_deadline,
+    serialize_tree,
+)
+from app.executor.timeout_model import DEFAULT_TIMEOUTS_MS, TimeoutModel
+
+
+OPEN = {"action": "OPEN_BROWSER", "url": "shop.example.com"}
+LOGIN = {"action": "CLICK", "selector": "#login"}
+SEARCH = {"action": "SEARCH", "query": "laptop"}
+CART = {"action": "CLICK", "selector": "#cart"}
+SUITE = [[OPEN, LOGIN, SEARCH], [OPEN, LOGIN, CART]]
+
+
+def test_shared_prefix_runs_once():
+    tree = build_prefix_tree(SUITE)
+    assert len(tree.children) == 1
+    shared = tree.children[0]
+    assert shared.steps == [OPEN, LOGIN]
+    assert [child.steps for child in shared.children] == [[SEARCH], [CART]]
+    assert sorted(shared.subtree_tests()) == [0, 1]
+
+
+def test_plan_counts_avoided_steps():
+    plan = plan_suite(SUITE)
+    assert plan["total_steps"] == 6
+    assert plan["executed_steps"] == 4
+    assert plan["avoided_steps"] == 2
+    assert plan["forks"] == 2  # Contexts forked from the shared prefix
+
+
+def test_measured_segments_replace_estimates():
+    estimated = plan_suite(SUITE)["avoided_seconds"]
+    shared_id = plan_suite(SUITE)["tree"].children[0].node_id
+    measured = plan_suite(SUITE, {shared_id: 100.0})["avoided_seconds"]
+    assert measured > estimated
+
+
+def test_serialized_steps_keep_their_test_numbers():
+    tree = serialize_tree(plan_suite(SUITE)["tree"])
+    shared = tree["children"][0]
+    assert shared["start"] == 1
+    assert [child["start"] for child in shared["children"]] == [3, 3]
+
+
+def test_segments_carry_their_ancestors_domain_not_timeouts():
+    shared = serialize_tree(plan_suite(SUITE)["tree"])["children"][0]
+    assert shared["domain"] == ""
+    cart = shared["children"][1]
+    # Domain comes from the OPEN_BROWSER step of the ancestor segment; the
+    # runtime looks learned timeouts up by it when the suite runs
+    assert cart["domain"] == "shop.example.com"
+    assert "timeouts" not in cart and "goto_timeout" not in cart
+
+
+def test_generated_suite_calls_runtime():
+    code = generate_suite_python_test(plan_suite(SUITE))
+    compile(code, "suite.py", "exec")
+    assert "run_suite(TREE, 2)" in code
+
+
+def test_fork_navigation_is_subtracted_from_the_savings():
+    shared_id = plan_suite(SUITE)["tree"].children[0].node_id
+    search_id, cart_id = [child.node_id for child in plan_suite(SUITE)["tree"].children[0].children]
+    # Sharing the prefix saved 10s; each branch re-opened its URL in 1.5s
+    plan = plan_suite(SUITE, {shared_id: 10.0}, {search_id: 1.5, cart_id: 1.5})
+    assert plan["avoided_seconds"] == 10.0 - 3.0 + BROWSER_LAUNCH_SECONDS
+    # Unmeasured forks are estimated
+    estimated = plan_suite(SUITE, {shared_id: 10.0})["avoided_seconds"]
+    assert estimated == 10.0 - 2 * FORK_NAVIGATION_SECONDS + BROWSER_LAUNCH_SECONDS
+
+
+def test_suite_deadline_covers_steps_and_fork_navigation(tmp_path):
+    model = TimeoutModel(str(tmp_path / "timing.json"))
+    plan = plan_suite(SUITE)
+    steps = [OPEN, LOGIN, SEARCH, CART]
+    unforked = model.plan_deadline(steps, model.plan_timeouts(steps))
+    # Two forks: a navigation timeout plus the fixed step cost each
+    fork = DEFAULT_TIMEOUTS_MS["navigation"] / 1000 + 2.0
+    assert plan_suite_deadline(plan, model) == min(600, unforked + 2 * fork)
@@ -0,0 +1,56 @@
+"""Tests for reading and summarizing test telemetry"""
+
+import json
+
+from app.executor.telemetry import read_events, summarize, wait_samples
+
+
+def _write(path, events):
+    with open(path, "w", encoding="utf-8") as f:
+        for event in events:
+            f.write(json.dumps(event) + "\n")
+
+
+def test_partial_last_line_is_skipped(tmp_path):
+    path = tmp_path / "telemetry.jsonl"
+    _write(path, [{"event": "test_start", "t": 1.0}])
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"event": "step_st')
+    assert read_events(str(path)) == [{"event": "test_start", "t": 1.0}]
+
+
+def test_missing_channel_has_no_events():
+    assert read_events("") == []
+    assert read_events("/nonexistent/telemetry.jsonl") == []
+
+
+def test_steps_are_summarized():
+    events = [
+        {"event": "test_start", "t": 10.0},
+        {"event": "step_start", "t": 10.0, "step": 1, "action": "OPEN_BROWSER"},
+        {"event": "wait", "t": 11.0, "step": 1, "action": "OPEN_BROWSER", "kind": "navigation", "seconds": 0.8},
+        {"event": "wait", "t": 11.5, "step": 1, "action": "OPEN_BROWSER", "kind": "ready", "seconds": 0.4},
+        {"event": "step_end", "t": 12.0, "step": 1, "action": "OPEN_BROWSER", "status": "passed", "duration": 2.0},
+        {"event": "step_start", "t": 12.0, "step": 2, "action": "CLICK"},
+        {"event": "step_end", "t": 13.0, "step": 2, "action": "CLICK", "status": "failed", "duration": 1.0,
+         "failure_class": "selector_not_found", "error": "Could not find"},
+        {"event": "test_end", "t": 13.0, "status": "failed", "duration": 3.0, "failure_class": ""},
+    ]
+    summary = summarize(events)
+    assert summary["duration_seconds"] == 3.0
+    assert [step["status"] for step in summary["steps"]] == ["passed", "failed"]
+    assert summary["steps"][0]["wait_seconds"] == 1.2
+    # test_end without a class: the failed step's class
+    assert summary["failure_class"] == "selector_not_found"
+    assert len(wait_samples(events)) == 2
+
+
+def test_killed_run_duration_from_observed_span():
+    events = [
+        {"event": "test_start", "t": 10.0},
+        {"event": "step_start", "t": 10.5, "step": 1, "action": "CLICK"},
+        {"event": "wait", "t": 14.25, "step": 1, "action": "CLICK", "kind": "visible", "seconds": 3.0},
+    ]
+    summary = summarize(events)
+    assert summary["duration_seconds"] == 4.25
+    assert summary["steps"][0]["status"] == "running"
@@ -0,0 +1,70 @@
+"""Tests for learned per-domain, per-engine timeouts"""
+
+import pytest
+
+from app.executor.timeout_model import DEFAULT_TIMEOUTS_MS, MIN_SAMPLES, TimeoutModel, domain_of
+
+
+PLAN = [{"action": "OPEN_BROWSER", "url": "https://www.shop.example.com"},
+        {"action": "CLICK", "selector": "#buy"}]
+
+
+@pytest.fixture
+def model(tmp_path):
+    return TimeoutModel(str(tmp_path / "timing_history.json"))
+
+
+def _samples(domain: str, seconds: float, engine: str = "chromium", count: int = MIN_SAMPLES):
+    return [{"domain": domain, "engine": engine, "url": "https://elsewhere.example.net/redirected",
+             "action": "CLICK", "kind": "visible", "seconds": seconds}] * count
+
+
+def test_defaults_until_enough_samples(model):
+    model.record_run(_samples("shop.example.com", 4.0, count=MIN_SAMPLES - 1))
+    assert model.plan_timeouts(PLAN)[1]["visible"] == DEFAULT_TIMEOUTS_MS["visible"]
+
+
+def test_samples_keyed_by_planned_domain_not_page_url(model):
+    model.record_run(_samples(domain_of(PLAN[0]["url"]), 4.0))
+    assert model.plan_timeouts(PLAN)[1]["visible"] == 12000
+
+
+def test_learned_timeouts_are_clamped(model):
+    model.record_run(_samples("shop.example.com", 0.01))
+    assert model.plan_timeouts(PLAN)[1]["visible"] == 2000
+
+
+def test_engines_learn_separately(model):
+    model.record_run(_samples("shop.example.com", 1.0))
+    model.record_run(_samples("shop.example.com", 5.0, engine="firefox"))
+    assert model.plan_timeouts(PLAN)[1]["visible"] == 3000
+    assert model.plan_timeouts(PLAN, ["firefox"])[1]["visible"] == 15000
+    # One generated test serves every engine of the matrix: largest wins
+    assert model.plan_timeouts(PLAN, ["chromium", "firefox"])[1]["visible"] == 15000
+
+
+def test_history_is_saved(model, tmp_path):
+    model.record_run(_samples("shop.example.com", 4.0))
+    reloaded = TimeoutModel(model.history_path)
+    assert reloaded.plan_timeouts(PLAN)[1]["visible"] == 12000
+
+
+def test_samples_without_domain_fall_back_to_url(model):
+    model.record_run([{"url": "https://www.shop.example.com/x", "action": "CLICK",
+                       "kind": "visible", "seconds": 4.0}] * MIN_SAMPLES)
+    assert model.plan_timeouts(PLAN)[1]["visible"] == 12000
+
+
+def test_deadline_is_bounded(model):
+    timeouts = model.plan_timeouts(PLAN)
+    assert 30 <= model.plan_deadline(PLAN, timeouts) <= 600
+    many = PLAN * 100
+    assert model.plan_deadline(many, model.plan_timeouts(many)) == 600
+
+
+def test_plans_can_start_on_a_known_domain(model):
+    for _ in range(MIN_SAMPLES):
+        model.record("shop.example.com", "CLICK", "visible", 4.0)
+    click = [{"action": "CLICK", "selector": "#cart"}]
+    assert model.plan_timeouts(click, domain="shop.example.com")[0]["visible"] == 12000
+    assert model.plan_timeouts(click)[0]["visible"] == DEFAULT_TIMEOUTS_MS["visible"]
@@ -0,0 +1,72 @@
+"""Tests for per-step trace chunks kept only for failed or flaky steps"""
+
+import os
+
+from app.executor.tracing import FailureTracer, summarize_traces
+
+
+class FakeTracing:
+    def __init__(self):
+        self.calls = []
+
+    def start(self, **options):
+        self.calls.append("start")
+
+    def start_chunk(self, **options):
+        self.calls.append("start_chunk")
+
+    def stop_chunk(self, path=None):
+        self.calls.append("stop_chunk")
+        if path:
+            with open(path, "wb") as f:
+                f.write(b"trace")
+
+    def stop(self):
+        self.calls.append("stop")
+
+
+class FakeContext:
+    def __init__(self):
+        self.tracing = FakeTracing()
+
+
+class FakePage:
+    def __init__(self, context):
+        self.context = context
+
+
+def _run_step(tracer, page, step, **outcome):
+    tracer.begin_step(page, step)
+    return tracer.end_step(page, step, "CLICK", **outcome)
+
+
+def test_disabled_tracer_touches_nothing(tmp_path):
+    context = FakeContext()
+    tracer = FailureTracer("run", mode="off", traces_dir=str(tmp_path))
+    tracer.attach(context)
+    assert _run_step(tracer, FakePage(context), 1, failed=True) == ""
+    assert context.tracing.calls == []
+
+
+def test_only_failed_and_flaky_chunks_are_kept(tmp_path):
+    context = FakeContext()
+    events = []
+    tracer = FailureTracer("run", mode="failure", max_flaky=1, traces_dir=str(tmp_path),
+                           on_event=events.append)
+    tracer.attach(context)
+    page = FakePage(context)
+
+    assert _run_step(tracer, page, 1) == ""
+    flaky = _run_step(tracer, page, 2, flaky=True)
+    assert _run_step(tracer, page, 3, flaky=True) == ""  # Over max_flaky
+    failed = _run_step(tracer, page, 4, failed=True)
+    tracer.detach(context)
+
+    assert os.path.basename(flaky) == "step02_click_flaky.zip"
+    assert os.path.basename(failed) == "step04_click_failed.zip"
+    assert [record["step"] for record in tracer.kept] == [2, 4]
+    summary = summarize_traces(events)
+    assert summary["chunks"] == 4
+    assert summary["kept"] == 2
+    assert summary["bytes"] == 10
+    assert context.tracing.calls[-1] == "stop"
@@ -0,0 +1,93 @@
+"""Tests for screenshot comparison against baselines"""
+
+import os
+import threading
+
+import numpy as np
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+
+from app.executor.visual_regression import check_screenshots, compare, load_index  # noqa: E402
+
+
+def _image(path, pixels: np.ndarray) -> str:
+    Image.fromarray(pixels.astype(np.uint8)).save(path)
+    return str(path)
+
+
+@pytest.fixture
+def page_pixels():
+    rng = np.random.default_rng(1)
+    return rng.integers(0, 255, (120, 160, 3))
+
+
+def test_identical_files_pass(tmp_path, page_pixels):
+    path = _image(tmp_path / "a.png", page_pixels)
+    assert compare(path, path)["reason"] == "identical"
+
+
+def test_changes_within_tolerance_pass(tmp_path, page_pixels):
+    baseline = _image(tmp_path / "base.png", page_pixels)
+    current = _image(tmp_path / "cur.png", np.clip(page_pixels + 5, 0, 255))
+    result = compare(current, baseline)
+    assert result["passed"]
+    assert result["changed_pixels"] == 0
+
+
+def test_changed_region_fails_with_heatmap(tmp_path, page_pixels):
+    baseline = _image(tmp_path / "base.png", page_pixels)
+    changed = page_pixels.copy()
+    changed[10:20, 10:20] = 255 - changed[10:20, 10:20]
+    current = _image(tmp_path / "cur.png", changed)
+    heatmap = str(tmp_path / "diff" / "heat.png")
+
+    result = compare(current, baseline, heatmap_path=heatmap)
+    assert not result["passed"]
+    assert result["reason"] == "pixels_changed"
+    assert 0 < result["changed_pixels"] <= 100
+    assert os.path.exists(heatmap)
+
+    masked = compare(current, baseline, masks=[{"x": 5, "y": 5, "width": 20, "height": 20}])
+    assert masked["passed"]
+
+
+def test_size_change_fails(tmp_path, page_pixels):
+    baseline = _image(tmp_path / "base.png", page_pixels)
+    current = _image(tmp_path / "cur.png", page_pixels[:100])
+    assert compare(current, baseline)["reason"] == "size_changed"
+
+
+def test_first_capture_becomes_baseline(tmp_path, page_pixels):
+    shot = {"kind": "step", "path": _image(tmp_path / "shot.png", page_pixels),
+            "url": "https://example.com/", "label": "home.png"}
+    baselines = str(tmp_path / "baselines")
+    first = check_screenshots([shot], baseline_dir=baselines, diff_dir=str(tmp_path / "diffs"))
+    second = check_screenshots([shot], baseline_dir=baselines, diff_dir=str(tmp_path / "diffs"))
+    assert first[0]["reason"] == "new_baseline"
+    assert second[0]["passed"] and second[0]["reason"] == "identical"
+
+
+def test_concurrent_engines_keep_every_baseline(tmp_path, page_pixels):
+    # A browser matrix checks each engine's screenshots on its own thread
+    shot = {"kind": "step", "path": _image(tmp_path / "shot.png", page_pixels),
+            "url": "https://example.com/", "label": "home.png"}
+    baselines = str(tmp_path / "baselines")
+    engines = [f"engine{i}" for i in range(8)]
+    errors = []
+
+    def check(engine):
+        try:
+            check_screenshots([shot], baseline_dir=baselines,
+                              diff_dir=str(tmp_path / "diffs"), variant=engine)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=check, args=(engine,)) for engine in engines]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert sorted(load_index(baselines)) == sorted(f"example.com__home__{e}" for e in engines)
@@ -0,0 +1,144 @@
+"""Tests for the write-behind persistence queue and its crash recovery"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app.data import write_queue
+from app.data.write_queue import PersistenceQueue
+from conftest import history_row
+
+
+@pytest.fixture
+def journal_dir(tmp_path):
+    return str(tmp_path / "journal")
+
+
+def orphan_journal(journal_dir, records, torn=False):
+    """Journal of a process that died (nobody holds its lock)"""
+    os.makedirs(journal_dir, exist_ok=True)
+    path = os.path.join(journal_dir, "journal_99999_crashed.jsonl")
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+        if torn:
+            f.write('{"test_id": "01TORN", "row": {')
+    return path
+
+
+def entry(test_id):
+    return {"test_id": test_id, "row": history_row(test_id, "2024-06-01 10:00:00"), "log": {"test_id": test_id}}
+
+
+def test_queued_results_are_readable_before_and_after_writing(store, journal_dir):
+    writer = PersistenceQueue(store, journal_dir=journal_dir, flush_interval=0.05)
+    test_id = writer.save_test_result("open shop", {"parsed_steps": []}, {"return_code": 0, "output": "ok"})
+    assert writer.get_test_by_id(test_id)["instruction"] == "open shop"
+
+    assert writer.flush(5)
+    assert store.get_all_tests()['test_id'].tolist() == [test_id]
+    assert writer.get_test_by_id(test_id, fields=["execution"])["execution"]["output"] == "ok"
+    assert os.path.getsize(writer.journal_path) == 0  # Compacted once everything is stored
+    writer.close()
+    assert not os.path.exists(writer.journal_path)
+
+
+def test_orphaned_journal_is_replayed_except_committed_results(store, journal_dir):
+    path = orphan_journal(journal_dir, [entry("01A"), entry("01B"), {"committed": ["01A"]}, entry("01C")], torn=True)
+    writer = PersistenceQueue(store, journal_dir=journal_dir, flush_interval=0.05)
+    assert writer.flush(5)
+    writer.close()
+
+    assert sorted(store.get_all_tests()['test_id']) == ["01B", "01C"]
+    assert store.get_test_by_id("01C") == {"test_id": "01C"}
+    assert not os.path.exists(path)
+
+
+@pytest.mark.skipif(write_queue.fcntl is None, reason="journal locks need fcntl")
+def test_journal_of_a_running_process_is_left_alone(store, journal_dir):
+    first = PersistenceQueue(store, journal_dir=journal_dir, flush_interval=60)
+    first.save_test_result("still queued", {}, {"return_code": 0})
+    second = PersistenceQueue(store, journal_dir=journal_dir, flush_interval=0.05)
+    assert second.recover() == 0
+    assert os.path.exists(first.journal_path)
+    second.close()
+    first.close()
+    assert store.search_tests("queued")['instruction'].tolist() == ["still queued"]
+
+
+def test_results_of_a_crashed_process_are_recovered(store, journal_dir):
+    options = {"db_path": store.db_path, "logs_dir": store.logs_dir, "screenshots_dir": store.screenshots_dir}
+    child = ("import os; from app.data.storage import create_data_manager; "
+             "from app.data.write_queue import PersistenceQueue; "
+             f"q = PersistenceQueue(create_data_manager('sqlite', **{options!r}), "
+             f"journal_dir={journal_dir!r}, flush_interval=60); "
+             "[q.save_test_result(f'crash {i}', {}, {'return_code': 0}) for i in range(10)]; os._exit(1)")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, "-c", child], cwd=root, check=False, capture_output=True)
+    assert store.get_all_tests().empty
+
+    recovery = PersistenceQueue(store, journal_dir=journal_dir, flush_interval=0.05)
+    assert recovery.flush(5)
+    recovery.close()
+    assert len(store.search_tests("crash")) == 10
+
+
+def test_failed_batches_are_retried(store, journal_dir, monkeypatch):
+    monkeypatch.setattr(write_queue, "RETRY_INITIAL", 0.01)
+    insert_rows = store.insert_rows
+    failures = []
+
+    def flaky_insert(rows):
+        if not failures:
+            failures.append(rows)
+            raise OSError("database is locked")
+        insert_rows(rows)
+
+    monkeypatch.setattr(store, "insert_rows", flaky_insert)
+    writer = PersistenceQueue(store, journal_dir=journal_dir, flush_interval=0.05)
+    test_id = writer.save_test_result("retry me", {}, {"return_code": 0})
+    assert writer.flush(5)
+    writer.close()
+    assert writer.stats()["retries"] == 1
+    assert store.get_all_tests()['test_id'].tolist() == [test_id]
+
+
+def test_retries_do_not_store_rows_twice(store, journal_dir, monkeypatch):
+    monkeypatch.setattr(write_queue, "RETRY_INITIAL", 0.01)
+    insert_rows, write_log = store.insert_rows, store.write_log
+    inserted, failures = [], []
+
+    def recording_insert(rows):
+        inserted.extend(row["test_id"] for row in rows)
+        insert_rows(rows)
+
+    def flaky_log(test_id, log_data):
+        if not failures:
+            failures.append(test_id)
+            raise OSError("disk full")
+        return write_log(test_id, log_data)
+
+    monkeypatch.setattr(store, "insert_rows", recording_insert)
+    monkeypatch.setattr(store, "write_log", flaky_log)
+    writer = PersistenceQueue(store, journal_dir=journal_dir, flush_interval=0.05)
+    test_id = writer.save_test_result("retry my log", {}, {"return_code": 0})
+    assert writer.flush(5)
+    writer.close()
+    assert writer.stats()["retries"] == 1
+    # Only the log was written again
+    assert inserted == [test_id]
+    assert store.get_test_by_id(test_id)["instruction"] == "retry my log"
+
+
+def test_excel_backend_skips_rows_it_already_holds(tmp_path):
+    pytest.importorskip("openpyxl")
+    from app.data.storage import create_data_manager
+
+    excel = create_data_manager("excel", excel_path=str(tmp_path / "history.xlsx"),
+                                logs_dir=str(tmp_path / "logs"), screenshots_dir=str(tmp_path / "shots"))
+    excel.write_rows([history_row("01A", "2024-06-01 10:00:00")])
+    excel.write_rows([history_row("01A", "2024-06-01 10:00:00"), history_row("01B", "2024-06-01 10:05:00")])
+    assert excel.load_all_tests()['test_id'].astype(str).tolist() == ["01A", "01B"]